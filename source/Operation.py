@@ -1,23 +1,93 @@
+import array
 import logging
-from copy import deepcopy
 
+import cg_algorithms as alg
 from MyItem import MyItem
 
 
+def pack(p_list):
+    """将坐标列表打包为连续数组，坐标都是整数时用int64，否则用double
+    """
+    flat = [c for p in p_list for c in p]
+    typecode = 'q' if all(isinstance(c, int) for c in flat) else 'd'
+    return array.array(typecode, flat)
+
+
+def unpack(packed):
+    """pack的逆运算
+    """
+    return [[packed[i], packed[i + 1]] for i in range(0, len(packed), 2)]
+
+
+def residual(target, predicted):
+    """target中与predicted不同的坐标，打包为 (下标, x, y) 的三元组序列，相同时为空；保存target的原值而不是差值，写回时没有舍入误差
+    """
+    result = array.array('d')
+    for i, (p, q) in enumerate(zip(target, predicted)):
+        if p[0] != q[0] or p[1] != q[1]:
+            result.extend((i, p[0], p[1]))
+    return result
+
+
+def apply_residual(p_list, packed, typecode='q'):
+    """将residual记录的坐标写回坐标列表
+
+    :param typecode: (string) 打包原坐标时的类型码，'q'时坐标写回为int，'d'时为float（与unpack的结果相同）
+    """
+    cast = int if typecode == 'q' else float
+    if typecode != 'q':
+        p_list = [[cast(x), cast(y)] for x, y in p_list]
+    for j in range(0, len(packed), 3):
+        p_list[int(packed[j])] = [cast(packed[j + 1]), cast(packed[j + 2])]
+    return p_list
+
+
 class Operation:
+    """
+    一步可撤销的操作
+    在手势（一次按下、拖动、松开）进行期间，对同一图元的同类操作由OperationList合并到本操作中
+    """
+    coalescable = False  # 手势中的后续同类操作能否合并到本操作
+
     def __init__(self, item: MyItem):
         self.item = item
+        self.status = None  # 由OperationList设置
+        self.in_gesture = False
+
+    def begin_gesture(self):
+        """
+        开始手势，之后对同一图元的同类操作都合并到本操作，直到end_gesture()
+        """
+        self.in_gesture = True
+
+    def end_gesture(self):
+        """
+        结束手势，本操作完成
+        """
+        self.in_gesture = False
+        self.finish()
+
+    def merge(self, *params):
+        """
+        合并手势中的一次后续同类操作
+
+        :param params: 与OperationList.add_operation的params相同
+        """
+        pass
 
     def mouse_move(self):
         pass
 
     def mouse_press(self):
-        pass
+        self.begin_gesture()
 
     def mouse_release(self):
-        pass
+        self.end_gesture()
 
     def finish(self):
+        """
+        操作完成，释放只在操作过程中需要的数据
+        """
         pass
 
     def undo(self):
@@ -26,6 +96,18 @@ class Operation:
         """
         pass
 
+    def redo(self):
+        """
+        重做被撤销的操作，不支持重做时返回None
+        """
+        pass
+
+    def nbytes(self):
+        """
+        该操作占用内存的估计值（字节）
+        """
+        return 64
+
 
 class DrawItem(Operation):
     def __str__(self):
@@ -35,34 +117,147 @@ class DrawItem(Operation):
         logging.debug('Undo and delete %s' % self.item)
         return 'delete', self.item
 
+    def redo(self):
+        logging.debug('Redo and restore %s' % self.item)
+        return 'restore', self.item
+
+
+class TransformItem(Operation):
+    """
+    平移、旋转、缩放操作
+    只保存变换矩阵：撤销时作用逆矩阵，重做时作用原矩阵，手势中的后续操作累乘到同一个矩阵上。
+    操作开始时暂存打包的原坐标，finish()时与当前坐标比较，只保留逐步取整造成的少量残差，
+    之后释放原坐标；变换前后顶点数不同（不是仿射变换的结果），或残差比打包的前后坐标还大
+    （如调用方没有提供矩阵）时，改为保留打包的前后坐标
+    """
+    coalescable = True
+
+    def __init__(self, item: MyItem, matrix=alg.IDENTITY):
+        """
+        :param matrix: (tuple of tuple) 已经作用到图元上的3x3仿射矩阵，之后可由transform()继续累乘
+        """
+        super().__init__(item)
+        self.matrix = matrix
+        self.old = pack(item.p_list)
+        self.new = None
+        self.undo_residual = array.array('d')
+        self.redo_residual = array.array('d')
+        self.typecodes = ('q', 'q')  # 前后坐标打包时的类型码，写回残差时据此恢复坐标类型
+
+    def __str__(self):
+        return 'TransformItem matrix={}'.format(self.matrix)
+
+    def transform(self, matrix):
+        """记录又作用到图元上的一次变换
+        """
+        self.matrix = alg.matrix_multiply(matrix, self.matrix)
+
+    def merge(self, matrix=alg.IDENTITY):
+        self.transform(matrix)
+
+    def finish(self):
+        if self.old is None or self.new is not None:
+            return
+        old, new = unpack(self.old), self.item.p_list
+        packed = pack(new)
+        if len(old) == len(new):
+            redo_residual = residual(new, alg.transform(old, self.matrix))
+            undo_residual = residual(old, alg.transform(new, alg.matrix_inverse(self.matrix)))
+            residual_size = redo_residual.itemsize * (len(redo_residual) + len(undo_residual))
+            if residual_size < self.old.itemsize * len(self.old) + packed.itemsize * len(packed):
+                self.redo_residual, self.undo_residual = redo_residual, undo_residual
+                self.typecodes = (self.old.typecode, packed.typecode)
+                self.old = None
+                return
+        self.new = packed
+
+    def undo(self):
+        self.finish()
+        if self.new is not None:
+            self.item.p_list = unpack(self.old)
+        else:
+            p_list = alg.transform(self.item.p_list, alg.matrix_inverse(self.matrix))
+            self.item.p_list = apply_residual(p_list, self.undo_residual, self.typecodes[0])
+        logging.debug('Undo {} by inverse of {}'.format(self.item, self.matrix))
+        return 'undo', self.item
+
+    def redo(self):
+        if self.new is not None:
+            self.item.p_list = unpack(self.new)
+        else:
+            p_list = alg.transform(self.item.p_list, self.matrix)
+            self.item.p_list = apply_residual(p_list, self.redo_residual, self.typecodes[1])
+        logging.debug('Redo {} by {}'.format(self.item, self.matrix))
+        return 'redo', self.item
+
+    def nbytes(self):
+        size = 64 + 9 * 8 + self.undo_residual.itemsize * (len(self.undo_residual) + len(self.redo_residual))
+        for packed in (self.old, self.new):
+            if packed is not None:
+                size += packed.itemsize * len(packed)
+        return size
+
 
 class EditItem(Operation):
+    """
+    裁剪等无法用仿射矩阵表示的操作，保存打包的前后坐标；手势中的后续操作沿用最初的坐标
+    """
+    coalescable = True
+
     def __init__(self, item: MyItem):
         super().__init__(item)
-        self.old_p_list = deepcopy(item.p_list)
+        self.old_p_list = pack(item.p_list)
+        self.new_p_list = None
 
     def __str__(self):
-        return 'EditItem old_p_list={}'.format(self.old_p_list)
+        return 'EditItem old_p_list={}'.format(unpack(self.old_p_list))
+
+    def finish(self):
+        if self.new_p_list is None:
+            self.new_p_list = pack(self.item.p_list)
 
     def undo(self):
-        logging.debug('Undo {} to old p_list={}'.format(self.item, self.old_p_list))
-        self.item.p_list = self.old_p_list
+        self.finish()
+        logging.debug('Undo {} to old p_list={}'.format(self.item, unpack(self.old_p_list)))
+        self.item.p_list = unpack(self.old_p_list)
         return 'undo', self.item
 
+    def redo(self):
+        self.item.p_list = unpack(self.new_p_list)
+        return 'redo', self.item
+
+    def nbytes(self):
+        size = 64 + self.old_p_list.itemsize * len(self.old_p_list)
+        if self.new_p_list is not None:
+            size += self.new_p_list.itemsize * len(self.new_p_list)
+        return size
+
 
 class MoveCenter(Operation):
+    coalescable = True
+
     def __init__(self, item):
         super().__init__(item)
         self.old_center = self.item.center
+        self.new_center = None
 
     def __str__(self):
         return 'MoveCenter old center={}'.format(self.old_center)
 
+    def finish(self):
+        if self.new_center is None:
+            self.new_center = self.item.center
+
     def undo(self):
+        self.finish()
         logging.debug('Undo {} to old center={}'.format(self.item, self.old_center))
         self.item.center = self.old_center
         return 'undo', self.item
 
+    def redo(self):
+        self.item.center = self.new_center
+        return 'redo', self.item
+
 
 class DeleteItem(Operation):
     def __str__(self):
@@ -72,6 +267,10 @@ class DeleteItem(Operation):
         logging.debug('Undo and restore {}'.format(self.item))
         return 'restore', self.item
 
+    def redo(self):
+        logging.debug('Redo and delete {}'.format(self.item))
+        return 'delete', self.item
+
 
 class DrawingPolygon(Operation):
     def __str__(self):
@@ -83,10 +282,18 @@ class DrawingPolygon(Operation):
 
 
 class DrawingCurve(Operation):
+    def __init__(self, item: MyItem):
+        super().__init__(item)
+        self.point = None
+
     def __str__(self):
         return 'DrawingCurve: %s' % self.item
 
     def undo(self):
-        self.item.p_list.pop()
+        self.point = self.item.p_list.pop()
         logging.debug('Undo drawing curve.')
-        return 'undo', self.item
\ No newline at end of file
+        return 'undo', self.item
+
+    def redo(self):
+        self.item.p_list.append(self.point)
+        return 'redo', self.item
@@ -2,7 +2,7 @@ import collections
 import logging
 
 from MyItem import MyItem
-from Operation import DrawItem, EditItem, MoveCenter, DeleteItem, DrawingPolygon, DrawingCurve
+from Operation import DrawItem, TransformItem, EditItem, MoveCenter, DeleteItem, DrawingPolygon, DrawingCurve
 
 status_operation_map = {
     'line': DrawItem,
@@ -10,9 +10,9 @@ status_operation_map = {
     'ellipse': DrawItem,
     'curve': DrawItem,
     'copy': DrawItem,
-    'translate': EditItem,
-    'scale': EditItem,
-    'rotate': EditItem,
+    'translate': TransformItem,
+    'scale': TransformItem,
+    'rotate': TransformItem,
     'clip': EditItem,
     'clip_polygon': EditItem,
     'rotate_move_center': MoveCenter,
@@ -25,29 +25,87 @@ status_operation_map = {
 class OperationList:
     """
     备忘录类
+    记录的操作数和估计的内存占用超过上限时丢弃最早的操作；撤销的操作进入重做栈，添加新操作时清空重做栈。
+    最后一个操作处于手势中时，对同一图元的同类操作合并到其中，一次手势只占一条记录，撤销一次即可
     """
-    def __init__(self):
+    def __init__(self, max_length=1000, max_bytes=16 * 1024 * 1024):
+        """
+        :param max_length: (int) 最多保留的操作数
+        :param max_bytes: (int) 操作占用内存的上限（字节）
+        """
         self.op_list = collections.deque()
+        self.redo_list = []
+        self.max_length = max_length
+        self.max_bytes = max_bytes
+        self.nbytes = 0
 
-    def add_operation(self, status: str, item: MyItem):
+    def add_operation(self, status: str, item: MyItem, *params):
+        """
+        :param params: 传给操作构造函数的其他参数，如TransformItem已作用的变换矩阵
+        :return: (Operation) 新添加的操作或合并到的操作，不存在该操作时为None
+        """
+        last = self.op_list[-1] if self.op_list else None
+        if last is not None and last.in_gesture and last.coalescable \
+                and last.status == status and last.item is item:
+            self.nbytes -= last.nbytes()
+            last.merge(*params)
+            self.nbytes += last.nbytes()
+            return last
         try:
-            operation = status_operation_map[status](item)
+            operation = status_operation_map[status](item, *params)
         except KeyError:
             logging.error('No such operation.')
-            return
+            return None
+        operation.status = status
+        if last is not None:
+            self._finish(last)
+        self.redo_list.clear()
         self.op_list.append(operation)
+        self.nbytes += operation.nbytes()
         logging.debug('add operation: %s' % operation)
+        self._evict()
+        return operation
+
+    def _finish(self, operation):
+        self.nbytes -= operation.nbytes()
+        operation.in_gesture = False
+        operation.finish()
+        self.nbytes += operation.nbytes()
+
+    def _evict(self):
+        while len(self.op_list) > 1 and (len(self.op_list) > self.max_length or self.nbytes > self.max_bytes):
+            evicted = self.op_list.popleft()
+            self.nbytes -= evicted.nbytes()
+            logging.debug('evict operation: %s' % evicted)
 
     def undo(self):
         if len(self.op_list) == 0:
             raise ValueError('empty op_list')
         last_operation = self.op_list.pop()
+        self.nbytes -= last_operation.nbytes()
+        last_operation.in_gesture = False
 
         # 曲线和多边形特殊处理
         if isinstance(last_operation, DrawItem):
             while self.op_list and isinstance(self.op_list[-1], DrawingCurve):
-                self.op_list.pop()
+                self.nbytes -= self.op_list.pop().nbytes()
             while self.op_list and isinstance(self.op_list[-1], DrawingPolygon):
-                self.op_list.pop()
+                self.nbytes -= self.op_list.pop().nbytes()
 
-        return last_operation.undo()
\ No newline at end of file
+        result = last_operation.undo()
+        self.redo_list.append(last_operation)
+        return result
+
+    def redo(self):
+        if len(self.redo_list) == 0:
+            raise ValueError('empty redo_list')
+        operation = self.redo_list.pop()
+        result = operation.redo()
+        if result is None:
+            # 不支持重做的操作，之后的操作也无法重做
+            self.redo_list.clear()
+            return None
+        self.op_list.append(operation)
+        self.nbytes += operation.nbytes()
+        self._evict()
+        return result
@@ -6,6 +6,9 @@ import math
 import logging
 import collections
 
+# 曲线自适应细分的平坦度容差（像素）
+CURVE_TOLERANCE = 0.5
+
 
 def draw_line(p_list, algorithm):
     """绘制线段
@@ -105,85 +108,282 @@ def draw_rect(p_list, algorithm):
     x1, y1 = p_list[1]
     return draw_polygon([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], 'Bresenham')
 
+def fill_polygon(p_list, rule):
+    """扫描线填充多边形（边表与活性边表）
+
+    扫描线取整数y，每条非水平边覆盖y∈[y_min, y_max)，保证共享顶点只计一次；
+    每条扫描线上x∈[x_a, x_b]的像素被填充，结果按行输出为水平线段而非单个像素。
+    顶点先取整；边与扫描线交点的x以分子/dy的形式保存，逐行只做整数加法，结果与平移无关
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 多边形的顶点坐标列表
+    :param rule: (string) 填充规则，包括'even-odd'（奇偶规则）和'nonzero'（非零环绕数规则）
+    :return: (list of list of int: [[y, x_start, x_end], ...]) 按y递增排列的水平线段，x_start <= x_end
+    """
+    if rule not in ('even-odd', 'nonzero'):
+        print('No such fill rule.')
+        return []
+    # 边表：扫描线y -> 从该扫描线开始的边 [x * dy, dx, dy, 结束扫描线（不含）, 方向]
+    edge_table = {}
+    vertices = [[round(x), round(y)] for x, y in p_list]
+    for i in range(len(vertices)):
+        (xa, ya), (xb, yb) = vertices[i - 1], vertices[i]
+        if ya == yb:
+            continue
+        direction = 1 if yb > ya else -1
+        if ya > yb:
+            xa, ya, xb, yb = xb, yb, xa, ya
+        edge_table.setdefault(ya, []).append([xa * (yb - ya), xb - xa, yb - ya, yb, direction])
+    result = []
+    active = []
+    y = min(edge_table) if edge_table else 0
+    while active or edge_table:
+        active.extend(edge_table.pop(y, ()))
+        active = [e for e in active if e[3] > y]
+        active.sort(key=lambda e: e[0] / e[2])
+        winding = 0
+        for i in range(len(active) - 1):
+            winding += active[i][4] if rule == 'nonzero' else 1
+            inside = winding != 0 if rule == 'nonzero' else winding % 2 == 1
+            if inside:
+                left, right = active[i], active[i + 1]
+                x_start, x_end = -(-left[0] // left[2]), right[0] // right[2]
+                if x_start <= x_end:
+                    if result and result[-1][0] == y and result[-1][2] >= x_start - 1:
+                        # 与同一行上一段相接时合并
+                        result[-1][2] = max(result[-1][2], x_end)
+                    else:
+                        result.append([y, x_start, x_end])
+        for e in active:
+            e[0] += e[1]
+        y += 1
+        if not active and edge_table:
+            y = min(edge_table)
+    return result
+
+
 def draw_ellipse(p_list, algorithm):
     """绘制椭圆（采用中点圆生成算法）
 
+    决策参数乘以4后全部为整数运算；四分之一弧上的点在生成时直接对称到四个象限并平移，
+    位于坐标轴上的点只输出一次
+
     :param p_list: (list of list of int: [[x0, y0], [x1, y1]]) 椭圆的矩形包围框左上角和右下角顶点坐标
     :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 绘制结果的像素点坐标列表
     """
     if p_list[0] == p_list[1]:
-        return [p_list[0],]
+        return [list(p_list[0])]
     x0, y0 = p_list[0]
     x1, y1 = p_list[1]
     result = []
-    quarter = []
     rx, ry = (round(abs(x1 - x0) / 2), round(abs(y1 - y0) / 2))
     rx2, ry2 = rx * rx, ry * ry
     xc, yc = round((x1 + x0) / 2), round((y1 + y0) / 2)
     # logging.debug('draw ellipse at ({},{}), with rx={}, ry={}'.format(xc, yc, rx, ry))
-    quarter.append([0, ry])
-    p = ry2- rx2 * ry + rx2 / 4
-    x, y, k = 0, ry, 0
-    # 区域1
-    while 2 * ry2 * x < 2 * rx2 * y:
-        if p < 0:
-            quarter.append([k + 1, y])
-            p += 2 * ry2 * (k + 1) + ry2
-        else:
+
+    def emit(x, y):
+        # 对称并平移
+        result.append([xc + x, yc + y])
+        if x != 0:
+            result.append([xc - x, yc + y])
+        if y != 0:
+            result.append([xc + x, yc - y])
+            if x != 0:
+                result.append([xc - x, yc - y])
+
+    emit(0, ry)
+    # 区域1，p = 4 * (ry2 - rx2 * ry + rx2 / 4)
+    p = 4 * ry2 - 4 * rx2 * ry + rx2
+    x, y = 0, ry
+    while ry2 * x < rx2 * y:
+        if p >= 0:
             y -= 1
-            quarter.append([k + 1, y])
-            p += 2 * ry2 * (k + 1) - 2 * rx2 * y + ry2
-        k += 1
-        x = k
-    # 区域2
-    k = 0
-    p = ry2 * (x + 1/2) * (x + 1/2) + rx2 * (y - 1) * (y - 1) - rx2 * ry2
-    for k in range(0, y):
-        if p > 0:
-            quarter.append([x, y - k - 1])
-            p += rx2 - 2 * rx2 * (y-k-1)
-        else:
+            p -= 8 * rx2 * y
+        p += 8 * ry2 * (x + 1) + 4 * ry2
+        x += 1
+        emit(x, y)
+    # 区域2，p = 4 * (ry2 * (x + 1/2)^2 + rx2 * (y - 1)^2 - rx2 * ry2)
+    p = ry2 * (2 * x + 1) * (2 * x + 1) + 4 * rx2 * (y - 1) * (y - 1) - 4 * rx2 * ry2
+    while y > 0:
+        y -= 1
+        if p <= 0:
             x += 1
-            quarter.append([x, y - k - 1])
-            p += 2 * ry2 * x - 2 * rx2 * (y-k-1) + rx2
-    # 对称
-    full = []
-    for [x, y] in quarter:
-        full.extend([[x,y], [-x, y], [x, -y], [-x, -y]])
-    # 平移
-    for [x, y] in full:
-        result.append([x + xc, y + yc])
+            p += 8 * ry2 * x
+        p += 4 * rx2 - 8 * rx2 * y
+        emit(x, y)
     return result
 
 
-def draw_curve(p_list, algorithm):
+def draw_curve(p_list, algorithm, tolerance=CURVE_TOLERANCE, order=4):
     """绘制曲线
 
     :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 曲线的控制点坐标列表
     :param algorithm: (string) 绘制使用的算法，包括'Bezier'和'B-spline'（三次均匀B样条曲线，曲线不必经过首末控制点）
+    :param tolerance: (float) 自适应细分的平坦度容差（像素），None表示按固定步长采样
+    :param order: (int) B样条的阶数，默认为三次B样条
     :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 绘制结果的像素点坐标列表
     """
     # logging.debug('Start to draw curve with {}'.format(p_list))
-    result, points = [], []
+    result = []
+    if tolerance is None:
+        points = curve_points_fixed(p_list, algorithm, order)
+    else:
+        points = curve_points(p_list, algorithm, tolerance, order)
+    if len(points) == 1:
+        return draw_line([points[0], points[0]], 'Bresenham')
+    # 生成的点间用直线相连
+    for i in range(0, len(points)-1):
+        result.extend(draw_line(points[i:i+2], 'Bresenham'))
+    return result
+
+
+def bezier_subdivide(ctrl):
+    """de Casteljau算法在u=0.5处将Bezier曲线一分为二
+
+    :param ctrl: (list of list of float) 控制点坐标列表
+    :return: (tuple of list) 前半段和后半段的控制点坐标列表
+    """
+    left, right = [ctrl[0]], [ctrl[-1]]
+    pts = ctrl
+    while len(pts) > 1:
+        pts = [[(a[0] + b[0]) / 2, (a[1] + b[1]) / 2] for a, b in zip(pts, pts[1:])]
+        left.append(pts[0])
+        right.append(pts[-1])
+    return left, right[::-1]
+
+
+def bezier_is_flat(ctrl, tolerance):
+    """判断控制多边形是否足够平坦：所有内部控制点到首末点连线段的距离都不超过容差
+
+    由凸包性质，此时曲线与弦的偏差也不超过容差
+    """
+    x0, y0 = ctrl[0]
+    dx, dy = ctrl[-1][0] - x0, ctrl[-1][1] - y0
+    d2 = dx * dx + dy * dy
+    tol2 = tolerance * tolerance
+    for x, y in ctrl[1:-1]:
+        t = 0 if d2 == 0 else min(max(((x - x0) * dx + (y - y0) * dy) / d2, 0), 1)
+        ex, ey = x - x0 - t * dx, y - y0 - t * dy
+        if ex * ex + ey * ey > tol2:
+            return False
+    return True
+
+
+def bezier_flatten(ctrl, tolerance, points):
+    """自适应细分Bezier曲线，将各平坦小段的终点（取整后）依次追加到points
+
+    :param ctrl: (list of list of float) 控制点坐标列表
+    :param tolerance: (float) 平坦度容差（像素）
+    :param points: (list of list of int) 输出的采样点列表，调用前应已包含曲线起点
+    """
+    stack = [(ctrl, 0)]
+    while stack:
+        ctrl, depth = stack.pop()
+        if depth >= 32 or bezier_is_flat(ctrl, tolerance):
+            p = [round(ctrl[-1][0]), round(ctrl[-1][1])]
+            if p != points[-1]:
+                points.append(p)
+        else:
+            left, right = bezier_subdivide(ctrl)
+            stack.append((right, depth + 1))
+            stack.append((left, depth + 1))
+
+
+bspline_bezier_matrices = {}
+
+
+def bspline_bezier_matrix(order):
+    """均匀B样条一段的控制点到等价Bezier控制点的转换矩阵C：b_m = sum(C[m][i] * P_i)
+
+    第m个Bezier控制点是以m个1和(order-1-m)个0为参数的开花（blossom）值，
+    用de Boor算法在第r层取第r个参数即可求得；对单位向量计算即得到矩阵的各行
+
+    :param order: (int) B样条的阶数（次数加1）
+    :return: (list of list of float) order×order的转换矩阵
+    """
+    if order in bspline_bezier_matrices:
+        return bspline_bezier_matrices[order]
+    d = order - 1
+    t = [i - d for i in range(2 * d + 2)] # 局部节点矢量，该段对应[t_d, t_{d+1}] = [0, 1]
+    matrix = []
+    for m in range(order):
+        args = [1] * m + [0] * (d - m)
+        coef = [[1.0 if a == b else 0.0 for b in range(order)] for a in range(order)]
+        for r in range(1, order):
+            u = args[r - 1]
+            for i in range(d, r - 1, -1):
+                alpha = (u - t[i]) / (t[i + d + 1 - r] - t[i])
+                coef[i] = [(1 - alpha) * a + alpha * b for a, b in zip(coef[i - 1], coef[i])]
+        matrix.append(coef[d])
+    bspline_bezier_matrices[order] = matrix
+    return matrix
+
+
+def bspline_to_bezier(p_list, order=4):
+    """将均匀B样条的一段（由order个控制点决定）转换为等价的Bezier控制点
+    """
+    return [[sum(c * p[0] for c, p in zip(row, p_list)), sum(c * p[1] for c, p in zip(row, p_list))]
+            for row in bspline_bezier_matrix(order)]
+
+
+def curve_points(p_list, algorithm, tolerance=CURVE_TOLERANCE, order=4):
+    """自适应计算曲线上的采样点，相邻采样点间用直线相连即得到曲线
+
+    曲线（B样条逐段转换为Bezier）不断对半细分，直到控制多边形与弦的偏差不超过容差，
+    因此采样点数随曲线在屏幕上的长度和弯曲程度变化
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 曲线的控制点坐标列表
+    :param algorithm: (string) 绘制使用的算法，包括'Bezier'和'B-spline'
+    :param tolerance: (float) 平坦度容差（像素）
+    :param order: (int) B样条的阶数，默认为三次B样条
+    :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 取整后的采样点坐标列表
+    """
     n = len(p_list) # 控制点个数
     if algorithm == 'Bezier':
-        # 计算n-1为底的二项式系数
+        if n == 0:
+            return []
+        segments = [[[float(x), float(y)] for x, y in p_list]]
+    elif algorithm == 'B-spline':
+        if n < order:
+            return []
+        segments = [bspline_to_bezier(p_list[j-order+1:j+1], order) for j in range(order-1, n)]
+    else:
+        print('No such algorithm.')
+        return []
+    points = [[round(segments[0][0][0]), round(segments[0][0][1])]]
+    for ctrl in segments:
+        bezier_flatten(ctrl, tolerance, points)
+    return points
+
+
+def curve_points_fixed(p_list, algorithm, order=4):
+    """按固定步长0.01计算曲线上的采样点（自适应细分之前的实现，供对比）
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 曲线的控制点坐标列表
+    :param algorithm: (string) 绘制使用的算法，包括'Bezier'和'B-spline'
+    :param order: (int) B样条的阶数，默认为三次B样条
+    :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 取整后的采样点坐标列表
+    """
+    points = []
+    n = len(p_list) # 控制点个数
+    if algorithm == 'Bezier':
+        # 计算n-1为底的二项式系数（整数精确计算）
         comb = []
         comb.append(1)
-        for i in range(0, n):
-            comb.append(comb[i] / (i + 1) * (n - 1 - i))
-        # 计算Bezier曲线公式
+        for i in range(0, n - 1):
+            comb.append(comb[i] * (n - 1 - i) // (i + 1))
+        # 计算Bezier曲线公式，每个基函数值对x、y只计算一次
         step = 0.01
         u = 0
         while u <= 1:
             x, y = 0.0, 0.0
             for i in range(0, n):
-                x += comb[i] * math.pow(u, i) * math.pow(1-u, n-1-i) * p_list[i][0]
-                y += comb[i] * math.pow(u, i) * math.pow(1-u, n-1-i) * p_list[i][1]
+                w = comb[i] * math.pow(u, i) * math.pow(1-u, n-1-i)
+                x += w * p_list[i][0]
+                y += w * p_list[i][1]
             points.append([round(x), round(y)])
             u = u + step
     elif algorithm == 'B-spline':
-        k = 4 #阶数
+        k = order #阶数
         if n < k:
             # print('Not enough control points.')
             return []
@@ -192,35 +392,31 @@ def draw_curve(p_list, algorithm):
         for i in range(0, n+k+1):
             U.append(i*100/(n+k))
         #子函数
-        def de_Boor_Cox(r, i, u):
-            """de Boor Cox公式递归计算x,y坐标
+        def de_Boor(j, u):
+            """de Boor算法逐层迭代计算第j个节点区间内u处的x,y坐标
+            d[m]保存当前层下标为j-k+1+m的点，倒序更新使d[m-1]仍是上一层的值
             """
-            if r == 0:
-                return p_list[i]
-            tmp = 0
-            if u - U[i] == 0 and U[i+k-r] - U[i]  == 0:
-                tmp = 1
-            else:
-                tmp = (u - U[i]) / (U[i+k-r]-U[i])
-            x1, y1 = de_Boor_Cox(r-1, i, u)
-            x2, y2 = de_Boor_Cox(r-1, i-1, u)
-            x = tmp * x1 + (1-tmp) * x2
-            y = tmp * y1 + (1-tmp) * y2
-            return x,y
+            d = p_list[j-k+1:j+1]
+            for r in range(1, k):
+                for m in range(k-1, r-1, -1):
+                    i = j - k + 1 + m
+                    if u - U[i] == 0 and U[i+k-r] - U[i] == 0:
+                        tmp = 1
+                    else:
+                        tmp = (u - U[i]) / (U[i+k-r]-U[i])
+                    d[m] = [tmp * d[m][0] + (1-tmp) * d[m-1][0], tmp * d[m][1] + (1-tmp) * d[m-1][1]]
+            return d[k-1]
         # 只在[t_{k-1}, t_n]上有定义，故只需在这个范围枚举j
         step = 0.01
         for j in range(k-1, n):
             u = U[j]
             while u < U[j + 1]:
-                p = de_Boor_Cox(k-1, j, u)
+                p = de_Boor(j, u)
                 points.append([round(p[0]), round(p[1])])
                 u = u + step
     else:
         print('No such algorithm.')
-    # 生成的点间用直线相连
-    for i in range(0, len(points)-1):
-        result = result + draw_line(points[i:i+2], 'Bresenham')
-    return result
+    return points
 
 
 def translate(p_list, dx, dy):
@@ -284,6 +480,60 @@ def scale(p_list, x, y, s):
         result.append([newx, newy])
     return result
 
+IDENTITY = ((1, 0, 0), (0, 1, 0), (0, 0, 1))
+
+
+def translate_matrix(dx, dy):
+    """平移变换的3x3齐次矩阵，与translate的结果相同（不取整）
+    """
+    return (1, 0, dx), (0, 1, dy), (0, 0, 1)
+
+
+def rotate_matrix(x, y, r):
+    """绕(x, y)旋转r度的3x3齐次矩阵，方向与rotate相同
+    """
+    sinr = math.sin(r * math.pi / 180)
+    cosr = math.cos(r * math.pi / 180)
+    return (cosr, -sinr, x - x * cosr + y * sinr), (sinr, cosr, y - x * sinr - y * cosr), (0, 0, 1)
+
+
+def scale_matrix(x, y, s):
+    """以(x, y)为中心缩放s倍的3x3齐次矩阵
+    """
+    return (s, 0, x * (1 - s)), (0, s, y * (1 - s)), (0, 0, 1)
+
+
+def matrix_multiply(a, b):
+    """矩阵乘积a·b，表示先做变换b再做变换a
+
+    :param a: (tuple of tuple) 3x3矩阵
+    :param b: (tuple of tuple) 3x3矩阵
+    :return: (tuple of tuple) 3x3矩阵
+    """
+    return tuple(tuple(sum(a[i][k] * b[k][j] for k in range(3)) for j in range(3)) for i in range(3))
+
+
+def matrix_inverse(m):
+    """仿射变换矩阵（最后一行为(0, 0, 1)）的逆矩阵
+    """
+    (a, b, c), (d, e, f) = m[0], m[1]
+    det = a * e - b * d
+    return ((e / det, -b / det, (b * f - c * e) / det),
+            (-d / det, a / det, (c * d - a * f) / det),
+            (0, 0, 1))
+
+
+def transform(p_list, matrix):
+    """对图元参数做仿射变换，结果取整
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 图元参数
+    :param matrix: (tuple of tuple) 3x3齐次矩阵，最后一行为(0, 0, 1)
+    :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 变换后的图元参数
+    """
+    (a, b, c), (d, e, f) = matrix[0], matrix[1]
+    return [[round(a * xx + b * yy + c), round(d * xx + e * yy + f)] for xx, yy in p_list]
+
+
 def outcode(x, y, x_min, y_min, x_max, y_max):
     """输出区域码，供线段Cohen-Sutherland裁剪算法使用
     """
@@ -414,15 +664,32 @@ def polygon_is_counterclockwise(p_list):
 
 
 def polygon_clip(p_list, x_min, y_min, x_max, y_max):
+    """Liang-Barsky多边形裁剪，不修改p_list
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 多边形的顶点坐标列表
+    :param x_min: 裁剪窗口左上角x坐标
+    :param y_min: 裁剪窗口左上角y坐标
+    :param x_max: 裁剪窗口右下角x坐标
+    :param y_max: 裁剪窗口右下角y坐标
+    :return: (list of list of int: [[x_0, y_0], [x_1, y_1], ...]) 裁剪后取整的顶点，相邻重复的顶点只保留一个
+    """
+    if x_min > x_max:
+        x_min, x_max = x_max, x_min
+    if y_min > y_max:
+        y_min, y_max = y_max, y_min
     n = len(p_list)
-    p_list.append(p_list[0])
-    if not polygon_is_counterclockwise(p_list):
-        p_list = p_list[::-1]
+    if n == 0:
+        return []
+    # 在局部的闭合顶点列表上裁剪，不改动调用者的列表
+    points = [(p[0], p[1]) for p in p_list]
+    points.append(points[0])
+    if not polygon_is_counterclockwise(points):
+        points.reverse()
     result = []
     for i in range(0, n):
-        x_i, y_i = p_list[i]
-        delta_x = p_list[i+1][0] - x_i
-        delta_y = p_list[i+1][1] - y_i
+        x_i, y_i = points[i]
+        delta_x = points[i+1][0] - x_i
+        delta_y = points[i+1][1] - y_i
         if delta_x > 0:
             x_in, x_out = x_min, x_max
         else:
@@ -481,11 +748,59 @@ def polygon_clip(p_list, x_min, y_min, x_max, y_max):
                             else:
                                 result.append([x_i+t_out_y*delta_x, y_out])
                         else: # p[i+1] inside window
-                            result.append(p_list[i+1])
+                            result.append(points[i+1])
                     else: # case 6: turning vertex
                         if t_in_x > t_in_y:  # second entry at x
                             result.append([x_in, y_out])
                         else:  # second entry at y
                             result.append([x_out, y_in])
         # print('append (%d, %d)' % (result[-1][0], result[-1][1]))
+    return compact_polygon(result)
+
+
+def polygon_clip_convex(p_list, window):
+    """Sutherland-Hodgman多边形裁剪，裁剪窗口可以是任意凸多边形，不修改p_list
+
+    依次用窗口的每条边所在直线裁剪，每条边的代价为O(n)
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 多边形的顶点坐标列表
+    :param window: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 凸裁剪窗口的顶点，顺时针或逆时针均可
+    :return: (list of list of int: [[x_0, y_0], [x_1, y_1], ...]) 裁剪后取整的顶点，相邻重复的顶点只保留一个
+    """
+    area = 0
+    for i in range(len(window)):
+        area += window[i - 1][0] * window[i][1] - window[i][0] * window[i - 1][1]
+    if area == 0:
+        return []
+    sign = 1 if area > 0 else -1
+    points = [(p[0], p[1]) for p in p_list]
+    for i in range(len(window)):
+        if not points:
+            break
+        (ax, ay), (bx, by) = window[i - 1], window[i]
+        # side >= 0 表示点在窗口边的内侧
+        sides = [sign * ((bx - ax) * (y - ay) - (by - ay) * (x - ax)) for x, y in points]
+        clipped = []
+        for j in range(len(points)):
+            (sx, sy), (ex, ey) = points[j - 1], points[j]
+            ds, de = sides[j - 1], sides[j]
+            if (ds >= 0) != (de >= 0):
+                t = ds / (ds - de)
+                clipped.append((sx + t * (ex - sx), sy + t * (ey - sy)))
+            if de >= 0:
+                clipped.append((ex, ey))
+        points = clipped
+    return compact_polygon(points)
+
+
+def compact_polygon(points):
+    """顶点坐标取整，并去掉相邻（包括首尾）重复的顶点
+    """
+    result = []
+    for x, y in points:
+        p = [round(x), round(y)]
+        if not result or result[-1] != p:
+            result.append(p)
+    while len(result) > 1 and result[-1] == result[0]:
+        result.pop()
     return result
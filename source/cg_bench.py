@@ -0,0 +1,561 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 性能测试
+# micro、e2e和startup的结果可以保存为JSON，并与之前保存的基线对比；同时检查快速实现与参考实现逐像素一致
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import cg_algorithms as alg
+import cg_command as cmd
+import cg_raster
+
+
+# 场景中各类指令的相对权重
+SCENE_MIXES = {
+    'mixed': {'line': 4, 'polygon': 2, 'ellipse': 2, 'curve': 1, 'fill': 1, 'transform': 3, 'clip': 1},
+    'long-lines': {'line': 1},
+    'huge-ellipses': {'ellipse': 1},
+    'bezier': {'bezier': 1},
+    'bspline': {'bspline': 1},
+    'fill': {'fill': 1},
+    'clip': {'line': 3, 'polygon': 1, 'clip': 3},
+    'dda-polygons': {'polygon': 3, 'transform': 2},
+}
+# 端到端测试中需要多次保存的组合：图元在之后的保存中平移后重新绘制，覆盖光栅缓存命中的情形
+MIX_SAVES = {'dda-polygons': 20}
+
+
+def generate_commands(lines, seed=0):
+    """生成由绘制和变换指令组成的指令文本
+
+    :param lines: (int) 指令行数
+    :param seed: (int) 随机数种子
+    :return: (string) 指令文本
+    """
+    rnd = random.Random(seed)
+    out = ['resetCanvas 1000 1000', 'setColor 0 0 0']
+    for i in range(lines - len(out)):
+        kind = rnd.randrange(4)
+        if kind == 0:
+            out.append('drawLine l{} {} {} {} {} DDA'.format(i, *[rnd.randrange(1000) for _ in range(4)]))
+        elif kind == 1:
+            coords = ' '.join(str(rnd.randrange(1000)) for _ in range(12))
+            out.append('drawPolygon p{} {} Bresenham'.format(i, coords))
+        elif kind == 2:
+            out.append('translate l{} {} {}'.format(i - 2, rnd.randrange(-50, 50), rnd.randrange(-50, 50)))
+        else:
+            out.append('# comment')
+    return '\n'.join(out) + '\n'
+
+
+def generate_scene(items, width, height, mix='mixed', seed=0, saves=1):
+    """生成可复现的场景指令文件
+
+    被裁剪过的图元可能已被删除，之后不再对其做变换或裁剪，保证生成的指令都能执行
+
+    :param items: (int) 指令数（不含resetCanvas和saveCanvas）
+    :param width: (int) 画布宽度
+    :param height: (int) 画布高度
+    :param mix: (string) SCENE_MIXES中的指令组合
+    :param seed: (int) 随机数种子
+    :param saves: (int) 均匀插入的saveCanvas指令数
+    :return: (string) 指令文本
+    """
+    rnd = random.Random(seed)
+    kinds, weights = zip(*SCENE_MIXES[mix].items())
+    point = lambda: '{} {}'.format(rnd.randrange(-width // 10, width * 11 // 10),
+                                   rnd.randrange(-height // 10, height * 11 // 10))
+    points = lambda n: ' '.join(point() for _ in range(n))
+    window = lambda: '{} {} {} {}'.format(rnd.randrange(width // 2), rnd.randrange(height // 2),
+                                          rnd.randrange(width // 2, width), rnd.randrange(height // 2, height))
+    out = ['resetCanvas {} {}'.format(width, height)]
+    alive = {'line': [], 'polygon': [], 'other': []}
+    for i in range(items):
+        if saves and i % max(items // saves, 1) == 0 and i:
+            out.append('saveCanvas s{}'.format(len(out)))
+        if rnd.random() < 0.05:
+            out.append('setColor {} {} {}'.format(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)))
+        kind = rnd.choices(kinds, weights)[0]
+        item_id = 'i{}'.format(i)
+        if kind == 'line':
+            if mix == 'long-lines':
+                # 贯穿画布的长线段
+                edge = [(0, rnd.randrange(height)), (width - 1, rnd.randrange(height)),
+                        (rnd.randrange(width), 0), (rnd.randrange(width), height - 1)]
+                (x0, y0), (x1, y1) = rnd.sample(edge, 2)
+                coords = '{} {} {} {}'.format(x0, y0, x1, y1)
+            else:
+                coords = points(2)
+            out.append('drawLine {} {} {}'.format(item_id, coords, rnd.choice(['DDA', 'Bresenham'])))
+            alive['line'].append(item_id)
+        elif kind == 'polygon':
+            algorithm = 'DDA' if mix == 'dda-polygons' else rnd.choice(['DDA', 'Bresenham'])
+            out.append('drawPolygon {} {} {}'.format(item_id, points(rnd.randrange(3, 13)), algorithm))
+            alive['polygon'].append(item_id)
+        elif kind == 'fill':
+            out.append('fillPolygon {} {} {}'.format(item_id, points(rnd.randrange(3, 21)),
+                                                     rnd.choice(['even-odd', 'nonzero'])))
+            alive['polygon'].append(item_id)
+        elif kind == 'ellipse':
+            if mix == 'huge-ellipses':
+                cx, cy = rnd.randrange(width), rnd.randrange(height)
+                rx, ry = rnd.randrange(width // 4, width), rnd.randrange(height // 4, height)
+                coords = '{} {} {} {}'.format(cx - rx, cy - ry, cx + rx, cy + ry)
+            else:
+                coords = points(2)
+            out.append('drawEllipse {} {}'.format(item_id, coords))
+            alive['other'].append(item_id)
+        elif kind in ('curve', 'bezier', 'bspline'):
+            if kind == 'curve':
+                algorithm, n = rnd.choice(['Bezier', 'B-spline']), rnd.randrange(4, 9)
+            elif kind == 'bezier':
+                algorithm, n = 'Bezier', rnd.randrange(20, 61)
+            else:
+                algorithm, n = 'B-spline', rnd.randrange(50, 201)
+            out.append('drawCurve {} {} {}'.format(item_id, points(n), algorithm))
+            alive['other'].append(item_id)
+        elif kind == 'transform':
+            pool = alive['line'] + alive['polygon'] + alive['other']
+            if not pool:
+                continue
+            target = rnd.choice(pool)
+            op = rnd.randrange(3)
+            if op == 0:
+                out.append('translate {} {} {}'.format(target, rnd.randrange(-50, 51), rnd.randrange(-50, 51)))
+            elif op == 1:
+                out.append('rotate {} {} {}'.format(target, point(), rnd.randrange(360)))
+            else:
+                out.append('scale {} {} {}'.format(target, point(), rnd.choice([0.5, 0.8, 1.25, 1.5])))
+        elif kind == 'clip':
+            op = rnd.randrange(3)
+            if op == 0 and alive['line']:
+                target = alive['line'].pop(rnd.randrange(len(alive['line'])))
+                out.append('clip {} {} Cohen-Sutherland'.format(target, window()))
+            elif op == 1 and alive['polygon']:
+                target = alive['polygon'].pop(rnd.randrange(len(alive['polygon'])))
+                out.append('clipPolygon {} {} {}'.format(target, window(),
+                                                         rnd.choice(['Liang-Barsky', 'Sutherland-Hodgman'])))
+            elif op == 2 and alive['line']:
+                out.append('clipAll {} {}'.format(window(), rnd.choice(['Cohen-Sutherland', 'Liang-Barsky'])))
+                alive['line'] = []
+    out.append('saveCanvas final')
+    return '\n'.join(out) + '\n'
+
+
+def bench_parse(lines, repeat):
+    """测试指令解析速度（行/秒）
+    """
+    text = generate_commands(lines)
+    best = 0.0
+    for _ in range(repeat):
+        reader = cmd.CommandReader(io.StringIO(text))
+        for _ in reader:
+            pass
+        best = max(best, reader.throughput())
+    print('parse: {} lines, {:.0f} lines/s'.format(lines, best))
+
+
+def best_time(func, repeat):
+    """多次运行取最短用时（秒）
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_curve(count, tolerance, repeat):
+    """对比固定步长采样与自适应细分绘制曲线的用时、采样点数和像素数
+    """
+    rnd = random.Random(0)
+    print('{:>8} {:>6} {:>9} {:>9} {:>9} {:>9} {:>9}'.format(
+        'algo', 'size', 'fixed_ms', 'adapt_ms', 'fixed_pts', 'adapt_pts', 'pixels'))
+    for algorithm in ('Bezier', 'B-spline'):
+        for size in (10, 100, 1000, 10000):
+            curves = [[[rnd.randrange(size), rnd.randrange(size)] for _ in range(6)] for _ in range(count)]
+            fixed = best_time(lambda: [alg.draw_curve(p, algorithm, None) for p in curves], repeat)
+            adapt = best_time(lambda: [alg.draw_curve(p, algorithm, tolerance) for p in curves], repeat)
+            fixed_pts = sum(len(alg.curve_points_fixed(p, algorithm)) for p in curves)
+            adapt_pts = sum(len(alg.curve_points(p, algorithm, tolerance)) for p in curves)
+            pixels = sum(len(alg.draw_curve(p, algorithm, tolerance)) for p in curves)
+            print('{:>8} {:>6} {:>9.2f} {:>9.2f} {:>9} {:>9} {:>9}'.format(
+                algorithm, size, fixed / count * 1000, adapt / count * 1000, fixed_pts, adapt_pts, pixels))
+
+
+def bench_bezier(sizes, repeat):
+    """对比Bezier曲线采样点计算：固定步长、自适应细分参考实现与cg_raster的向量化实现
+    """
+    rnd = random.Random(0)
+    print('{:>6} {:>9} {:>9} {:>9}'.format('ctrl', 'fixed_ms', 'adapt_ms', 'numpy_ms'))
+    for n in sizes:
+        p_list = [[rnd.randrange(1000), rnd.randrange(1000)] for _ in range(n)]
+        cg_raster.bezier_points(p_list)  # 预热基表缓存
+        fixed = best_time(lambda: alg.curve_points_fixed(p_list, 'Bezier'), repeat)
+        adapt = best_time(lambda: alg.curve_points(p_list, 'Bezier'), repeat)
+        vector = best_time(lambda: cg_raster.bezier_points(p_list), repeat)
+        print('{:>6} {:>9.2f} {:>9.2f} {:>9.2f}'.format(n, fixed * 1000, adapt * 1000, vector * 1000))
+
+
+def same_pixels(a, b):
+    """两组像素（忽略顺序和重复）是否相同
+    """
+    return np.array_equal(np.unique(cg_raster.to_array(a), axis=0), np.unique(cg_raster.to_array(b), axis=0))
+
+
+def micro_cases(count, seed):
+    """微基准：(名称, 参考实现, 快速实现, 一致性检查)；检查为None表示两者本就不要求逐像素一致
+    """
+    rnd = random.Random(seed)
+    coord = lambda: [rnd.randrange(-100, 1100), rnd.randrange(-100, 1100)]
+    segments = [[coord(), coord()] for _ in range(count)]
+    # 参考实现的Liang-Barsky在线段平行于窗口边时会除零，只用一般位置的线段
+    oblique = [s for s in segments if s[0][0] != s[1][0] and s[0][1] != s[1][1]]
+    boxes = [[coord(), coord()] for _ in range(max(count // 10, 1))]
+    polygons = [[coord() for _ in range(rnd.randrange(3, 13))] for _ in range(max(count // 10, 1))]
+    curves = [[coord() for _ in range(rnd.randrange(4, 12))] for _ in range(max(count // 50, 1))]
+    # 参考实现逐像素生成列表，填充多边形取较小的尺寸
+    fills = [[[rnd.randrange(300), rnd.randrange(300)] for _ in range(rnd.randrange(3, 13))]
+             for _ in range(max(count // 50, 1))]
+    window = (200, 150, 800, 850)
+    convex = [[200, 150], [800, 150], [800, 850], [200, 850]]
+    cases = []
+    for algorithm in ('DDA', 'Bresenham'):
+        cases.append(('line.' + algorithm,
+                      lambda a=algorithm: [p for s in segments for p in alg.draw_line(s, a)],
+                      lambda a=algorithm: cg_raster.draw_lines(segments, a),
+                      lambda ref, fast: np.array_equal(cg_raster.to_array(ref), fast)))
+    cases.append(('polygon.Bresenham',
+                  lambda: [p for q in polygons for p in alg.draw_polygon(q, 'Bresenham')],
+                  lambda: np.concatenate([cg_raster.draw_polygon(q, 'Bresenham') for q in polygons]),
+                  same_pixels))
+    cases.append(('ellipse.midpoint',
+                  lambda: [p for b in boxes for p in alg.draw_ellipse(b, 'midpoint')],
+                  lambda: cg_raster.draw_ellipses(boxes),
+                  same_pixels))
+    for algorithm in ('Bezier', 'B-spline'):
+        # 参考实现的自适应细分与快速实现的采样位置不同，像素不要求一致；
+        # 一致性检查与按快速实现的采样位置精确计算的参考像素（见reference_pixels）对比
+        cases.append(('curve.' + algorithm,
+                      lambda a=algorithm: [p for q in curves for p in alg.draw_curve(q, a)],
+                      lambda a=algorithm: [cg_raster.draw_curve(q, a) for q in curves],
+                      lambda ref, fast, a=algorithm: all(same_pixels(reference_pixels('curve', q, a), f)
+                                                         for q, f in zip(curves, fast))))
+    for rule in ('even-odd', 'nonzero'):
+        cases.append(('fill.' + rule,
+                      lambda r=rule: [p for q in fills for p in cg_raster.reference_dict['filled_polygon'](q, r)],
+                      lambda r=rule: [cg_raster.rasterize('filled_polygon', q, r) for q in fills],
+                      lambda ref, fast: same_pixels(ref, cg_raster.span_pixels(np.concatenate(fast)))))
+    for algorithm in ('Cohen-Sutherland', 'Liang-Barsky'):
+        cases.append(('clip.' + algorithm,
+                      lambda a=algorithm: [alg.clip(s, *window, a) for s in oblique],
+                      lambda a=algorithm: cg_raster.clip_lines(oblique, window, a),
+                      lambda ref, fast: [r for r in ref if r] ==
+                      [[s[:2], s[2:]] for s in fast[0].tolist()]))
+    cases.append(('clip_polygon.Sutherland-Hodgman',
+                  lambda: [alg.polygon_clip_convex(q, convex) for q in polygons],
+                  lambda: [cg_raster.clip_polygon(q, convex) for q in polygons],
+                  lambda ref, fast: ref == [f.tolist() for f in fast]))
+    cases.append(('clip_polygon.Liang-Barsky',
+                  lambda: [alg.polygon_clip(q, *window) for q in polygons],
+                  lambda: [cg_raster.polygon_clip(q, *window) for q in polygons],
+                  lambda ref, fast: ref == [f.tolist() for f in fast]))
+    return cases
+
+
+def bench_micro(count, repeat, seed):
+    """各算法参考实现（cg_algorithms）与快速实现（cg_raster）的用时和一致性
+
+    :return: (dict) 名称 -> {'ref_ms', 'fast_ms', 'speedup', 'exact'}
+    """
+    results = {}
+    print('{:<32} {:>10} {:>10} {:>8} {:>6}'.format('case', 'ref_ms', 'fast_ms', 'speedup', 'exact'))
+    for name, ref, fast, check in micro_cases(count, seed):
+        exact = None if check is None else bool(check(ref(), fast()))
+        ref_time = best_time(ref, repeat)
+        fast_time = best_time(fast, repeat)
+        results[name] = {'ref_ms': ref_time * 1000, 'fast_ms': fast_time * 1000,
+                         'speedup': ref_time / fast_time if fast_time > 0 else float('inf'), 'exact': exact}
+        print('{:<32} {:>10.2f} {:>10.2f} {:>8.1f} {:>6}'.format(
+            name, ref_time * 1000, fast_time * 1000, results[name]['speedup'], '-' if exact is None else str(exact)))
+    return results
+
+
+E2E_MODES = {
+    'serial': [],
+    'cache': ['--cache'],
+    'jobs': ['-j', '2'],
+    'tiles': ['--tile-size', '256', '-j', '2'],
+    'mmap': ['--mmap'],
+}
+
+
+def reference_images(text):
+    """在本进程中执行指令，每次保存时用cg_algorithms的参考实现逐像素绘制画布
+
+    曲线的采样位置（等分数或细分位置）取cg_raster的结果，各采样点由reference_curve精确计算后取整、
+    再用cg_algorithms.draw_line连接；两次保存之间没有变化的图元的像素只计算一次
+
+    :return: (dict) 画布名 -> numpy.ndarray
+    """
+    import cg_cli
+    scene = cg_cli.Scene(None)
+    images = {}
+    computed = {}
+    for command in cmd.CommandReader(io.StringIO(text)):
+        if not isinstance(command, cmd.SaveCanvas):
+            scene.execute(command)
+            continue
+        scene.apply_all()
+        image = np.full((scene.height, scene.width, 3), 255, np.uint8)
+        for item_type, p_list, algorithm, color in scene.item_dict.values():
+            p_list = cg_raster.as_list(p_list)
+            key = (item_type, algorithm, str(p_list))
+            if key not in computed:
+                computed[key] = np.array(reference_pixels(item_type, p_list, algorithm), np.int64).reshape(-1, 2)
+            x, y = computed[key].T
+            inside = (0 <= x) & (x < scene.width) & (0 <= y) & (y < scene.height)
+            image[scene.height - 1 - y[inside], x[inside]] = color
+        images[command.name] = image
+    return images
+
+
+def reference_pixels(item_type, p_list, algorithm):
+    """图元的参考像素，由cg_algorithms中的实现逐像素计算
+    """
+    if item_type == 'curve':
+        points = reference_curve(p_list, algorithm)
+        if len(points) == 1:
+            return alg.draw_line(points * 2, 'Bresenham')
+        return [p for a, b in zip(points, points[1:]) for p in alg.draw_line([a, b], 'Bresenham')]
+    return [[round(x), round(y)] for x, y in cg_raster.reference_dict[item_type](p_list, algorithm)]
+
+
+def reference_curve(p_list, algorithm, order=4):
+    """曲线的采样点，与cg_raster.curve_points的结果对比
+
+    只从cg_raster取得采样参数；各采样点在同样以偶数坐标为原点的局部坐标中由cg_raster.round_curve_point
+    用整数运算精确计算并取整（不经过快速实现的浮点矩阵乘法），加回原点后去掉相邻的重复点
+
+    :return: (list of list of int) 采样点坐标
+    """
+    if not p_list or algorithm not in ('Bezier', 'B-spline'):
+        return alg.curve_points(p_list, algorithm)
+    ox = min(x for x, y in p_list) // 2 * 2
+    oy = min(y for x, y in p_list) // 2 * 2
+    local = [[x - ox, y - oy] for x, y in p_list]
+    if algorithm == 'B-spline':
+        samples, keys, den = cg_raster.bspline_points(local, order=order)
+        segments = len(local) - order + 1
+    else:
+        samples, keys, den = cg_raster.bezier_points(local)
+        segments = 1
+    points = []
+    # 第i个采样点位于参数u = keys[i] / den，第j段对应u∈[j, j + 1]
+    for u in (range(len(samples)) if keys is None else keys.tolist()):
+        segment = min(u // den, segments - 1)
+        x, y = cg_raster.round_curve_point(local, algorithm, segment, u - segment * den, den, order)
+        p = [x + ox, y + oy]
+        if not points or points[-1] != p:
+            points.append(p)
+    return points
+
+
+def bench_e2e(configs, repeat, seed, modes):
+    """端到端测试：生成场景文件，以各种模式运行cg_cli.py，比较用时；
+    检查各模式输出的位图与串行模式逐字节相同，且串行模式与参考实现逐像素相同
+
+    :param configs: (list of (mix, items, width, height)) 场景参数
+    :return: (dict) 名称 -> {'seconds', 'exact'}
+    """
+    from PIL import Image
+    results = {}
+    cli = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cg_cli.py')
+    print('{:<44} {:>9} {:>6}'.format('case', 'seconds', 'exact'))
+    with tempfile.TemporaryDirectory() as tmp:
+        for mix, items, width, height in configs:
+            text = generate_scene(items, width, height, mix, seed, MIX_SAVES.get(mix, 1))
+            path = os.path.join(tmp, '{}-{}.txt'.format(mix, items))
+            with open(path, 'w') as fp:
+                fp.write(text)
+            reference = reference_images(text)
+            outputs = {}
+            for mode in modes:
+                out_dir = os.path.join(tmp, mode)
+                os.makedirs(out_dir, exist_ok=True)
+                seconds = best_time(lambda: subprocess.run([sys.executable, cli, path, out_dir] + E2E_MODES[mode],
+                                                           check=True, stdout=subprocess.DEVNULL), repeat)
+                outputs[mode] = {name: open(os.path.join(out_dir, name + '.bmp'), 'rb').read() for name in reference}
+                if mode == modes[0]:
+                    exact = all(np.array_equal(np.array(Image.open(os.path.join(out_dir, name + '.bmp'))), image)
+                                for name, image in reference.items())
+                else:
+                    exact = outputs[mode] == outputs[modes[0]]
+                name = 'e2e.{}.{}x{}x{}.{}'.format(mix, items, width, height, mode)
+                results[name] = {'seconds': seconds, 'exact': exact}
+                print('{:<44} {:>9.3f} {:>6}'.format(name, seconds, str(exact)))
+    return results
+
+
+# 冷启动测试使用的小指令文件
+STARTUP_SCRIPTS = {
+    'empty': '',
+    'no-save': 'resetCanvas 100 100\nsetColor 255 0 0\n',
+    'save': 'resetCanvas 100 100\nsetColor 255 0 0\ndrawLine line1 0 0 99 99 DDA\n'
+            'drawEllipse ellipse1 10 10 90 60\nsaveCanvas small\n',
+}
+
+
+def import_times(command):
+    """用-X importtime运行命令，统计各顶层模块（含其导入的模块）的导入用时
+
+    :param command: (list of string) 以Python解释器开头的命令
+    :return: (dict) 模块名 -> 毫秒
+    """
+    output = subprocess.run(command[:1] + ['-X', 'importtime'] + command[1:], check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True).stderr
+    times = {}
+    for line in output.splitlines():
+        fields = line.split('|')
+        # 模块名没有缩进的是顶层导入
+        if len(fields) == 3 and fields[1].strip().isdigit() and not fields[2].startswith('  '):
+            times[fields[2].strip()] = int(fields[1]) / 1000
+    return times
+
+
+def bench_startup(repeat):
+    """冷启动测试：以几个小指令文件多次运行cg_cli.py，取最短用时，并列出导入用时最多的模块
+
+    :return: (dict) 名称 -> {'seconds', 'import_ms'}
+    """
+    results = {}
+    cli = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cg_cli.py')
+    print('{:<24} {:>9} {:>10}  {}'.format('case', 'seconds', 'import_ms', 'slowest imports'))
+    with tempfile.TemporaryDirectory() as tmp:
+        commands = {'interpreter': [sys.executable, '-c', 'pass']}
+        for name, text in STARTUP_SCRIPTS.items():
+            path = os.path.join(tmp, name + '.txt')
+            with open(path, 'w') as fp:
+                fp.write(text)
+            commands[name] = [sys.executable, cli, path, tmp]
+        for name, command in commands.items():
+            seconds = best_time(lambda: subprocess.run(command, check=True, stdout=subprocess.DEVNULL), repeat)
+            imports = import_times(command)
+            slowest = sorted(imports, key=imports.get, reverse=True)[:3]
+            results['startup.' + name] = {'seconds': seconds, 'import_ms': sum(imports.values())}
+            print('{:<24} {:>9.3f} {:>10.1f}  {}'.format('startup.' + name, seconds, sum(imports.values()),
+                                                        ', '.join('{} {:.1f}'.format(m, imports[m]) for m in slowest)))
+    return results
+
+
+def compare_baseline(results, baseline, threshold):
+    """与基线对比用时，打印变慢超过threshold的项
+
+    :param threshold: (float) 允许的相对变慢比例，如0.1表示10%
+    :return: (int) 变慢的项数
+    """
+    slower = 0
+    print('{:<44} {:>10} {:>10} {:>7}'.format('case', 'baseline', 'current', 'ratio'))
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        key = 'fast_ms' if 'fast_ms' in result else 'seconds'
+        old, new = baseline[name][key], result[key]
+        ratio = new / old if old > 0 else float('inf')
+        mark = ''
+        if ratio > 1 + threshold:
+            mark = ' slower'
+            slower += 1
+        print('{:<44} {:>10.3f} {:>10.3f} {:>7.2f}{}'.format(name, old, new, ratio, mark))
+    return slower
+
+
+def report(results, args):
+    """保存JSON结果并与基线对比；存在不一致的项时返回1
+    """
+    if args.json:
+        meta = {'python': platform.python_version(), 'numpy': np.__version__,
+                'machine': platform.machine(), 'seed': args.seed, 'time': time.strftime('%Y-%m-%d %H:%M:%S')}
+        with open(args.json, 'w') as fp:
+            json.dump({'meta': meta, 'results': results}, fp, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fp:
+            compare_baseline(results, json.load(fp)['results'], args.threshold)
+    failed = [name for name, result in results.items() if result.get('exact') is False]
+    if failed:
+        print('pixel mismatch: ' + ', '.join(failed))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='性能测试')
+    subparsers = parser.add_subparsers(dest='bench')
+    parse_parser = subparsers.add_parser('parse', help='指令解析速度')
+    parse_parser.add_argument('--lines', type=int, default=200000)
+    parse_parser.add_argument('--repeat', type=int, default=3)
+    curve_parser = subparsers.add_parser('curve', help='曲线固定步长采样与自适应细分的对比')
+    curve_parser.add_argument('--count', type=int, default=20)
+    curve_parser.add_argument('--tolerance', type=float, default=alg.CURVE_TOLERANCE)
+    curve_parser.add_argument('--repeat', type=int, default=3)
+    bezier_parser = subparsers.add_parser('bezier', help='Bezier曲线采样点计算的对比')
+    bezier_parser.add_argument('--sizes', type=int, nargs='+', default=[4, 10, 25, 50, 100, 200])
+    bezier_parser.add_argument('--repeat', type=int, default=3)
+    scene_parser = subparsers.add_parser('scene', help='生成场景指令文件')
+    scene_parser.add_argument('output', help='输出路径，-表示标准输出')
+    scene_parser.add_argument('--mix', choices=sorted(SCENE_MIXES), default='mixed')
+    scene_parser.add_argument('--items', type=int, default=1000)
+    scene_parser.add_argument('--size', type=int, nargs=2, default=[1000, 1000], metavar=('W', 'H'))
+    scene_parser.add_argument('--saves', type=int, default=1)
+    scene_parser.add_argument('--seed', type=int, default=0)
+    for name, help_text in (('micro', '各算法参考实现与快速实现的对比'), ('e2e', '端到端运行cg_cli.py'),
+                            ('startup', 'cg_cli.py的冷启动用时')):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('--repeat', type=int, default=10 if name == 'startup' else 3)
+        sub.add_argument('--seed', type=int, default=0)
+        sub.add_argument('--json', metavar='PATH', help='将结果保存为JSON')
+        sub.add_argument('--baseline', metavar='PATH', help='与之前保存的JSON结果对比')
+        sub.add_argument('--threshold', type=float, default=0.1, help='视为变慢的相对比例')
+        if name == 'micro':
+            sub.add_argument('--count', type=int, default=2000, help='线段数，其他图元数按比例')
+        elif name == 'e2e':
+            sub.add_argument('--mixes', nargs='+', choices=sorted(SCENE_MIXES), default=sorted(SCENE_MIXES))
+            sub.add_argument('--items', type=int, nargs='+', default=[200, 2000])
+            sub.add_argument('--size', type=int, nargs=2, default=[1000, 1000], metavar=('W', 'H'))
+            sub.add_argument('--modes', nargs='+', choices=list(E2E_MODES), default=list(E2E_MODES),
+                             help='第一个模式与参考实现对比，其余与第一个对比')
+    args = parser.parse_args()
+    if args.bench == 'parse':
+        bench_parse(args.lines, args.repeat)
+    elif args.bench == 'curve':
+        bench_curve(args.count, args.tolerance, args.repeat)
+    elif args.bench == 'bezier':
+        bench_bezier(args.sizes, args.repeat)
+    elif args.bench == 'scene':
+        text = generate_scene(args.items, args.size[0], args.size[1], args.mix, args.seed, args.saves)
+        if args.output == '-':
+            sys.stdout.write(text)
+        else:
+            with open(args.output, 'w') as fp:
+                fp.write(text)
+    elif args.bench == 'micro':
+        sys.exit(report(bench_micro(args.count, args.repeat, args.seed), args))
+    elif args.bench == 'e2e':
+        configs = [(mix, items, args.size[0], args.size[1]) for mix in args.mixes for items in args.items]
+        sys.exit(report(bench_e2e(configs, args.repeat, args.seed, args.modes), args))
+    elif args.bench == 'startup':
+        sys.exit(report(bench_startup(args.repeat), args))
+    else:
+        parser.print_help()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 24位BMP文件的直接写入（依赖numpy），cg_cli保存画布时不需要PIL
+# 文件头与PIL保存的BMP逐字节相同；像素区可以通过numpy.memmap映射到输出文件，
+# 绘制时直接写入文件而不在内存中保留整张画布
+import struct
+
+import numpy as np
+
+
+HEADER_SIZE = 14 + 40
+PIXELS_PER_METER = 3780  # 96 dpi
+
+
+def row_size(width):
+    """每行像素占用的字节数，按4字节对齐
+    """
+    return (width * 3 + 3) & ~3
+
+
+def header(width, height):
+    """BMP文件头（BITMAPFILEHEADER + BITMAPINFOHEADER）
+    """
+    image_size = row_size(width) * height
+    return struct.pack('<2sIHHI', b'BM', HEADER_SIZE + image_size, 0, 0, HEADER_SIZE) + \
+        struct.pack('<IiiHHIIiiII', 40, width, height, 1, 24, 0, image_size,
+                    PIXELS_PER_METER, PIXELS_PER_METER, 0, 0)
+
+
+def save(path, image, chunk_bytes=1 << 22):
+    """将画布保存为BMP文件，与PIL的Image.fromarray(image).save(path, 'bmp')逐字节相同
+    按块写入：每次将若干行翻转、填充到同一个缓冲区后直接写入文件，额外内存不超过一块
+
+    :param path: (string) 输出文件路径
+    :param image: (numpy.ndarray of uint8, shape (height, width, 3)) 画布，第0行对应y=height-1
+    :param chunk_bytes: (int) 每块的大致字节数
+    """
+    height, width = image.shape[:2]
+    stride = row_size(width)
+    rows = max(1, min(height, chunk_bytes // stride))
+    buffer = np.zeros((rows, stride), np.uint8)
+    pixels = buffer[:, :width * 3].reshape(rows, width, 3)
+    with open(path, 'wb') as fp:
+        fp.write(header(width, height))
+        # 文件自下而上存储各行，从画布的最后一行开始
+        for end in range(height, 0, -rows):
+            n = min(rows, end)
+            pixels[:n] = image[end - n:end][::-1, :, ::-1]
+            fp.write(buffer[:n].data)
+
+
+def create(path, width, height):
+    """创建全零的BMP文件，并将其像素区映射为画布
+
+    BMP按自下而上的顺序存储各行、按BGR顺序存储颜色，因此将文件中的行和颜色通道都反转后，
+    得到的视图与cg_cli中的画布布局一致（第0行对应y=height-1，颜色为RGB）
+
+    :param path: (string) 输出文件路径
+    :return: (numpy.ndarray of uint8, shape (height, width, 3)) 映射到文件的画布视图
+    """
+    stride = row_size(width)
+    with open(path, 'wb') as fp:
+        fp.write(header(width, height))
+        fp.truncate(HEADER_SIZE + stride * height)
+    return open_canvas(path, width, height)
+
+
+def open_canvas(path, width, height):
+    """将已创建的BMP文件的像素区映射为画布，可在多个进程中同时打开
+
+    :return: (numpy.ndarray of uint8, shape (height, width, 3)) 映射到文件的画布视图
+    """
+    stride = row_size(width)
+    mm = np.memmap(path, np.uint8, 'r+', offset=HEADER_SIZE, shape=(height, stride))
+    rows = np.ndarray((height, width, 3), np.uint8, buffer=mm, strides=(stride, 3, 1))
+    return rows[::-1, :, ::-1]
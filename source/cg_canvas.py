@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 增量画布（依赖numpy，供cg_cli使用）
+import logging
+
+import numpy as np
+
+import cg_profile
+import cg_raster
+from cg_index import intersects
+
+
+def merge_regions(regions):
+    """将相交的矩形合并为它们的包围矩形，直到两两不相交
+    """
+    merged = []
+    for region in regions:
+        while True:
+            for other in merged:
+                if intersects(region, other):
+                    merged.remove(other)
+                    region = (min(region[0], other[0]), min(region[1], other[1]),
+                              max(region[2], other[2]), max(region[3], other[3]))
+                    break
+            else:
+                break
+        merged.append(region)
+    return merged
+
+
+class Canvas:
+    """
+    增量画布
+    记录每个图元上次的光栅结果（水平线段）和包围盒，保存时只重绘自上次保存以来变化过的图元所覆盖的区域
+    """
+    def __init__(self, width, height, cache=None, profiler=None):
+        """
+        :param cache: (cg_raster.RasterCache) 光栅缓存，None表示不使用缓存
+        :param profiler: (cg_profile.Profiler) 记录每个图元光栅化和写入画布的耗时，None表示不记录
+        """
+        self.width = width
+        self.height = height
+        self.image = np.zeros([height, width, 3], np.uint8)
+        self.rasters = {}  # item_id -> (spans, bbox)
+        self.rasterize = cache.rasterize if cache is not None else cg_raster.rasterize
+        self.profiler = profiler
+        self.dirty = set()
+        self.clean = False
+        self.repainted = 0  # 累计重绘的像素数
+        self.full_redraw = 0  # 每次都全量重绘时累计需要重绘的像素数
+
+    def invalidate(self, item_id):
+        """标记图元已被绘制、变换、裁剪或删除
+        """
+        self.dirty.add(item_id)
+
+    def _rasterize(self, item_id, item):
+        item_type, p_list, algorithm, color = item
+        if self.profiler is None:
+            spans = self.rasterize(item_type, p_list, algorithm)
+        else:
+            keys = ('item', item_id), ('algorithm', algorithm), ('item_type', item_type), ('stage', 'rasterize')
+            with self.profiler.span(item_id, 'rasterize', keys, algorithm=algorithm) as record:
+                spans = self.rasterize(item_type, p_list, algorithm)
+                record['pixels'] = cg_raster.pixel_count(spans)
+        self.rasters[item_id] = spans, cg_raster.bounding_box(spans)
+
+    def render(self, item_dict, index=None):
+        """将画布更新到item_dict的当前状态
+
+        :param item_dict: (dict: item_id -> [item_type, p_list, algorithm, color]) 按绘制顺序排列的图元
+        :param index: (cg_index.GridIndex) 与item_dict同步的空间索引，重绘区域时只检查索引查到的图元；
+                      None表示逐个检查所有图元
+        :return: (numpy.ndarray of uint8, shape (height, width, 3)) 画布图像
+        """
+        if not self.clean:
+            self.rasters = {}
+            if self.rasterize is cg_raster.rasterize and self.profiler is None:
+                for item_id, spans in zip(item_dict, cg_raster.rasterize_all(list(item_dict.values()))):
+                    self.rasters[item_id] = spans, cg_raster.bounding_box(spans)
+            else:
+                for item_id, item in item_dict.items():
+                    self._rasterize(item_id, item)
+            with cg_profile.stage(self.profiler, 'paint'):
+                self.image.fill(255)
+                cg_raster.paint_all(self.image, ((self.rasters[item_id][0], item[3])
+                                                 for item_id, item in item_dict.items()))
+            self.repainted += self.width * self.height
+            self.clean = True
+        else:
+            regions = []
+            for item_id in self.dirty:
+                if item_id in self.rasters:
+                    regions.append(self.rasters.pop(item_id)[1])
+                if item_id in item_dict:
+                    self._rasterize(item_id, item_dict[item_id])
+                    regions.append(self.rasters[item_id][1])
+            regions = [r for r in regions if r is not None]
+            with cg_profile.stage(self.profiler, 'paint'):
+                for region in merge_regions(regions):
+                    self._repaint(region, item_dict, index)
+        self.dirty.clear()
+        self.full_redraw += self.width * self.height
+        if logging.getLogger().isEnabledFor(logging.INFO):
+            logging.info('repainted {} of {} pixels, rasters use {} bytes'.format(
+                self.repainted, self.full_redraw, sum(spans.nbytes for spans, bbox in self.rasters.values())))
+        return self.image
+
+    def _repaint(self, region, item_dict, index=None):
+        """重绘一个矩形区域：先涂白，再按绘制顺序写入与之相交的图元
+        """
+        x_min, y_min = max(region[0], 0), max(region[1], 0)
+        x_max, y_max = min(region[2], self.width - 1), min(region[3], self.height - 1)
+        if x_min > x_max or y_min > y_max:
+            return
+        region = x_min, y_min, x_max, y_max
+        self.image[self.height - 1 - y_max:self.height - y_min, x_min:x_max + 1] = 255
+        rasters = []
+        item_ids = index.query_rect(region) if index is not None else item_dict
+        for item_id in item_ids:
+            spans, bbox = self.rasters[item_id]
+            if bbox is not None and intersects(bbox, region):
+                rasters.append((spans, item_dict[item_id][3]))
+        cg_raster.paint_all(self.image, rasters, region)
+        self.repainted += (x_max - x_min + 1) * (y_max - y_min + 1)
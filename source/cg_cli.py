@@ -1,123 +1,452 @@
 #!/usr/bin/env python
 # -*- coding:utf-8 -*-
 
-import sys
+import argparse
+import collections
+import importlib.util
 import os
+import sys
 import cg_algorithms as alg
-import numpy as np
+import cg_command as cmd
+import cg_index
 import logging
-from PIL import Image
+
+
+def lazy_import(name):
+    """模块在第一次访问其属性时才真正导入
+    依赖numpy的模块都这样导入，不绘制、不保存的运行不需要导入numpy，缩短启动时间
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+cg_bmp = lazy_import('cg_bmp')
+cg_canvas = lazy_import('cg_canvas')
+cg_profile = lazy_import('cg_profile')
+cg_raster = lazy_import('cg_raster')
+cg_snapshot = lazy_import('cg_snapshot')
+cg_store = lazy_import('cg_store')
+cg_tiles = lazy_import('cg_tiles')
+
+# 顶点数不少于此值的多边形才用cg_raster中的numpy实现裁剪；numpy版本每次调用有约0.3毫秒的固定开销，
+# 两种裁剪算法都在300~400个顶点处与cg_algorithms中的纯Python实现持平
+VECTORIZED_CLIP_VERTICES = 320
+
+worker_cache = None
+
+
+def init_worker(cache_bytes):
+    """进程池中每个工作进程的初始化：按需创建本进程的光栅缓存
+    """
+    global worker_cache
+    worker_cache = cg_raster.RasterCache(cache_bytes) if cache_bytes else None
+
+
+def save_mapped(width, height, items, path):
+    """在映射到输出文件的画布上直接绘制，不在内存中保留整张画布
+    """
+    canvas = cg_bmp.create(path, width, height)
+    canvas.fill(255)
+    cg_raster.render(canvas, items)
+
+
+def save_snapshot(width, height, item_dict, path, mapped):
+    """在工作进程中重绘画布快照并保存为位图
+    """
+    if mapped:
+        save_mapped(width, height, item_dict.values(), path)
+        return
+    image = cg_canvas.Canvas(width, height, worker_cache).render(item_dict)
+    cg_bmp.save(path, image)
+
+
+class Scene:
+    """
+    命令行程序的绘图状态：画布大小、画笔颜色以及按绘制顺序排列的图元
+    平移、旋转、缩放只将变换矩阵累乘到图元尚未应用的矩阵上，在保存画布或裁剪前一次性应用并取整，
+    避免逐条指令遍历参数以及多次取整累积的误差
+    """
+    def __init__(self, output_dir, cache=None, pool=None, max_pending=4, jobs=1, tile_size=0, mapped=False,
+                 profiler=None):
+        """
+        :param pool: (concurrent.futures.Executor) 用于并行保存画布的进程池，None表示在本进程中依次保存
+        :param max_pending: (int) 进程池中未完成的保存任务数上限
+        :param jobs: (int) 分块绘制使用的进程数
+        :param tile_size: (int) 分块绘制时块的边长，0表示不分块
+        :param mapped: (bool) 是否将画布映射到输出文件直接绘制（见cg_bmp）
+        :param profiler: (cg_profile.Profiler) 记录每条指令的耗时，None表示不记录
+        """
+        self.output_dir = output_dir
+        self.cache = cache
+        self.pool = pool
+        self.max_pending = max_pending
+        self.jobs = jobs
+        self.tile_size = tile_size
+        self.mapped = mapped
+        self.profiler = profiler
+        self.pending = collections.deque()  # (输出文件路径, 保存任务的future)
+        self._item_dict = None
+        self._canvas = None
+        self.transforms = {}  # item_id -> 尚未应用到参数上的3x3仿射矩阵
+        self.bboxes = {}  # item_id -> 当前参数（不含未应用的矩阵）的包围盒
+        self.index = cg_index.GridIndex()  # 含未应用矩阵的包围盒
+        self.pen_color = [0, 0, 0]
+        self.width = 0
+        self.height = 0
+
+    @property
+    def item_dict(self):
+        """按绘制顺序排列的图元（cg_store.ItemStore），第一次使用时才创建
+        """
+        if self._item_dict is None:
+            self._item_dict = cg_store.ItemStore()
+        return self._item_dict
+
+    @item_dict.setter
+    def item_dict(self, item_dict):
+        self._item_dict = item_dict
+
+    @property
+    def canvas(self):
+        """增量画布（cg_canvas.Canvas），第一次使用时才按当前画布大小创建
+        """
+        if self._canvas is None:
+            self._canvas = cg_canvas.Canvas(self.width, self.height, self.cache, self.profiler)
+        return self._canvas
+
+    @canvas.setter
+    def canvas(self, canvas):
+        self._canvas = canvas
+
+    def execute(self, command):
+        if self.profiler is None:
+            handler_dict[type(command)](self, command)
+            return
+        name = type(command).__name__
+        keys = [('command', name)]
+        if hasattr(command, 'item_id'):
+            keys.append(('item', command.item_id))
+        if hasattr(command, 'algorithm'):
+            keys.append(('algorithm', command.algorithm))
+        with self.profiler.span(name, 'command', keys):
+            handler_dict[type(command)](self, command)
+
+    def reset_canvas(self, command):
+        self.width = command.width
+        self.height = command.height
+        self.item_dict = None
+        self.transforms = {}
+        self.bboxes = {}
+        self.index = cg_index.GridIndex()
+        self.canvas = None
+
+    def save_canvas(self, command):
+        path = os.path.join(self.output_dir, command.name + '.bmp')
+        self.apply_all()
+        if self.tile_size:
+            with cg_profile.stage(self.profiler, 'render'):
+                image = cg_tiles.render(self.width, self.height, list(self.item_dict.values()),
+                                        self.jobs, self.tile_size, path=path if self.mapped else None)
+            if not self.mapped:
+                with cg_profile.stage(self.profiler, 'encode'):
+                    cg_bmp.save(path, image)
+            return
+        if self.pool is None and self.mapped:
+            with cg_profile.stage(self.profiler, 'render'):
+                save_mapped(self.width, self.height, self.item_dict.values(), path)
+            return
+        if self.pool is None:
+            image = self.canvas.render(self.item_dict, self.index)
+            with cg_profile.stage(self.profiler, 'encode'):
+                cg_bmp.save(path, image)
+            return
+        # 复制图元存储作为快照，之后的指令不会影响已提交的任务
+        snapshot = self.item_dict.copy()
+        # 限制未完成的任务数，使快照占用的内存有上界
+        while len(self.pending) >= self.max_pending:
+            self.pending.popleft()[1].result()
+        # 同名文件的保存依次进行：保存时会截断文件，不能与仍在写入或映射着该文件的任务重叠，也保证最后一次保存的结果留下
+        for other, future in self.pending:
+            if other == path:
+                future.result()
+        self.pending.append((path, self.pool.submit(save_snapshot, self.width, self.height, snapshot, path,
+                                                    self.mapped)))
+
+    def finish(self):
+        """等待所有并行保存的任务完成
+        """
+        while self.pending:
+            self.pending.popleft()[1].result()
+
+    def dump_scene(self, command):
+        self.dump(os.path.join(self.output_dir, command.name + '.scene'))
+
+    def load_scene(self, command):
+        self.load(os.path.join(self.output_dir, command.name + '.scene'))
+
+    def dump(self, path):
+        """将画布大小、画笔颜色、图元及尚未应用的变换保存为二进制场景文件（见cg_snapshot）
+        """
+        cg_snapshot.dump(path, self.width, self.height, self.pen_color, self.item_dict, self.transforms)
+
+    def load(self, path):
+        """读取dump保存的场景，替换当前的画布和图元，之后的指令如同在保存时的状态上继续执行
+        """
+        snapshot = cg_snapshot.load(path)
+        self.reset_canvas(cmd.ResetCanvas(snapshot.width, snapshot.height))
+        self.pen_color = snapshot.pen_color.tolist()
+        self.item_dict = snapshot.store
+        self.transforms = snapshot.transforms
+        item_ids, boxes = list(self.item_dict), self.item_dict.bboxes()
+        # 读取的存储没有空槽位，槽位即序号；没有参数点的图元包围盒为None（见reindex）
+        empty = self.item_dict.counts[:len(item_ids)] == 0
+        self.bboxes = {item_id: None if skip else tuple(bbox)
+                       for item_id, bbox, skip in zip(item_ids, boxes.tolist(), empty.tolist())}
+        for item_id, matrix in self.transforms.items():
+            if self.bboxes[item_id] is not None:
+                boxes[self.item_dict.slots[item_id]] = cg_index.transform_bbox(self.bboxes[item_id], matrix)
+        self.index.insert_many(item_ids, boxes, empty)
+
+    def set_color(self, command):
+        self.pen_color = [command.r, command.g, command.b]
+
+    def invalidate(self, item_id):
+        """标记图元需要重绘
+        增量画布只在串行保存时创建，尚未创建时（包括-j、--mmap、--tile-size方式）第一次保存本来就会全量绘制，不需要记录
+        """
+        if self._canvas is not None:
+            self._canvas.invalidate(item_id)
+
+    def draw(self, item_id, item_type, p_list, algorithm):
+        self.item_dict.add(item_id, item_type, p_list, algorithm, self.pen_color)
+        self.transforms.pop(item_id, None)
+        self.reindex(item_id)
+        self.invalidate(item_id)
+
+    def reindex(self, item_id):
+        """参数改变后更新图元的包围盒；没有参数点的图元（如不带坐标的drawPolygon）包围盒为None，在索引中只占据绘制顺序
+        """
+        item_type, p_list = self.item_dict[item_id][:2]
+        self.bboxes[item_id] = cg_raster.item_bbox(item_type, p_list)
+        self.index.insert(item_id, self.bboxes[item_id])
+
+    def draw_line(self, command):
+        self.draw(command.item_id, 'line', command.p_list, command.algorithm)
+
+    def draw_polygon(self, command):
+        self.draw(command.item_id, 'polygon', command.p_list, command.algorithm)
+
+    def draw_ellipse(self, command):
+        self.draw(command.item_id, 'ellipse', command.p_list, 'midpoint')
+
+    def draw_curve(self, command):
+        self.draw(command.item_id, 'curve', command.p_list, command.algorithm)
+
+    def fill_polygon(self, command):
+        self.draw(command.item_id, 'filled_polygon', command.p_list, command.rule)
+
+    def update(self, item_id, p_list):
+        """用变换或裁剪后的参数替换图元参数，参数为空时删除图元
+        """
+        if len(p_list):
+            self.item_dict.set_p_list(item_id, p_list)
+            self.reindex(item_id)
+        else:
+            del self.item_dict[item_id]
+            del self.bboxes[item_id]
+            self.transforms.pop(item_id, None)
+            self.index.remove(item_id)
+        self.invalidate(item_id)
+
+    def transform(self, item_id, matrix):
+        """将变换矩阵累乘到图元尚未应用的矩阵上
+        """
+        self.transforms[item_id] = alg.matrix_multiply(matrix, self.transforms.get(item_id, alg.IDENTITY))
+        if self.bboxes[item_id] is not None:
+            self.index.insert(item_id, cg_index.transform_bbox(self.bboxes[item_id], self.transforms[item_id]))
+        self.invalidate(item_id)
+
+    def apply(self, item_id):
+        """将图元尚未应用的矩阵一次性作用到参数上
+        """
+        matrix = self.transforms.pop(item_id, None)
+        if matrix is not None:
+            self.item_dict.set_p_list(item_id, cg_raster.transform(self.item_dict[item_id][1], matrix))
+            self.reindex(item_id)
+
+    def apply_all(self):
+        for item_id in list(self.transforms):
+            self.apply(item_id)
+
+    def translate(self, command):
+        self.transform(command.item_id, alg.translate_matrix(command.dx, command.dy))
+
+    def rotate(self, command):
+        if self.item_dict[command.item_id][0] == 'ellipse':
+            # 椭圆只由轴对齐包围框的两个角点表示，旋转角点并不是旋转椭圆本身；
+            # 平移和缩放保持包围框轴对齐，可以合并，旋转则保持逐条指令旋转角点并取整的原有结果
+            self.apply(command.item_id)
+            p_list = self.item_dict.p_list(command.item_id)
+            self.update(command.item_id, alg.rotate(p_list, command.x, command.y, -command.r))
+            return
+        self.transform(command.item_id, alg.rotate_matrix(command.x, command.y, -command.r))
+
+    def scale(self, command):
+        self.transform(command.item_id, alg.scale_matrix(command.x, command.y, command.s))
+
+    def window(self, command):
+        """裁剪指令的窗口 (x_min, y_min, x_max, y_max)
+        """
+        return (min(command.x_min, command.x_max), min(command.y_min, command.y_max),
+                max(command.x_min, command.x_max), max(command.y_min, command.y_max))
+
+    def clip_trivially(self, item_id, window):
+        """由包围盒判断裁剪结果：完全在窗口外时删除图元；完全在窗口内时不变
+
+        :return: (bool) 是否已经确定结果而无需裁剪
+        """
+        bbox = self.index.bbox(item_id)
+        if bbox is None or not cg_index.intersects(bbox, window):
+            self.update(item_id, [])
+            return True
+        return cg_index.contains(window, bbox)
+
+    def clip(self, command):
+        item_type = self.item_dict[command.item_id][0]
+        if item_type != 'line':
+            print('Cannot clip {} type'.format(item_type))
+        elif self.clip_trivially(command.item_id, self.window(command)):
+            return
+        self.apply(command.item_id)
+        p_list = self.item_dict.p_list(command.item_id)
+        self.update(command.item_id, alg.clip(p_list, command.x_min, command.y_min,
+                                              command.x_max, command.y_max, command.algorithm))
+
+    def clip_polygon(self, command):
+        item_type = self.item_dict[command.item_id][0]
+        if item_type not in ('polygon', 'filled_polygon'):
+            print('Wrong shape type.')
+        elif self.clip_trivially(command.item_id, self.window(command)):
+            return
+        self.apply(command.item_id)
+        p_list = self.item_dict[command.item_id][1]
+        vectorized = len(p_list) >= VECTORIZED_CLIP_VERTICES
+        if not vectorized:
+            p_list = p_list.tolist()
+        if command.algorithm == 'Sutherland-Hodgman':
+            x_min, y_min, x_max, y_max = self.window(command)
+            window = [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+            clip = cg_raster.clip_polygon if vectorized else alg.polygon_clip_convex
+            self.update(command.item_id, clip(p_list, window))
+        elif command.algorithm == 'Liang-Barsky':
+            clip = cg_raster.polygon_clip if vectorized else alg.polygon_clip
+            self.update(command.item_id, clip(p_list, command.x_min, command.y_min, command.x_max, command.y_max))
+        else:
+            print('Invalid algorithm: ' + command.algorithm)
+
+    def clip_all(self, command):
+        """一次裁剪所有线段图元；包围盒完全在窗口外或窗口内的线段由空间索引直接确定
+        """
+        window = self.window(command)
+        nearby = set(self.index.query_rect(window))
+        line_ids = []
+        for item_id in self.item_dict.ids_of_type('line'):
+            if item_id not in nearby:
+                self.update(item_id, [])
+            elif not cg_index.contains(window, self.index.bbox(item_id)):
+                line_ids.append(item_id)
+        if len(line_ids) == 0:
+            return
+        for item_id in line_ids:
+            self.apply(item_id)
+        segments = [self.item_dict[item_id][1] for item_id in line_ids]
+        clipped, index = cg_raster.clip_lines(segments, command[:4], command.algorithm)
+        kept = dict(zip(index.tolist(), clipped.tolist()))
+        for i, item_id in enumerate(line_ids):
+            segment = kept.get(i)
+            self.update(item_id, [segment[:2], segment[2:]] if segment is not None else [])
+
+
+handler_dict = {
+    cmd.ResetCanvas: Scene.reset_canvas,
+    cmd.SaveCanvas: Scene.save_canvas,
+    cmd.SetColor: Scene.set_color,
+    cmd.DrawLine: Scene.draw_line,
+    cmd.DrawPolygon: Scene.draw_polygon,
+    cmd.DrawEllipse: Scene.draw_ellipse,
+    cmd.DrawCurve: Scene.draw_curve,
+    cmd.FillPolygon: Scene.fill_polygon,
+    cmd.Translate: Scene.translate,
+    cmd.Rotate: Scene.rotate,
+    cmd.Scale: Scene.scale,
+    cmd.Clip: Scene.clip,
+    cmd.ClipPolygon: Scene.clip_polygon,
+    cmd.ClipAll: Scene.clip_all,
+    cmd.DumpScene: Scene.dump_scene,
+    cmd.LoadScene: Scene.load_scene,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='读取指令文件绘制图元并保存画布')
+    parser.add_argument('input_file', help='指令文件路径，-表示标准输入，.gz文件自动解压')
+    parser.add_argument('output_dir', help='图像保存目录')
+    parser.add_argument('--cache', action='store_true', help='启用图元光栅缓存')
+    parser.add_argument('--cache-size', type=float, default=64, metavar='MB', help='光栅缓存的内存上限（MB）')
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N', help='并行保存画布的进程数')
+    parser.add_argument('--tile-size', type=int, default=0, metavar='N',
+                        help='将画布分为边长N像素的块，由--jobs个进程并行绘制（适用于很大的画布）')
+    parser.add_argument('--mmap', action='store_true',
+                        help='直接在映射到输出文件的画布上绘制，峰值内存与画布大小基本无关')
+    parser.add_argument('--load-scene', metavar='SCENE', help='执行指令前先读取dumpScene保存的场景文件')
+    parser.add_argument('--dump-scene', metavar='SCENE', help='执行完所有指令后将场景保存到该文件')
+    parser.add_argument('--profile', metavar='TRACE',
+                        help='记录每条指令、算法和图元的耗时与像素数，保存为Chrome trace格式的JSON并输出汇总')
+    parser.add_argument('--profile-memory', action='store_true', help='剖析时同时统计新分配的内存（较慢）')
+    parser.add_argument('--profile-top', type=int, default=10, metavar='N', help='汇总中每组显示的项数')
+    parser.add_argument('-v', '--verbose', action='store_true', help='输出统计信息')
+    return parser.parse_args()
 
 
 if __name__ == '__main__':
-    logging.basicConfig(level=logging.WARNING)
-    input_file = sys.argv[1]
-    output_dir = sys.argv[2]
-    os.makedirs(output_dir, exist_ok=True)
-
-    item_dict = {}
-    pen_color = np.zeros(3, np.uint8)
-    width = 0
-    height = 0
-    draw_dict = {
-        'line': alg.draw_line,
-        'polygon': alg.draw_polygon,
-        'ellipse': alg.draw_ellipse,
-        'curve': alg.draw_curve
-    }
-
-    with open(input_file, 'r') as fp:
-        line = fp.readline()
-        while line:
-            line = line.strip().split(' ')
-            logging.debug('len line=%d', len(line))
-            if len(line) == 0 or len(line[0]) == 0:
-                continue
-            elif line[0][0] == '#':
-                pass
-            elif line[0] == 'resetCanvas':
-                width = int(line[1])
-                height = int(line[2])
-                item_dict = {}
-            elif line[0] == 'saveCanvas':
-                save_name = line[1]
-                canvas = np.zeros([height, width, 3], np.uint8)
-                canvas.fill(255)
-                for item_type, p_list, algorithm, color in item_dict.values():
-                    pixels = draw_dict[item_type](p_list, algorithm)
-                    for x,y in pixels:
-                        x, y = round(x), round(y)
-                        canvas[height - 1 - y, x] = color
-                Image.fromarray(canvas).save(os.path.join(output_dir, save_name + '.bmp'), 'bmp')
-            elif line[0] == 'setColor':
-                pen_color[0] = int(line[1])
-                pen_color[1] = int(line[2])
-                pen_color[2] = int(line[3])
-            elif line[0] == 'drawLine':
-                item_id = line[1]
-                x0 = int(line[2])
-                y0 = int(line[3])
-                x1 = int(line[4])
-                y1 = int(line[5])
-                algorithm = line[6]
-                item_dict[item_id] = ['line', [[x0, y0], [x1, y1]], algorithm, np.array(pen_color)]
-            elif line[0] == 'drawPolygon':
-                item_id = line[1]
-                p_list = []
-                for i in range(2, len(line) - 1, 2):
-                    p_list.append([int(line[i]), int(line[i + 1])])
-                algorithm = line[-1]
-                item_dict[item_id] = ['polygon', p_list, algorithm, np.array(pen_color)]
-            elif line[0] == 'drawEllipse':
-                item_id = line[1]
-                x0 = int(line[2])
-                y0 = int(line[3])
-                x1 = int(line[4])
-                y1 = int(line[5])
-                item_dict[item_id] = ['ellipse', [[x0, y0], [x1, y1]], 'midpoint', np.array(pen_color)]
-            elif line[0] == 'drawCurve':
-                item_id = line[1]
-                p_list = []
-                for i in range(2, len(line) - 1, 2):
-                    p_list.append([int(line[i]), int(line[i + 1])])
-                algorithm = line[-1]
-                item_dict[item_id] = ['curve', p_list, algorithm, np.array(pen_color)]
-            elif line[0] == 'translate':
-                item_id = line[1]
-                item_type, p_list, algorithm, color = item_dict[item_id]
-                p_list = alg.translate(p_list, int(line[2]), int(line[3]))
-                item_dict[item_id] = item_type, p_list, algorithm, color
-            elif line[0] == 'rotate':
-                item_id = line[1]
-                item_type, p_list, algorithm, color = item_dict[item_id]
-                p_list = alg.rotate(p_list, int(line[2]), int(line[3]), -int(line[4]))
-                item_dict[item_id] = item_type, p_list, algorithm, color
-            elif line[0] == 'scale':
-                item_id = line[1]
-                item_type, p_list, algorithm, color = item_dict[item_id]
-                p_list = alg.scale(p_list, int(line[2]), int(line[3]), float(line[4]))
-                item_dict[item_id] = item_type, p_list, algorithm, color
-            elif line[0] == 'clip':
-                item_id = line[1]
-                item_type, p_list, algorithm, color = item_dict[item_id]
-                if item_type != 'line':
-                    print('Cannot clip {} type'.format(item_type))
-                p_list = alg.clip(p_list, int(line[2]), int(line[3]), int(line[4]), int(line[5]), line[6])
-                if len(p_list):
-                    item_dict[item_id] = item_type, p_list, algorithm, color
-                else:
-                    del item_dict[item_id]
-            elif line[0] == 'clipPolygon':
-                item_id = line[1]
-                item_type, p_list, algorithm, color = item_dict[item_id]
-                if item_type != 'polygon':
-                    print('Wrong shape type.')
-                p_list = alg.polygon_clip(p_list, int(line[2]), int(line[3]), int(line[4]), int(line[5]))
-                if len(p_list):
-                    item_dict[item_id] = item_type, p_list, algorithm, color
-                else:
-                    del item_dict[item_id]
-            else:
-                print('Invalid command: ' + line[0])
-            line = fp.readline()
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    os.makedirs(args.output_dir, exist_ok=True)
 
+    cache_bytes = int(args.cache_size * 1024 * 1024) if args.cache else 0
+    cache = cg_raster.RasterCache(cache_bytes) if args.cache else None
+    pool = None
+    if args.jobs > 1 and not args.tile_size:
+        import concurrent.futures
+        pool = concurrent.futures.ProcessPoolExecutor(args.jobs, initializer=init_worker, initargs=(cache_bytes,))
+    profiler = None
+    if args.profile:
+        # 先完成所有延迟导入，导入numpy等的耗时不计入第一条用到它们的指令
+        for module in (cg_bmp, cg_canvas, cg_raster, cg_snapshot, cg_store, cg_tiles):
+            getattr(module, '__name__')  # 访问任一属性即完成导入
+        profiler = cg_profile.Profiler(args.profile_memory)
+    scene = Scene(args.output_dir, cache, pool, 2 * args.jobs, args.jobs, args.tile_size, args.mmap, profiler)
+    if args.load_scene:
+        scene.load(args.load_scene)
+    with cmd.open_input(args.input_file) as fp:
+        reader = cmd.CommandReader(fp)
+        for command in reader:
+            scene.execute(command)
+    if args.dump_scene:
+        scene.dump(args.dump_scene)
+    scene.finish()
+    if pool is not None:
+        pool.shutdown()
+    logging.info('parsed {} lines in {:.3f}s ({:.0f} lines/s)'.format(
+        reader.lines, reader.elapsed, reader.throughput()))
+    if cache is not None:
+        logging.info(cache)
+    if profiler is not None:
+        profiler.save(args.profile)
+        print(profiler.summary(args.profile_top))
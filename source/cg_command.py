@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 指令文件的流式解析：逐行读取，按指令名查表生成带类型的指令记录
+import collections
+import sys
+import time
+
+
+ResetCanvas = collections.namedtuple('ResetCanvas', ['width', 'height'])
+SaveCanvas = collections.namedtuple('SaveCanvas', ['name'])
+SetColor = collections.namedtuple('SetColor', ['r', 'g', 'b'])
+DrawLine = collections.namedtuple('DrawLine', ['item_id', 'p_list', 'algorithm'])
+DrawPolygon = collections.namedtuple('DrawPolygon', ['item_id', 'p_list', 'algorithm'])
+DrawEllipse = collections.namedtuple('DrawEllipse', ['item_id', 'p_list'])
+DrawCurve = collections.namedtuple('DrawCurve', ['item_id', 'p_list', 'algorithm'])
+Translate = collections.namedtuple('Translate', ['item_id', 'dx', 'dy'])
+Rotate = collections.namedtuple('Rotate', ['item_id', 'x', 'y', 'r'])
+Scale = collections.namedtuple('Scale', ['item_id', 'x', 'y', 's'])
+Clip = collections.namedtuple('Clip', ['item_id', 'x_min', 'y_min', 'x_max', 'y_max', 'algorithm'])
+FillPolygon = collections.namedtuple('FillPolygon', ['item_id', 'p_list', 'rule'])
+ClipPolygon = collections.namedtuple('ClipPolygon', ['item_id', 'x_min', 'y_min', 'x_max', 'y_max', 'algorithm'])
+ClipAll = collections.namedtuple('ClipAll', ['x_min', 'y_min', 'x_max', 'y_max', 'algorithm'])
+DumpScene = collections.namedtuple('DumpScene', ['name'])
+LoadScene = collections.namedtuple('LoadScene', ['name'])
+
+
+def points(tokens):
+    """将 x0 y0 x1 y1 ... 形式的记号转换为坐标列表
+    """
+    return [[int(tokens[i]), int(tokens[i + 1])] for i in range(0, len(tokens) - 1, 2)]
+
+
+parser_dict = {
+    'resetCanvas': lambda t: ResetCanvas(int(t[1]), int(t[2])),
+    'saveCanvas': lambda t: SaveCanvas(t[1]),
+    'setColor': lambda t: SetColor(int(t[1]), int(t[2]), int(t[3])),
+    'drawLine': lambda t: DrawLine(t[1], points(t[2:6]), t[6]),
+    'drawPolygon': lambda t: DrawPolygon(t[1], points(t[2:-1]), t[-1]),
+    'drawEllipse': lambda t: DrawEllipse(t[1], points(t[2:6])),
+    'drawCurve': lambda t: DrawCurve(t[1], points(t[2:-1]), t[-1]),
+    'fillPolygon': lambda t: FillPolygon(t[1], points(t[2:-1]), t[-1]),
+    'translate': lambda t: Translate(t[1], int(t[2]), int(t[3])),
+    'rotate': lambda t: Rotate(t[1], int(t[2]), int(t[3]), int(t[4])),
+    'scale': lambda t: Scale(t[1], int(t[2]), int(t[3]), float(t[4])),
+    'clip': lambda t: Clip(t[1], int(t[2]), int(t[3]), int(t[4]), int(t[5]), t[6]),
+    'clipPolygon': lambda t: ClipPolygon(t[1], int(t[2]), int(t[3]), int(t[4]), int(t[5]),
+                                         t[6] if len(t) > 6 else 'Liang-Barsky'),
+    'clipAll': lambda t: ClipAll(int(t[1]), int(t[2]), int(t[3]), int(t[4]), t[5]),
+    'dumpScene': lambda t: DumpScene(t[1]),
+    'loadScene': lambda t: LoadScene(t[1]),
+}
+
+
+def open_input(path):
+    """打开指令文件，'-'表示标准输入，以.gz结尾的文件按gzip解压
+
+    :param path: (string) 指令文件路径
+    :return: 按行迭代的文本文件对象
+    """
+    if path == '-':
+        return sys.stdin
+    if path.endswith('.gz'):
+        import gzip
+        return gzip.open(path, 'rt')
+    return open(path, 'r')
+
+
+class CommandReader:
+    """
+    指令流
+    逐行读取并解析指令，内存占用与文件大小无关；空行和以#开头的注释行被跳过
+    """
+    def __init__(self, fp):
+        self.fp = fp
+        self.lines = 0
+        self.elapsed = 0.0  # 解析所用的时间（秒），不含执行指令的时间
+
+    def __iter__(self):
+        start = time.perf_counter()
+        for line in self.fp:
+            self.lines += 1
+            tokens = line.split()
+            if len(tokens) == 0 or tokens[0][0] == '#':
+                continue
+            parser = parser_dict.get(tokens[0])
+            if parser is None:
+                print('Invalid command: ' + tokens[0])
+                continue
+            command = parser(tokens)
+            self.elapsed += time.perf_counter() - start
+            yield command
+            start = time.perf_counter()
+        self.elapsed += time.perf_counter() - start
+
+    def throughput(self):
+        """解析速度（行/秒）
+        """
+        return self.lines / self.elapsed if self.elapsed > 0 else float('inf')
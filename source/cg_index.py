@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 图元包围盒的均匀网格空间索引（供cg_cli、cg_canvas使用）
+# 包围盒均为闭区间矩形 (x_min, y_min, x_max, y_max)
+import math
+
+
+def intersects(a, b):
+    """判断两个闭区间矩形是否相交
+    """
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def contains(outer, inner):
+    """判断闭区间矩形outer是否包含inner
+    """
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
+
+
+def transform_bbox(bbox, matrix):
+    """包围盒经仿射变换后的包围盒
+
+    图元的参数点都在原包围盒内，变换后都在四个角点变换后的包围盒内；向外扩展1个像素以容纳取整误差
+
+    :param bbox: (tuple of int: (x_min, y_min, x_max, y_max)) 包围盒
+    :param matrix: (tuple of tuple) 3x3齐次矩阵
+    :return: (tuple of int: (x_min, y_min, x_max, y_max)) 变换后的包围盒
+    """
+    (a, b, c), (d, e, f) = matrix[0], matrix[1]
+    xs, ys = [], []
+    for x in (bbox[0], bbox[2]):
+        for y in (bbox[1], bbox[3]):
+            xs.append(a * x + b * y + c)
+            ys.append(d * x + e * y + f)
+    return (math.floor(min(xs)) - 1, math.floor(min(ys)) - 1,
+            math.ceil(max(xs)) + 1, math.ceil(max(ys)) + 1)
+
+
+class GridIndex:
+    """
+    均匀网格空间索引
+    平面划分为边长cell_size的格子，每个图元登记在其包围盒覆盖的所有格子中；
+    覆盖格子数超过max_cells的大图元单独存放，查询时逐个检查。
+    查询结果按图元首次插入的顺序（即绘制顺序）排列；没有像素的图元（包围盒为None）只占据顺序，查询时不返回
+    """
+    def __init__(self, cell_size=64, max_cells=256):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.cells = {}  # (cx, cy) -> set of item_id
+        self.large = set()
+        self.boxes = {}  # item_id -> bbox
+        self.order = {}  # item_id -> 插入序号
+        self.count = 0
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __contains__(self, item_id):
+        return item_id in self.boxes
+
+    def _cell_range(self, bbox):
+        size = self.cell_size
+        return range(bbox[0] // size, bbox[2] // size + 1), range(bbox[1] // size, bbox[3] // size + 1)
+
+    def insert(self, item_id, bbox):
+        """插入图元或更新其包围盒；已有的图元保持原来的顺序
+
+        :param item_id: (string) 图元编号
+        :param bbox: (tuple of int: (x_min, y_min, x_max, y_max)) 包围盒，None表示图元没有像素
+        """
+        if item_id in self.boxes:
+            if self.boxes[item_id] == bbox:
+                return
+            self._unlink(item_id)
+        else:
+            self.order[item_id] = self.count
+            self.count += 1
+        self.boxes[item_id] = bbox
+        if bbox is None:
+            return
+        xs, ys = self._cell_range(bbox)
+        if len(xs) * len(ys) > self.max_cells:
+            self.large.add(item_id)
+            return
+        for cx in xs:
+            for cy in ys:
+                self.cells.setdefault((cx, cy), set()).add(item_id)
+
+    def insert_many(self, item_ids, boxes, empty=None, chunk=1 << 22):
+        """按顺序插入一批新图元，结果与逐个insert相同；登记的格子用numpy成批计算（如读取场景后重建索引）
+
+        :param item_ids: (list of string) 尚未插入的图元编号
+        :param boxes: (array-like of int, shape (n, 4)) 对应的包围盒
+        :param empty: (array-like of bool, shape (n,)) 没有像素的图元（同insert的bbox为None），None表示都有像素
+        :param chunk: (int) 每批计算的 (图元, 格子) 对数的上限，限制临时数组的内存
+        """
+        import numpy as np
+        boxes = np.asarray(boxes, np.int64).reshape(-1, 4)
+        empty = np.zeros(len(boxes), bool) if empty is None else np.asarray(empty, bool)
+        for item_id, bbox, skip in zip(item_ids, map(tuple, boxes.tolist()), empty.tolist()):
+            self.order[item_id] = self.count
+            self.count += 1
+            self.boxes[item_id] = None if skip else bbox
+        names = np.array(item_ids, dtype=object)[~empty]
+        boxes = boxes[~empty]
+        lo, hi = boxes[:, :2] // self.cell_size, boxes[:, 2:] // self.cell_size
+        nx = hi[:, 0] - lo[:, 0] + 1
+        cells = nx * (hi[:, 1] - lo[:, 1] + 1)
+        large = cells > self.max_cells
+        self.large.update(names[large].tolist())
+        small = np.flatnonzero(~large)
+        # 按累计格子数将图元分批
+        total = np.cumsum(cells[small])
+        start = 0
+        while start < len(small):
+            end = max(int(np.searchsorted(total, total[start] - cells[small[start]] + chunk, 'right')), start + 1)
+            owner = np.repeat(small[start:end], cells[small[start:end]])
+            k = np.arange(len(owner)) - np.repeat(np.cumsum(cells[small[start:end]]) - cells[small[start:end]],
+                                                  cells[small[start:end]])
+            cx = lo[owner, 0] + k % nx[owner]
+            cy = lo[owner, 1] + k // nx[owner]
+            # 按格子排序，同一格子内保持图元顺序
+            key = (cx - cx.min()) * (int(cy.max() - cy.min()) + 1) + (cy - cy.min())
+            order = np.argsort(key, kind='stable')
+            cx, cy, owner, key = cx[order], cy[order], owner[order], key[order]
+            first = np.flatnonzero(np.concatenate([[True], key[1:] != key[:-1]]))
+            last = np.concatenate([first[1:], [len(owner)]])
+            for x, y, a, b in zip(cx[first].tolist(), cy[first].tolist(), first.tolist(), last.tolist()):
+                self.cells.setdefault((x, y), set()).update(names[owner[a:b]].tolist())
+            start = end
+
+    def remove(self, item_id):
+        """删除图元，不存在时忽略
+        """
+        if item_id in self.boxes:
+            self._unlink(item_id)
+            del self.boxes[item_id]
+            del self.order[item_id]
+
+    def _unlink(self, item_id):
+        if self.boxes[item_id] is None:
+            return
+        if item_id in self.large:
+            self.large.discard(item_id)
+            return
+        xs, ys = self._cell_range(self.boxes[item_id])
+        for cx in xs:
+            for cy in ys:
+                cell = self.cells[cx, cy]
+                cell.discard(item_id)
+                if not cell:
+                    del self.cells[cx, cy]
+
+    def bbox(self, item_id):
+        """图元的包围盒，没有像素的图元为None
+        """
+        return self.boxes[item_id]
+
+    def query_rect(self, rect):
+        """包围盒与矩形相交的图元
+
+        :param rect: (tuple of int: (x_min, y_min, x_max, y_max)) 闭区间矩形
+        :return: (list of string) 按绘制顺序排列的图元编号
+        """
+        xs, ys = self._cell_range(rect)
+        if len(xs) * len(ys) >= len(self.cells):
+            # 矩形覆盖的格子比已有的格子还多，直接检查所有图元
+            found = [item_id for item_id, bbox in self.boxes.items() if bbox is not None and intersects(bbox, rect)]
+        else:
+            candidates = set()
+            for cx in xs:
+                for cy in ys:
+                    candidates.update(self.cells.get((cx, cy), ()))
+            candidates.update(self.large)
+            found = [item_id for item_id in candidates if intersects(self.boxes[item_id], rect)]
+        found.sort(key=self.order.__getitem__)
+        return found
+
+    def query_point(self, x, y):
+        """包围盒包含点(x, y)的图元，可用于拾取
+
+        :return: (list of string) 按绘制顺序排列的图元编号，最后一个在最上层
+        """
+        return self.query_rect((x, y, x, y))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 指令级性能剖析（供cg_cli --profile使用）
+# 记录每段耗时的开始时间、时长、像素数和新分配的内存，按指令类型、算法、图元编号和阶段汇总，
+# 并可保存为Chrome trace格式（chrome://tracing或Perfetto打开）。未启用时调用方不创建Profiler，没有额外开销
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+
+def stage(profiler, name):
+    """记录一个阶段（如保存画布时的绘制、编码）的耗时
+
+    :param profiler: (Profiler) 剖析记录，None表示未启用剖析，此时什么也不做
+    :param name: (string) 阶段名称
+    :return: 上下文管理器
+    """
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.span(name, 'stage', [('stage', name)])
+
+
+class Profiler:
+    """
+    剖析记录
+    """
+    def __init__(self, trace_memory=False):
+        """
+        :param trace_memory: (bool) 是否用tracemalloc统计每段新分配的内存（会明显拖慢程序）
+        """
+        self.events = []
+        # (分组, 名称) -> [次数, 秒, 像素数, 字节数]
+        self.stats = collections.defaultdict(lambda: [0, 0.0, 0, 0])
+        self.origin = time.perf_counter()
+        self.trace_memory = trace_memory
+        self.open = []  # 尚未结束的各段的记录，外层在前
+        if trace_memory:
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def span(self, name, category, keys=(), **args):
+        """记录一段耗时
+
+        :param name: (string) 在trace中显示的名称
+        :param category: (string) 分类，如'command'、'rasterize'、'stage'
+        :param keys: (iterable of (group, name)) 该段计入的汇总项，如('algorithm', 'DDA')
+        :param args: 写入trace的其他参数
+        :return: (dict) 调用方可在其中设置'pixels'；结束时其中的像素数会累加到外层的段上，
+                 因此SaveCanvas等指令的像素数为保存时光栅化的像素总数
+        """
+        record = {'pixels': 0}
+        self.open.append(record)
+        memory = tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            self.open.pop()
+            if self.open:
+                self.open[-1]['pixels'] += record['pixels']
+            allocated = tracemalloc.get_traced_memory()[0] - memory if self.trace_memory else 0
+            args.update(record)
+            if self.trace_memory:
+                args['allocated'] = allocated
+            self.events.append({'name': name, 'cat': category, 'ph': 'X',
+                                'ts': (start - self.origin) * 1e6, 'dur': seconds * 1e6,
+                                'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args})
+            for key in keys:
+                stat = self.stats[key]
+                stat[0] += 1
+                stat[1] += seconds
+                stat[2] += record['pixels']
+                stat[3] += allocated
+
+    def save(self, path):
+        """保存为Chrome trace格式的JSON文件
+        """
+        with open(path, 'w') as fp:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, fp)
+
+    def summary(self, top=10):
+        """各分组中耗时最多的top项
+
+        :return: (string) 可打印的汇总表
+        """
+        groups = collections.defaultdict(list)
+        for (group, name), stat in self.stats.items():
+            groups[group].append((name, stat))
+        lines = []
+        for group in sorted(groups):
+            lines.append('{:<28} {:>8} {:>10} {:>12} {:>12}'.format(
+                'top ' + group, 'count', 'ms', 'pixels', 'alloc_bytes'))
+            for name, (count, seconds, pixels, allocated) in sorted(
+                    groups[group], key=lambda entry: entry[1][1], reverse=True)[:top]:
+                lines.append('  {:<26} {:>8} {:>10.2f} {:>12} {:>12}'.format(
+                    str(name), count, seconds * 1000, pixels, allocated if self.trace_memory else '-'))
+        return '\n'.join(lines)
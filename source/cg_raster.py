@@ -0,0 +1,1012 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 批量光栅化后端（依赖numpy，供cg_cli使用）
+# 各绘制函数生成 (N, 2) 整数像素数组；rasterize将其压缩为按行的水平线段 (y, x_start, x_end)，
+# 以 (M, 3) 的int32数组保存和写入画布。线段、多边形和曲线的像素依次相连，沿生成顺序直接合并为水平线段，
+# 椭圆由每种形状的线段表平移得到，都不需要排序。cg_algorithms中返回列表的函数保留为参考实现
+import collections
+import fractions
+import functools
+import math
+
+import numpy as np
+
+import cg_algorithms as alg
+
+
+reference_dict = {
+    'line': alg.draw_line,
+    'polygon': alg.draw_polygon,
+    'ellipse': alg.draw_ellipse,
+    'curve': alg.draw_curve,
+    'filled_polygon': lambda p_list, rule: [[x, y] for y, x_start, x_end in alg.fill_polygon(p_list, rule)
+                                            for x in range(x_start, x_end + 1)]
+}
+
+
+SPAN_DTYPE = np.int32
+# 长度不小于该值的线段用行切片赋值写入，更短的线段展开为像素后一次花式索引写入
+SPAN_SLICE_MIN = 16
+# 各形状的迭代步数之和超过最大步数的该倍数时，中点椭圆算法改为所有形状同步迭代（见midpoint_ellipses）；
+# 同步迭代每步约有十几微秒的numpy调用开销，纯Python实现每步约0.6微秒
+MIDPOINT_BATCH_RATIO = 24
+# 同步迭代的决策参数约为8 * rx^2 * ry^2，半轴长不超过该值时不会溢出int64
+MIDPOINT_BATCH_MAX_RADIUS = 1 << 14
+
+
+def to_array(pixels):
+    """将像素点坐标列表转换为 (N, 2) 整数数组
+
+    :param pixels: (list of list of int/float) 像素点坐标列表
+    :return: (numpy.ndarray of int64, shape (N, 2)) 四舍五入后的像素点坐标
+    """
+    if len(pixels) == 0:
+        return np.empty((0, 2), np.int64)
+    return np.rint(np.asarray(pixels, dtype=np.float64)).astype(np.int64).reshape(-1, 2)
+
+
+def as_list(p_list):
+    """将numpy数组形式的图元参数（如cg_store.ItemStore中的视图）转换为列表，供cg_algorithms中的纯Python实现使用
+    """
+    return p_list.tolist() if isinstance(p_list, np.ndarray) else p_list
+
+
+def to_spans(pixels):
+    """将像素数组压缩为按行的水平线段，重复的像素只保留一次
+
+    需要按 (y, x) 排序；依次相连的像素用chain_spans更快，这里用于顺序任意的像素（如椭圆每种形状的线段表）
+
+    :param pixels: (numpy.ndarray of int, shape (N, 2)) 像素点坐标数组
+    :return: (numpy.ndarray of int32, shape (M, 3)) 按 (y, x_start) 排序的水平线段 (y, x_start, x_end)
+    """
+    if len(pixels) == 0:
+        return np.empty((0, 3), SPAN_DTYPE)
+    order = np.lexsort((pixels[:, 0], pixels[:, 1]))
+    x, y = pixels[order, 0], pixels[order, 1]
+    # 换行或x不相邻时开始新的线段，重复像素（x差为0）不断开
+    start = np.ones(len(x), bool)
+    start[1:] = (y[1:] != y[:-1]) | (x[1:] - x[:-1] > 1)
+    begin = np.flatnonzero(start)
+    end = np.append(begin[1:], len(x)) - 1
+    return np.stack([y[begin], x[begin], x[end]], axis=1).astype(SPAN_DTYPE)
+
+
+def chain_spans(pixels):
+    """将依次相连的像素序列（如线段、多边形、曲线逐像素生成的结果）按生成顺序压缩为水平线段，不需要排序
+
+    相邻两个像素在同一行且x相差不超过1时属于同一条线段，线段覆盖其中像素x的最小值到最大值。
+    不相邻的同行像素不合并，因此线段可能重叠（如多边形的顶点处、相交的边），重叠的像素写入多次
+
+    :param pixels: (numpy.ndarray of int, shape (N, 2)) 依次相连的像素点坐标数组
+    :return: (numpy.ndarray of int32, shape (M, 3)) 按生成顺序排列的水平线段 (y, x_start, x_end)
+    """
+    if len(pixels) == 0:
+        return np.empty((0, 3), SPAN_DTYPE)
+    x, y = pixels[:, 0], pixels[:, 1]
+    start = np.ones(len(x), bool)
+    start[1:] = (y[1:] != y[:-1]) | (np.abs(x[1:] - x[:-1]) > 1)
+    begin = np.flatnonzero(start)
+    return np.stack([y[begin], np.minimum.reduceat(x, begin), np.maximum.reduceat(x, begin)],
+                    axis=1).astype(SPAN_DTYPE)
+
+
+def span_pixels(spans):
+    """将水平线段展开为像素数组，是to_spans的逆运算
+
+    :param spans: (numpy.ndarray of int, shape (M, 3)) 水平线段 (y, x_start, x_end) 数组
+    :return: (numpy.ndarray of int64, shape (N, 2)) 像素点坐标数组
+    """
+    lengths = spans[:, 2].astype(np.int64) - spans[:, 1] + 1
+    offset = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    x = np.repeat(spans[:, 1].astype(np.int64), lengths) + offset
+    y = np.repeat(spans[:, 0].astype(np.int64), lengths)
+    return np.stack([x, y], axis=1)
+
+
+def transform(p_list, matrix):
+    """对图元参数做仿射变换，结果取整，与cg_algorithms.transform相同
+
+    :param p_list: (list of list of int) 图元参数
+    :param matrix: (tuple of tuple) 3x3齐次矩阵
+    :return: (list of list of int) 变换后的图元参数
+    """
+    if len(p_list) == 0:
+        return []
+    m = np.asarray(matrix, np.float64)
+    p = np.asarray(p_list, np.float64).reshape(-1, 2)
+    return np.rint(p @ m[:2, :2].T + m[:2, 2]).astype(np.int64).tolist()
+
+
+def pixel_count(spans):
+    """水平线段数组包含的像素数；重叠的线段（见chain_spans）重复计数，即写入画布的像素数
+    """
+    return int((spans[:, 2].astype(np.int64) - spans[:, 1] + 1).sum())
+
+
+def draw_lines(segments, algorithm):
+    """一次绘制多条线段，结果与cg_algorithms.draw_line逐条绘制后依次拼接完全一致
+
+    每条线段的像素数为max(|dx|, |dy|) + 1，第k个像素的坐标由闭式直接给出：
+    DDA为起点加k倍的步长增量后取整；Bresenham在主方向上前进k步时，
+    副方向已累计的步数为(2 * |d副| * k + |d主|) // (2 * |d主|)，与决策参数的递推等价
+
+    :param segments: (array-like, shape (M, 2, 2) 或 (M, 4)) 线段的起点和终点坐标
+    :param algorithm: (string) 绘制使用的算法，包括'DDA'和'Bresenham'
+    :return: (numpy.ndarray of int64, shape (N, 2)) 全部线段的像素点坐标
+    """
+    seg = np.rint(np.asarray(segments, dtype=np.float64)).astype(np.int64).reshape(-1, 4)
+    if algorithm not in ('DDA', 'Bresenham'):
+        # 其他算法退回参考实现
+        return to_array([p for s in seg.tolist()
+                         for p in alg.draw_line([s[:2], s[2:]], algorithm)])
+    x0, y0, x1, y1 = seg.T
+    dx, dy = x1 - x0, y1 - y0
+    adx, ady = np.abs(dx), np.abs(dy)
+    n = np.maximum(adx, ady) + 1
+    # 每个像素所属线段的编号及其在线段内的序号k
+    owner = np.repeat(np.arange(len(seg)), n)
+    k = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    x0, y0, x1, y1 = x0[owner], y0[owner], x1[owner], y1[owner]
+    dx, dy, adx, ady = dx[owner], dy[owner], adx[owner], ady[owner]
+    vertical = dx == 0
+    if algorithm == 'DDA':
+        step = np.where(vertical, 1, n[owner] - 1)
+        x = np.rint(x0 + dx / step * k).astype(np.int64)
+        y = np.rint(y0 + dy / step * k).astype(np.int64)
+    else:
+        shallow = adx >= ady
+        # 直线生成方向与坐标轴相反时交换起始点
+        swap = np.where(shallow, x0 > x1, y0 > y1)
+        sx0, sy0 = np.where(swap, x1, x0), np.where(swap, y1, y0)
+        sx1, sy1 = np.where(swap, x0, x1), np.where(swap, y0, y1)
+        major = np.maximum(np.where(shallow, adx, ady), 1)
+        minor = np.where(shallow, ady, adx)
+        carry = (2 * minor * k + major) // (2 * major)
+        x = np.where(shallow, sx0 + k, sx0 + np.sign(sx1 - sx0) * carry)
+        y = np.where(shallow, sy0 + np.sign(sy1 - sy0) * carry, sy0 + k)
+    # 竖直线段与算法无关，从较小的y开始
+    x = np.where(vertical, x0, x)
+    y = np.where(vertical, np.minimum(y0, y1) + k, y)
+    return np.stack([x, y], axis=1)
+
+
+def draw_line(p_list, algorithm):
+    """绘制线段，参数与cg_algorithms.draw_line相同
+
+    :return: (numpy.ndarray of int64, shape (N, 2)) 像素点坐标数组
+    """
+    return draw_lines([p_list], algorithm)
+
+
+def draw_polygon(p_list, algorithm):
+    """绘制多边形，所有边通过一次draw_lines调用生成
+
+    :return: (numpy.ndarray of int64, shape (N, 2)) 像素点坐标数组
+    """
+    vertices = np.asarray(p_list, dtype=np.float64).reshape(-1, 2)
+    return draw_lines(np.concatenate([np.roll(vertices, 1, axis=0), vertices], axis=1), algorithm)
+
+
+def midpoint_ellipses(shapes):
+    """对多种半轴长同时运行中点椭圆算法，结果与cg_algorithms.draw_ellipse绘制以原点为中心的椭圆相同
+
+    第一象限的轨迹逐步迭代，每一步对所有尚未走完当前区域的形状一起更新决策参数，
+    迭代次数只取决于最大的半轴长，再按对称性展开到四个象限
+
+    :param shapes: (numpy.ndarray of int64, shape (K, 2)) 各形状的半轴长 (rx, ry)
+    :return: (tuple) 全部形状依次拼接的像素点坐标 (numpy.ndarray of int64, shape (N, 2))，
+             以及每种形状的像素数 (numpy.ndarray of int64, shape (K,))
+    """
+    rx2, ry2 = shapes[:, 0] ** 2, shapes[:, 1] ** 2
+    owner, xs, ys = [np.arange(len(shapes))], [np.zeros(len(shapes), np.int64)], [shapes[:, 1].copy()]
+    # 区域1，p = 4 * (ry2 - rx2 * ry + rx2 / 4)
+    x, y = np.zeros(len(shapes), np.int64), shapes[:, 1].copy()
+    p = 4 * ry2 - 4 * rx2 * y + rx2
+    active = np.flatnonzero(ry2 * x < rx2 * y)
+    while len(active):
+        a_rx2, a_ry2, a_x, a_y, a_p = rx2[active], ry2[active], x[active], y[active], p[active]
+        down = a_p >= 0
+        a_y -= down
+        a_p -= np.where(down, 8 * a_rx2 * a_y, 0)
+        a_p += 8 * a_ry2 * (a_x + 1) + 4 * a_ry2
+        a_x += 1
+        x[active], y[active], p[active] = a_x, a_y, a_p
+        owner.append(active)
+        xs.append(a_x)
+        ys.append(a_y)
+        active = active[a_ry2 * a_x < a_rx2 * a_y]
+    # 区域2，p = 4 * (ry2 * (x + 1/2)^2 + rx2 * (y - 1)^2 - rx2 * ry2)
+    p = ry2 * (2 * x + 1) * (2 * x + 1) + 4 * rx2 * (y - 1) * (y - 1) - 4 * rx2 * ry2
+    active = np.flatnonzero(y > 0)
+    while len(active):
+        a_rx2, a_ry2, a_x, a_y, a_p = rx2[active], ry2[active], x[active], y[active], p[active]
+        a_y -= 1
+        right = a_p <= 0
+        a_x += right
+        a_p += np.where(right, 8 * a_ry2 * a_x, 0)
+        a_p += 4 * a_rx2 - 8 * a_rx2 * a_y
+        x[active], y[active], p[active] = a_x, a_y, a_p
+        owner.append(active)
+        xs.append(a_x)
+        ys.append(a_y)
+        active = active[a_y > 0]
+    # 按形状排列各步的轨迹点，同一形状内保持迭代顺序
+    owner = np.concatenate(owner)
+    order = np.argsort(owner, kind='stable')
+    owner, x, y = owner[order], np.concatenate(xs)[order], np.concatenate(ys)[order]
+    # 与emit相同的对称展开顺序：(x, y)、(-x, y)、(x, -y)、(-x, -y)，坐标为0时跳过重复的点
+    points = np.stack([np.stack([x, y], axis=1), np.stack([-x, y], axis=1),
+                       np.stack([x, -y], axis=1), np.stack([-x, -y], axis=1)], axis=1)
+    keep = np.stack([np.ones(len(x), bool), x != 0, y != 0, (x != 0) & (y != 0)], axis=1)
+    pixels = points[keep]
+    return pixels, np.bincount(np.repeat(owner, keep.sum(axis=1)), minlength=len(shapes))
+
+
+def draw_ellipses(boxes, return_counts=False, spans=False):
+    """一次绘制多个椭圆，结果与cg_algorithms.draw_ellipse逐个绘制后依次拼接相同
+
+    半轴长相同的椭圆形状相同，每种半轴长只运行一次中点椭圆算法，其余只需平移；
+    不同的形状较多时，各形状的中点椭圆算法同步迭代（见midpoint_ellipses），否则逐个调用纯Python实现。
+    spans为True时每种形状只压缩一次水平线段，各椭圆的线段由平移得到，与逐个调用to_spans相同
+
+    :param boxes: (array-like, shape (M, 2, 2)) 各椭圆的矩形包围框
+    :param return_counts: (bool) 是否同时返回每个椭圆的像素数（spans为True时为线段数）
+    :param spans: (bool) 是否返回水平线段
+    :return: (numpy.ndarray of int64, shape (N, 2)) 全部椭圆的像素点坐标，
+             spans为True时为 (numpy.ndarray of int32, shape (M, 3)) 水平线段 (y, x_start, x_end)
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    radii = np.rint(np.abs(boxes[:, 2:] - boxes[:, :2]) / 2).astype(np.int64)
+    centers = np.rint((boxes[:, 2:] + boxes[:, :2]) / 2).astype(np.int64)
+    shapes, group = np.unique(radii, axis=0, return_inverse=True)
+    group = group.reshape(-1)
+    steps = shapes.sum(axis=1)
+    batch = shapes.max(axis=1) <= MIDPOINT_BATCH_MAX_RADIUS
+    if not batch.any() or steps[batch].sum() <= MIDPOINT_BATCH_RATIO * steps[batch].max():
+        batch[:] = False
+    arcs = [None] * len(shapes)
+    if batch.any():
+        table, sizes = midpoint_ellipses(shapes[batch])
+        for i, arc in zip(np.flatnonzero(batch).tolist(), np.split(table, np.cumsum(sizes)[:-1])):
+            arcs[i] = arc
+    for i in np.flatnonzero(~batch).tolist():
+        rx, ry = shapes[i].tolist()
+        arcs[i] = to_array(alg.draw_ellipse([[-rx, -ry], [rx, ry]], 'midpoint'))
+    if spans:
+        arcs = [to_spans(arc) for arc in arcs]
+        centers = np.stack([centers[:, 1], centers[:, 0], centers[:, 0]], axis=1)
+    sizes = np.array([len(arc) for arc in arcs], dtype=np.int64)
+    table = np.concatenate(arcs) if arcs else np.empty((0, centers.shape[1]), np.int64)
+    counts = sizes[group]
+    starts = (np.cumsum(sizes) - sizes)[group]
+    index = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+    pixels = table[index] + np.repeat(centers, counts, axis=0)
+    if spans:
+        pixels = pixels.astype(SPAN_DTYPE)
+    return (pixels, counts) if return_counts else pixels
+
+
+def draw_ellipse(p_list, algorithm):
+    """绘制椭圆
+
+    :return: (numpy.ndarray of int64, shape (N, 2)) 像素点坐标数组
+    """
+    return draw_ellipses([p_list])
+
+
+def ellipse_spans(p_list, algorithm):
+    """绘制椭圆，直接返回水平线段
+
+    :return: (numpy.ndarray of int32, shape (M, 3)) 水平线段 (y, x_start, x_end) 数组
+    """
+    return draw_ellipses([p_list], spans=True)
+
+
+def binomial(n, k):
+    """整数精确计算的二项式系数
+    """
+    result = 1
+    for i in range(k):
+        result = result * (n - i) // (i + 1)
+    return result
+
+
+bspline_power_matrices = {}
+
+
+def bspline_power_matrix(order):
+    """均匀B样条的基矩阵M：一段曲线为 [1, t, ..., t^(order-1)] @ M @ [P_0, ..., P_(order-1)]，t∈[0, 1]
+
+    由cg_algorithms中Bezier转换矩阵左乘Bernstein基的幂基系数得到，每个阶数只计算一次
+    """
+    if order not in bspline_power_matrices:
+        d = order - 1
+        # bernstein[i][m]: Bernstein基B_m中t^i的系数
+        bernstein = np.zeros((order, order))
+        for m in range(order):
+            for j in range(d - m + 1):
+                bernstein[m + j, m] = binomial(d, m) * binomial(d - m, j) * (-1) ** j
+        bspline_power_matrices[order] = bernstein @ np.array(alg.bspline_bezier_matrix(order))
+    return bspline_power_matrices[order]
+
+
+@functools.lru_cache(maxsize=64)
+def bspline_table(order, samples):
+    """每段在t = 0, 1/samples, ..., (samples-1)/samples处各控制点的权重，形状 (samples, order)
+    """
+    t = np.arange(samples) / samples
+    return (t[:, None] ** np.arange(order)) @ bspline_power_matrix(order)
+
+
+@functools.lru_cache(maxsize=64)
+def bernstein_table(degree, samples):
+    """Bernstein基在t = 0, 1/samples, ..., 1处的取值，形状 (samples + 1, degree + 1)
+
+    二项式系数由整数精确计算后再转换为浮点数
+    """
+    t = np.arange(samples + 1)[:, None] / samples
+    i = np.arange(degree + 1)
+    comb = np.array([binomial(degree, k) for k in range(degree + 1)], dtype=np.float64)
+    return comb * t ** i * (1 - t) ** (degree - i)
+
+
+@functools.lru_cache(maxsize=64)
+def bezier_split_matrices(degree):
+    """de Casteljau算法在t=0.5处细分的矩阵：左半段控制点为 L @ P，右半段为 R @ P
+
+    L[i][j] = C(i, j) / 2^i，R[i][j] = C(d-i, j-i) / 2^(d-i)；大整数相除得到正确舍入的浮点数，高次时也不会溢出
+    """
+    d = degree
+    left = np.zeros((d + 1, d + 1))
+    row = [1]  # 杨辉三角的第i行
+    for i in range(d + 1):
+        left[i, :i + 1] = [c / 2 ** i for c in row]
+        row = [1] + [a + b for a, b in zip(row, row[1:])] + [1]
+    # 右半段与左半段关于参数反转对称
+    right = left[::-1, ::-1].copy()
+    return left, right
+
+
+def bezier_flat(pieces, tolerance):
+    """逐段判断控制多边形是否足够平坦：内部控制点到首末点连线段的距离都不超过容差
+
+    :param pieces: (numpy.ndarray, shape (M, d + 1, 2)) M段曲线的控制点
+    :return: (numpy.ndarray of bool, shape (M,))
+    """
+    start, chord = pieces[:, :1], pieces[:, -1:] - pieces[:, :1]
+    inner = pieces[:, 1:-1] - start
+    d2 = (chord ** 2).sum(axis=2)
+    t = np.clip((inner * chord).sum(axis=2) / np.where(d2 == 0, 1, d2), 0, 1)
+    error = ((inner - t[:, :, None] * chord) ** 2).sum(axis=2)
+    return (error <= tolerance * tolerance).all(axis=1)
+
+
+def bezier_subdivide_points(ctrl, tolerance, max_depth=32):
+    """逐层同时细分所有不够平坦的小段，直到全部平坦，按参数顺序返回各小段端点
+
+    :param ctrl: (numpy.ndarray, shape (d + 1, 2)) 控制点
+    :return: (numpy.ndarray of float64, shape (N, 2), numpy.ndarray of int64 或 None, int)
+             采样点坐标，以及采样参数keys和den，见round_samples
+    """
+    left, right = bezier_split_matrices(len(ctrl) - 1)
+    pieces, ends, size = ctrl[None], np.ones(1), 1.0
+    points, keys = [ctrl[:1]], [np.zeros(1)]
+    for depth in range(max_depth + 1):
+        flat = bezier_flat(pieces, tolerance) if depth < max_depth else np.ones(len(pieces), bool)
+        points.append(pieces[flat, -1])
+        keys.append(ends[flat])
+        pieces, ends = pieces[~flat], ends[~flat]
+        if len(pieces) == 0:
+            break
+        size /= 2
+        pieces = np.concatenate([left @ pieces, right @ pieces])
+        ends = np.concatenate([ends - size, ends])
+    keys = np.concatenate(keys)
+    order = np.argsort(keys, kind='stable')
+    # 各端点的参数是2^-max_depth的整数倍，乘以2^max_depth后精确地成为整数
+    den = 2 ** max_depth
+    return np.concatenate(points)[order], (keys[order] * den).astype(np.int64), den
+
+
+def bezier_points(p_list, tolerance=alg.CURVE_TOLERANCE, max_table_degree=24):
+    """计算Bezier曲线上的采样点
+
+    次数不超过max_table_degree时，用缓存的Bernstein基表一次矩阵乘法求出全部采样点；
+    更高次时二阶差分给出的采样数过于保守，改用逐层向量化的de Casteljau自适应细分
+
+    :param p_list: (array-like, shape (n, 2)) 控制点坐标
+    :param tolerance: (float) 平坦度容差（像素）
+    :return: (numpy.ndarray of float64, shape (N, 2), numpy.ndarray of int64 或 None, int)
+             采样点坐标，以及采样参数keys和den，见round_samples
+    """
+    ctrl = np.asarray(p_list, dtype=np.float64).reshape(-1, 2)
+    degree = len(ctrl) - 1
+    if degree < 1:
+        return ctrl, np.zeros(len(ctrl), np.int64), 1
+    if degree > max_table_degree:
+        return bezier_subdivide_points(ctrl, tolerance)
+    samples = flat_samples(ctrl[None], tolerance)
+    return bernstein_table(degree, samples) @ ctrl, None, samples
+
+
+def flat_samples(bezier, tolerance, limit=65536):
+    """使每个小段的弦与曲线偏差不超过容差所需的等分数
+
+    d次Bezier曲线在长度为h的参数区间上，弦的偏差不超过 h^2 / 8 * d(d-1) * max|二阶差分|
+
+    :param bezier: (numpy.ndarray, shape (M, d + 1, 2)) M段曲线的Bezier控制点
+    :return: (int) 每段的等分数，所有段取相同的值
+    """
+    d = bezier.shape[1] - 1
+    if d < 2:
+        return 1
+    second = np.abs(bezier[:, 2:] - 2 * bezier[:, 1:-1] + bezier[:, :-2])
+    bound = d * (d - 1) * np.sqrt((second ** 2).sum(axis=2)).max()
+    return int(min(max(math.ceil(math.sqrt(bound / (8 * tolerance))), 1), limit))
+
+
+def bspline_points(p_list, tolerance=alg.CURVE_TOLERANCE, order=4):
+    """一次矩阵乘法计算均匀B样条所有段上的全部采样点
+
+    :param p_list: (array-like, shape (n, 2)) 控制点坐标
+    :param tolerance: (float) 平坦度容差（像素），决定每段的采样数
+    :param order: (int) B样条的阶数，默认为三次B样条
+    :return: (numpy.ndarray of float64, shape (N, 2), numpy.ndarray of int64 或 None, int)
+             采样点坐标，以及采样参数keys和den，见round_samples；控制点不足时为空
+    """
+    ctrl = np.asarray(p_list, dtype=np.float64).reshape(-1, 2)
+    spans = len(ctrl) - order + 1
+    if spans <= 0:
+        return np.empty((0, 2)), None, 1
+    windows = ctrl[np.arange(spans)[:, None] + np.arange(order)]
+    bezier = np.einsum('mk,jkc->jmc', np.array(alg.bspline_bezier_matrix(order)), windows)
+    samples = flat_samples(bezier, tolerance)
+    points = np.matmul(bspline_table(order, samples), windows).reshape(-1, 2)
+    # 第j段的第i个采样点位于u = j + i / samples，最后一个采样点是u = spans处的终点
+    return np.concatenate([points, bezier[-1, -1:]]), None, samples
+
+
+@functools.lru_cache(maxsize=16)
+def exact_bspline_bezier_matrix(order):
+    """与cg_algorithms.bspline_bezier_matrix相同的转换矩阵，用分数精确计算后通分
+
+    :return: (list of list of int, int) 整数矩阵及其公分母
+    """
+    d = order - 1
+    t = [i - d for i in range(2 * d + 2)]
+    matrix = []
+    for m in range(order):
+        args = [1] * m + [0] * (d - m)
+        coef = [[fractions.Fraction(int(a == b)) for b in range(order)] for a in range(order)]
+        for r in range(1, order):
+            u = args[r - 1]
+            for i in range(d, r - 1, -1):
+                alpha = fractions.Fraction(u - t[i], t[i + d + 1 - r] - t[i])
+                coef[i] = [(1 - alpha) * a + alpha * b for a, b in zip(coef[i - 1], coef[i])]
+        matrix.append(coef[d])
+    scale = 1
+    for c in (c for row in matrix for c in row):
+        scale = scale * c.denominator // math.gcd(scale, c.denominator)
+    return [[int(c * scale) for c in row] for row in matrix], scale
+
+
+def round_curve_point(ctrl, algorithm, segment, num, den, order=4):
+    """用整数运算精确计算曲线上一点，四舍六入五成双取整
+
+    :param ctrl: (list of list of int) 整数控制点坐标
+    :param segment: (int) B样条的段号，即该段第一个控制点的下标；Bezier曲线为0
+    :param num: (int) 段内参数t = num / den的分子
+    :param den: (int) 分母
+    :return: (tuple of int) 取整后的坐标
+    """
+    if algorithm == 'B-spline':
+        matrix, scale = exact_bspline_bezier_matrix(order)
+        window = ctrl[segment:segment + order]
+        points = [[sum(c * p[0] for c, p in zip(row, window)), sum(c * p[1] for c, p in zip(row, window))]
+                  for row in matrix]
+    else:
+        points, scale = ctrl, 1
+    # Bernstein展开：sum C(d, k) * num^k * (den - num)^(d - k) * P_k / den^d
+    d = len(points) - 1
+    rest = [1]
+    for _ in range(d):
+        rest.append(rest[-1] * (den - num))
+    x = y = 0
+    power = 1
+    for k, (px, py) in enumerate(points):
+        w = binomial(d, k) * power * rest[d - k]
+        x, y = x + w * px, y + w * py
+        power *= num
+    scale *= den ** d
+    result = []
+    for value in (x, y):
+        quotient, remainder = divmod(value, scale)
+        result.append(quotient + (2 * remainder > scale or (2 * remainder == scale and quotient % 2 == 1)))
+    return tuple(result)
+
+
+def round_samples(points, keys, den, ctrl, algorithm, order=4):
+    """采样点取整，结果与精确值四舍六入五成双取整相同
+
+    矩阵乘法的舍入误差可能使恰好落在.5上的坐标（如B样条的(P0 + 4P1 + P2) / 6）偏向某一侧，
+    控制点都是整数时，与.5的距离在误差范围内的点改用整数运算精确计算。
+    第i个采样点位于整条曲线的参数u = keys[i] / den处，keys为None时keys[i] = i；
+    Bezier曲线u∈[0, 1]，B样条的第j段（第j到j + order - 1个控制点）对应u∈[j, j + 1]
+
+    :param points: (numpy.ndarray of float64, shape (N, 2)) 浮点计算的采样点
+    :param keys: (numpy.ndarray of int64 或 None) 各采样点参数的分子
+    :param den: (int) 参数的分母
+    :param ctrl: (numpy.ndarray, shape (n, 2)) 计算采样点所用的控制点坐标
+    :return: (numpy.ndarray of int64, shape (N, 2)) 取整后的采样点
+    """
+    result = np.rint(points).astype(np.int64)
+    if len(points) == 0:
+        return result
+    error = 1e-9 * (1 + np.abs(points).max())
+    near = np.flatnonzero((np.abs(points - np.floor(points) - 0.5) <= error).any(axis=1))
+    if len(near) == 0 or not np.array_equal(ctrl, np.rint(ctrl)):
+        return result
+    ctrl = np.rint(ctrl).astype(np.int64)
+    u = near if keys is None else keys[near]
+    segments = len(ctrl) - order + 1 if algorithm == 'B-spline' else 1
+    segment = np.minimum(u // den, segments - 1)
+    num = u - segment * den
+    divisor = np.gcd(num, den)
+    num, den = num // divisor, den // divisor
+    # 各点所在段的Bezier控制点，B样条为通分后的整数控制点
+    if algorithm == 'B-spline':
+        matrix, scale = exact_bspline_bezier_matrix(order)
+        bezier = np.einsum('mk,jkc->jmc', np.array(matrix, np.int64), ctrl[segment[:, None] + np.arange(order)])
+    else:
+        scale = 1
+        bezier = np.broadcast_to(ctrl, (len(near),) + ctrl.shape)
+    d = bezier.shape[1] - 1
+    # 分子的绝对值不超过 scale * max|P| * den^d，不会溢出int64的点用整数数组一次算出，其余逐个用Python整数计算
+    fits = math.log2(scale * (int(np.abs(ctrl).max()) + 1)) + d * np.log2(den) < 60
+    if len(near) <= 16:
+        fits[:] = False  # 点数不多时逐个计算更快
+    if fits.any():
+        n, b = num[fits, None], den[fits, None]
+        k = np.arange(d + 1)
+        weights = np.array([binomial(d, i) for i in k], np.int64) * n ** k * (b - n) ** (d - k)
+        numerator = (weights[:, :, None] * bezier[fits]).sum(axis=1)
+        denominator = scale * b ** d
+        quotient, remainder = np.divmod(numerator, denominator)
+        result[near[fits]] = quotient + ((2 * remainder > denominator) |
+                                         ((2 * remainder == denominator) & (quotient % 2 == 1)))
+    if not fits.all():
+        ctrl = ctrl.tolist()
+        for k in np.flatnonzero(~fits).tolist():
+            result[near[k]] = round_curve_point(ctrl, algorithm, int(segment[k]), int(num[k]), int(den[k]), order)
+    return result
+
+
+def curve_points(p_list, algorithm, tolerance=alg.CURVE_TOLERANCE, order=4):
+    """计算曲线上取整后的采样点，去掉相邻的重复点
+
+    采样在以偶数坐标为原点的局部坐标中进行，取整后再加回原点，
+    因此平移偶数距离的两条曲线的结果严格相差这一平移量（见RasterCache）。
+    控制点为整数时，各采样点是曲线上的点的精确值取整的结果（见round_samples），不受浮点误差影响
+
+    :return: (numpy.ndarray of int64, shape (N, 2)) 采样点坐标
+    """
+    if algorithm in ('B-spline', 'Bezier') and len(p_list):
+        ctrl = np.asarray(p_list, dtype=np.float64).reshape(-1, 2)
+        origin = np.floor(ctrl.min(axis=0) / 2) * 2
+        local = ctrl - origin
+        if algorithm == 'B-spline':
+            points, keys, den = bspline_points(local, tolerance, order)
+        else:
+            points, keys, den = bezier_points(local, tolerance)
+        points = round_samples(points, keys, den, local, algorithm, order) + origin.astype(np.int64)
+    else:
+        points = to_array(alg.curve_points(as_list(p_list), algorithm, tolerance, order))
+    if len(points) > 1:
+        keep = np.concatenate([[True], (points[1:] != points[:-1]).any(axis=1)])
+        points = points[keep]
+    return points
+
+
+def draw_curve(p_list, algorithm):
+    """绘制曲线，采样点之间的连线通过一次draw_lines调用生成
+
+    :return: (numpy.ndarray of int64, shape (N, 2)) 像素点坐标数组
+    """
+    points = curve_points(p_list, algorithm)
+    if len(points) == 1:
+        return draw_lines(np.concatenate([points, points], axis=1), 'Bresenham')
+    return draw_lines(np.concatenate([points[:-1], points[1:]], axis=1), 'Bresenham')
+
+
+def fill_polygon(p_list, rule):
+    """扫描线填充多边形
+
+    :param rule: (string) 填充规则，包括'even-odd'和'nonzero'
+    :return: (numpy.ndarray of int32, shape (M, 3)) 水平线段 (y, x_start, x_end) 数组
+    """
+    spans = alg.fill_polygon(as_list(p_list), rule)
+    if len(spans) == 0:
+        return np.empty((0, 3), SPAN_DTYPE)
+    return np.array(spans, SPAN_DTYPE)
+
+
+draw_dict = {
+    'line': draw_line,
+    'polygon': draw_polygon,
+    'ellipse': draw_ellipse,
+    'curve': draw_curve,
+    'filled_polygon': fill_polygon
+}
+
+# rasterize使用的绘制函数：返回像素数组的函数，其像素都依次相连，由chain_spans压缩
+span_dict = dict(draw_dict, ellipse=ellipse_spans)
+
+
+def clip_lines(segments, window, algorithm):
+    """一次裁剪多条线段，结果与cg_algorithms.clip逐条裁剪相同
+
+    先由区域码一次性接受两端都在窗口内、拒绝两端在窗口同侧外的线段，其余线段：
+    Cohen-Sutherland按与参考实现相同的顺序逐轮求交，每轮对所有未决线段同时计算；
+    Liang-Barsky对四条边同时求参数t，取下界的最大值和上界的最小值。
+    与参考实现不同，平行于窗口边且在窗口内的线段不会触发除零
+
+    :param segments: (array-like, shape (N, 4) 或 (N, 2, 2)) 线段的起点和终点坐标
+    :param window: (tuple of int: (x_min, y_min, x_max, y_max)) 裁剪窗口
+    :param algorithm: (string) 使用的裁剪算法，包括'Cohen-Sutherland'和'Liang-Barsky'
+    :return: (numpy.ndarray of int64, shape (K, 4), numpy.ndarray of int64, shape (K,))
+             保留下来的线段裁剪后取整的坐标，以及它们在segments中的下标
+    """
+    seg = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    x_min, x_max = sorted(window[0::2])
+    y_min, y_max = sorted(window[1::2])
+    if algorithm == 'Cohen-Sutherland':
+        x0, y0, x1, y1 = (c.copy() for c in seg.T)
+        oc0 = outcodes(x0, y0, x_min, y_min, x_max, y_max)
+        oc1 = outcodes(x1, y1, x_min, y_min, x_max, y_max)
+        accept = np.zeros(len(seg), bool)
+        active = np.ones(len(seg), bool)
+        while True:
+            inside = active & (oc0 == 0) & (oc1 == 0)
+            accept |= inside
+            active &= ~inside & ((oc0 & oc1) == 0)
+            i = np.flatnonzero(active)
+            if len(i) == 0:
+                break
+            first = oc0[i] != 0
+            oc = np.where(first, oc0[i], oc1[i])
+            ax, ay, bx, by = x0[i], y0[i], x1[i], y1[i]
+            dx, dy = bx - ax, by - ay
+            x, y = np.empty(len(i)), np.empty(len(i))
+            # 与参考实现相同的求交优先级：左、右、上（y < y_min）、下
+            todo = np.ones(len(i), bool)
+            for bit, bound, vertical in ((0b0001, x_min, True), (0b0010, x_max, True),
+                                         (0b1000, y_min, False), (0b0100, y_max, False)):
+                m = todo & ((oc & bit) != 0)
+                todo &= ~m
+                if vertical:
+                    x[m], y[m] = bound, (bound - ax[m]) * dy[m] / dx[m] + ay[m]
+                else:
+                    x[m], y[m] = (bound - ay[m]) * dx[m] / dy[m] + ax[m], bound
+            code = outcodes(x, y, x_min, y_min, x_max, y_max)
+            j, k = i[first], i[~first]
+            x0[j], y0[j], oc0[j] = x[first], y[first], code[first]
+            x1[k], y1[k], oc1[k] = x[~first], y[~first], code[~first]
+        index = np.flatnonzero(accept)
+        clipped = np.stack([x0, y0, x1, y1], axis=1)[index]
+    elif algorithm == 'Liang-Barsky':
+        x0, y0, x1, y1 = seg.T
+        dx, dy = x1 - x0, y1 - y0
+        d = np.stack([-dx, dx, -dy, dy], axis=1)
+        q = np.stack([x0 - x_min, x_max - x0, y0 - y_min, y_max - y0], axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = q / d
+        tl = np.max(np.where(d < 0, t, 0), axis=1, initial=0)
+        tu = np.min(np.where(d > 0, t, 1), axis=1, initial=1)
+        visible = (tl <= tu) & ~((d == 0) & (q < 0)).any(axis=1)
+        index = np.flatnonzero(visible)
+        tl, tu = tl[index], tu[index]
+        x0, y0, dx, dy = x0[index], y0[index], dx[index], dy[index]
+        end = tu < 1
+        start = tl > 0
+        clipped = np.stack([np.where(start, x0 + tl * dx, x0), np.where(start, y0 + tl * dy, y0),
+                            np.where(end, x0 + tu * dx, x0 + dx), np.where(end, y0 + tu * dy, y0 + dy)], axis=1)
+    else:
+        print('Invalid algorithm: ' + algorithm)
+        return np.empty((0, 4), np.int64), np.empty(0, np.int64)
+    return np.rint(clipped).astype(np.int64), index
+
+
+def clip_polygon(points, window):
+    """Sutherland-Hodgman多边形裁剪，裁剪窗口为任意凸多边形，结果与cg_algorithms.polygon_clip_convex相同
+
+    对窗口的每条边，所有顶点的内外判断和交点一次算出：每条多边形边 (prev, cur) 在穿过窗口边时
+    输出交点，在cur位于内侧时输出cur，按掩码从 (n, 2, 2) 的候选点中取出即为新多边形
+
+    :param points: (array-like, shape (N, 2)) 多边形的顶点坐标，不会被修改
+    :param window: (array-like, shape (M, 2)) 凸裁剪窗口的顶点，顺时针或逆时针均可
+    :return: (numpy.ndarray of int64, shape (K, 2)) 裁剪后取整的顶点，相邻重复的顶点只保留一个
+    """
+    p = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    w = np.asarray(window, dtype=np.float64).reshape(-1, 2)
+    a, b = np.roll(w, 1, axis=0), w
+    area = np.sum(a[:, 0] * b[:, 1] - b[:, 0] * a[:, 1])
+    if area == 0:
+        return np.empty((0, 2), np.int64)
+    for (ax, ay), (bx, by) in zip(a, b):
+        if len(p) == 0:
+            break
+        side = np.sign(area) * ((bx - ax) * (p[:, 1] - ay) - (by - ay) * (p[:, 0] - ax))
+        prev, side_prev = np.roll(p, 1, axis=0), np.roll(side, 1)
+        inside = side >= 0
+        crossing = inside != (side_prev >= 0)
+        # 不穿过窗口边的边不取交点，其t可能是inf或nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = side_prev / (side_prev - side)
+            candidates = np.stack([prev + t[:, None] * (p - prev), p], axis=1)
+        p = candidates[np.stack([crossing, inside], axis=1)]
+    return compact_polygon(p)
+
+
+def polygon_clip(points, x_min, y_min, x_max, y_max):
+    """Liang-Barsky多边形裁剪，结果与cg_algorithms.polygon_clip相同
+
+    每条边至多输出三个点：进入窗口前经过的转折顶点、进入点，以及离开点、终点或第二个转折顶点之一。
+    所有边的参数t和这三个候选点一次算出，按掩码依次取出即为新多边形
+
+    :param points: (array-like, shape (N, 2)) 多边形的顶点坐标，不会被修改
+    :return: (numpy.ndarray of int64, shape (K, 2)) 裁剪后取整的顶点，相邻重复的顶点只保留一个
+    """
+    x_min, x_max = min(x_min, x_max), max(x_min, x_max)
+    y_min, y_max = min(y_min, y_max), max(y_min, y_max)
+    p = np.asarray(points).reshape(-1, 2)
+    p = p.astype(np.int64 if p.dtype.kind in 'iub' else np.float64)
+    if len(p) == 0:
+        return np.empty((0, 2), np.int64)
+    # 与cg_algorithms.polygon_is_counterclockwise相同，顺时针时反转为 p0, p[n-1], ..., p1
+    if len(p) >= 3 and not np.sum(p[:, 1] * (np.roll(p[:, 0], 1) - np.roll(p[:, 0], -1))) > 0:
+        p = np.concatenate([p[:1], p[:0:-1]])
+    x, y = p[:, 0], p[:, 1]
+    end = np.roll(p, -1, axis=0)
+    dx, dy = end[:, 0] - x, end[:, 1] - y
+    x_in, x_out = np.where(dx > 0, x_min, x_max), np.where(dx > 0, x_max, x_min)
+    y_in, y_out = np.where(dy > 0, y_min, y_max), np.where(dy > 0, y_max, y_min)
+    # 平行于坐标轴的边对应的t取无穷，未选中的候选点可能是nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_in_x = np.where(dx != 0, (x_in - x) / dx, -np.inf)
+        t_in_y = np.where(dy != 0, (y_in - y) / dy, -np.inf)
+        t_out_x = np.where(dx != 0, (x_out - x) / dx, np.where((x_min <= x) & (x <= x_max), np.inf, -np.inf))
+        t_out_y = np.where(dy != 0, (y_out - y) / dy, np.where((y_min <= y) & (y <= y_max), np.inf, -np.inf))
+        x_first = t_in_x < t_in_y
+        t_in_1, t_in_2 = np.where(x_first, t_in_x, t_in_y), np.where(x_first, t_in_y, t_in_x)
+        exit_x = t_out_x < t_out_y
+        t_out_1 = np.where(exit_x, t_out_x, t_out_y)
+        enter_x = t_in_x > t_in_y
+        entry = np.where(enter_x[:, None], np.stack([x_in, y + t_in_x * dy], axis=1),
+                         np.stack([x + t_in_y * dx, y_in], axis=1))
+        leave = np.where(exit_x[:, None], np.stack([x_out, y + t_out_x * dy], axis=1),
+                         np.stack([x + t_out_y * dx, y_out], axis=1))
+    reach = (1 >= t_in_1) & (1 >= t_in_2) & ((0 < t_in_2) | (0 < t_out_1))
+    visible = reach & (t_in_2 <= t_out_1)
+    last = np.where(visible[:, None], np.where((1 > t_out_1)[:, None], leave, end),
+                    np.where(enter_x[:, None], np.stack([x_in, y_out], axis=1), np.stack([x_out, y_in], axis=1)))
+    candidates = np.stack([np.stack([x_in, y_in], axis=1), entry, last], axis=1)
+    mask = np.stack([(1 >= t_in_1) & (0 < t_in_1), visible & (0 < t_in_2), reach], axis=1)
+    return compact_polygon(candidates[mask])
+
+
+def compact_polygon(points):
+    """顶点坐标取整，并去掉相邻（包括首尾）重复的顶点，与cg_algorithms.compact_polygon相同
+    """
+    result = np.rint(points).astype(np.int64).reshape(-1, 2)
+    if len(result) == 0:
+        return result
+    keep = np.ones(len(result), bool)
+    keep[1:] = (result[1:] != result[:-1]).any(axis=1)
+    result = result[keep]
+    # 去掉与第一个顶点相同的末尾顶点
+    tail = len(result)
+    while tail > 1 and (result[tail - 1] == result[0]).all():
+        tail -= 1
+    return result[:tail]
+
+
+def outcodes(x, y, x_min, y_min, x_max, y_max):
+    """对坐标数组计算Cohen-Sutherland区域码，编码与cg_algorithms.outcode相同
+    """
+    return (np.where(x < x_min, 0b0001, np.where(x > x_max, 0b0010, 0)) |
+            np.where(y < y_min, 0b1000, np.where(y > y_max, 0b0100, 0)))
+
+
+def rasterize(item_type, p_list, algorithm):
+    """计算单个图元的光栅结果
+
+    :param item_type: (string) 图元类型，'line'、'polygon'、'ellipse'、'curve'或'filled_polygon'
+    :param p_list: (list of list of int) 图元参数
+    :param algorithm: (string) 绘制使用的算法，填充多边形为填充规则
+    :return: (numpy.ndarray of int32, shape (M, 3)) 水平线段 (y, x_start, x_end) 数组
+    """
+    raster = span_dict[item_type](p_list, algorithm)
+    return raster if raster.shape[1] == 3 else chain_spans(raster)
+
+
+class RasterCache:
+    """
+    图元光栅结果的LRU缓存
+    以平移归一化后的图元参数和算法为键，形状相同、位置不同的图元命中后只需加上偏移量。
+    归一化偏移取偶数，使取整（四舍六入五成偶）的结果与平移量无关。
+    整数算法（Bresenham、中点椭圆、扫描线填充）以及在局部坐标中采样的曲线，命中结果与直接计算完全一致。
+    DDA的取整结果受起点坐标的浮点误差影响，平移后不一定严格相差平移量，因此DDA多边形不缓存
+    """
+    cached_types = ('polygon', 'ellipse', 'curve', 'filled_polygon')
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def rasterize(self, item_type, p_list, algorithm):
+        """同cg_raster.rasterize，对cached_types中的图元查询缓存
+        """
+        if item_type not in self.cached_types or algorithm == 'DDA' or len(p_list) == 0:
+            return rasterize(item_type, p_list, algorithm)
+        points = np.asarray(p_list).reshape(-1, 2)
+        ox, oy = (np.floor(points.min(axis=0)).astype(np.int64) // 2 * 2).tolist()
+        normalized = (points - [ox, oy]).tolist()
+        key = item_type, algorithm, tuple(c for p in normalized for c in p)
+        spans = self.entries.get(key)
+        if spans is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        else:
+            self.misses += 1
+            spans = rasterize(item_type, normalized, algorithm)
+            self._store(key, spans)
+        return spans + np.array([oy, ox, ox], SPAN_DTYPE)
+
+    def _store(self, key, spans):
+        if spans.nbytes > self.max_bytes:
+            return
+        self.entries[key] = spans
+        self.nbytes += spans.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+
+    def __str__(self):
+        return 'RasterCache: {} hits, {} misses, {} evictions, {} entries, {} bytes'.format(
+            self.hits, self.misses, self.evictions, len(self.entries), self.nbytes)
+
+
+def rasterize_all(items):
+    """计算一组图元的光栅结果，所有椭圆通过一次draw_ellipses调用生成
+
+    :param items: (list of [item_type, p_list, algorithm, color]) 图元序列
+    :return: (list of numpy.ndarray) 与items一一对应的水平线段数组
+    """
+    rasters = [None] * len(items)
+    ellipses = []
+    for i, (item_type, p_list, algorithm, color) in enumerate(items):
+        if item_type == 'ellipse':
+            ellipses.append(i)
+        else:
+            rasters[i] = rasterize(item_type, p_list, algorithm)
+    if ellipses:
+        spans, counts = draw_ellipses([items[i][1] for i in ellipses], return_counts=True, spans=True)
+        for i, part in zip(ellipses, np.split(spans, np.cumsum(counts)[:-1])):
+            rasters[i] = part
+    return rasters
+
+
+def paint_spans(canvas, spans, color, region=None):
+    """将一组水平线段写入画布
+
+    长线段逐条用行切片赋值写入；短线段（如轮廓上的单个像素）逐条切片的开销大于展开，
+    因此展开为像素后一次花式索引赋值
+
+
+    :param canvas: (numpy.ndarray of uint8, shape (height, width, 3)) 画布，第0行对应y=height-1
+    :param spans: (numpy.ndarray of int, shape (M, 3)) 水平线段 (y, x_start, x_end) 数组
+    :param color: (array-like of uint8) RGB颜色
+    :param region: (tuple of int: (x_min, y_min, x_max, y_max)) 只写入该闭区间矩形内的像素，None表示整个画布
+    """
+    height, width = canvas.shape[:2]
+    x_min, y_min, x_max, y_max = region if region is not None else (0, 0, width - 1, height - 1)
+    y = spans[:, 0]
+    x_start = np.maximum(spans[:, 1], max(x_min, 0))
+    x_end = np.minimum(spans[:, 2], min(x_max, width - 1))
+    inside = (y >= max(y_min, 0)) & (y <= min(y_max, height - 1)) & (x_start <= x_end)
+    y, x_start, x_end = y[inside], x_start[inside], x_end[inside]
+    long = x_end - x_start + 1 >= SPAN_SLICE_MIN
+    for row, x0, x1 in zip((height - 1 - y[long]).tolist(), x_start[long].tolist(), x_end[long].tolist()):
+        canvas[row, x0:x1 + 1] = color
+    if not long.all():
+        short = ~long
+        pixels = span_pixels(np.stack([y[short], x_start[short], x_end[short]], axis=1))
+        canvas[height - 1 - pixels[:, 1], pixels[:, 0]] = color
+
+
+def paint(canvas, pixels, color, region=None):
+    """将一组像素一次性写入画布，超出画布（或指定区域）的像素被裁掉
+
+    :param canvas: (numpy.ndarray of uint8, shape (height, width, 3)) 画布，第0行对应y=height-1
+    :param pixels: (numpy.ndarray of int, shape (N, 2) 或 (M, 3)) 像素点坐标数组或水平线段数组
+    :param color: (array-like of uint8) RGB颜色
+    :param region: (tuple of int: (x_min, y_min, x_max, y_max)) 只写入该闭区间矩形内的像素，None表示整个画布
+    """
+    if pixels.shape[1] == 3:
+        paint_spans(canvas, pixels, color, region)
+        return
+    height, width = canvas.shape[:2]
+    x_min, y_min, x_max, y_max = region if region is not None else (0, 0, width - 1, height - 1)
+    x, y = pixels[:, 0], pixels[:, 1]
+    inside = (x >= max(x_min, 0)) & (x <= min(x_max, width - 1)) & \
+             (y >= max(y_min, 0)) & (y <= min(y_max, height - 1))
+    canvas[height - 1 - y[inside], x[inside]] = color
+
+
+def paint_all(canvas, rasters, region=None):
+    """按顺序写入多个图元的像素
+
+    相邻的同色图元（像素数组与线段数组分别）合并为一次写入；不同颜色之间按顺序写入，保证重叠处后画的图元在上
+
+    :param canvas: (numpy.ndarray of uint8, shape (height, width, 3)) 画布
+    :param rasters: (iterable of (pixels, color)) 按绘制顺序排列的图元像素与颜色
+    :param region: (tuple of int: (x_min, y_min, x_max, y_max)) 只写入该矩形内的像素
+    """
+    run, run_color = [], None
+    for pixels, color in rasters:
+        if run and (pixels.shape[1] != run[-1].shape[1] or not np.array_equal(color, run_color)):
+            paint(canvas, np.concatenate(run), run_color, region)
+            run = []
+        run.append(pixels)
+        run_color = color
+    if run:
+        paint(canvas, np.concatenate(run), run_color, region)
+
+
+def render(canvas, items):
+    """按绘制顺序将图元写入画布
+
+    :param canvas: (numpy.ndarray of uint8, shape (height, width, 3)) 画布
+    :param items: (iterable of [item_type, p_list, algorithm, color]) 图元序列
+    """
+    items = list(items)
+    paint_all(canvas, zip(rasterize_all(items), (item[3] for item in items)))
+
+
+def bounding_box(pixels):
+    """像素的包围盒
+
+    :param pixels: (numpy.ndarray of int, shape (N, 2) 或 (M, 3)) 像素点坐标数组或水平线段数组
+    :return: (tuple of int: (x_min, y_min, x_max, y_max)) 闭区间包围盒，没有像素时为None
+    """
+    if len(pixels) == 0:
+        return None
+    if pixels.shape[1] == 3:
+        return (int(pixels[:, 1].min()), int(pixels[:, 0].min()),
+                int(pixels[:, 2].max()), int(pixels[:, 0].max()))
+    x_min, y_min = pixels.min(axis=0)
+    x_max, y_max = pixels.max(axis=0)
+    return int(x_min), int(y_min), int(x_max), int(y_max)
+
+
+def item_bbox(item_type, p_list):
+    """由图元参数估计像素的包围盒，无需光栅化
+
+    线段、多边形的像素在顶点范围内，曲线在控制点的凸包内，椭圆在包围框内；
+    向外扩展1个像素以容纳取整误差
+
+    :param item_type: (string) 图元类型
+    :param p_list: (array-like, shape (n, 2)) 图元参数
+    :return: (tuple of int: (x_min, y_min, x_max, y_max)) 闭区间包围盒，参数为空时为None
+    """
+    if len(p_list) == 0:
+        return None
+    points = np.asarray(p_list).reshape(-1, 2)
+    (x_min, y_min), (x_max, y_max) = np.floor(points.min(axis=0)).tolist(), np.ceil(points.max(axis=0)).tolist()
+    return int(x_min) - 1, int(y_min) - 1, int(x_max) + 1, int(y_max) + 1
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 场景快照的二进制格式（依赖numpy，供cg_cli的dumpScene、loadScene使用）
+# 文件头之后依次为：类型名和算法名（JSON）、以换行分隔的图元编号、各数组的原始字节（小端），每段按8字节对齐。
+# 读取时各数组通过numpy.memmap以写时复制方式映射，不解析顶点数据，之后的修改也不会写回文件
+import collections
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+import cg_store
+
+
+MAGIC = b'CGSCENE\0'
+VERSION = 1
+# 标识、版本、画布宽高、画笔颜色、图元数、顶点数、尚未应用变换的图元数、JSON段长度、编号段长度
+HEADER = struct.Struct('<8sIii3sxqqqqq')
+
+Snapshot = collections.namedtuple('Snapshot', ['width', 'height', 'pen_color', 'store', 'transforms'])
+
+
+def sections(items, vertices, pending):
+    """各数组段的 (名称, dtype, 形状)，按在文件中的顺序排列
+    """
+    return [('types', '<u1', (items,)),
+            ('algorithms', '<u1', (items,)),
+            ('colors', '<u1', (items, 3)),
+            ('counts', '<i8', (items,)),
+            ('vertices', '<i4', (vertices, 2)),
+            ('pending', '<i8', (pending,)),  # 尚未应用变换的图元的序号
+            ('matrices', '<f8', (pending, 3, 3))]
+
+
+def padding(size):
+    return -size % 8
+
+
+def dump(path, width, height, pen_color, store, transforms):
+    """保存场景
+    先写入同一目录下的临时文件再替换目标文件，目标文件正是store映射的来源（读取后原样保存）时，
+    写入过程中映射的数据仍然有效，中途出错也不会破坏原来的文件
+
+    :param path: (string) 输出文件路径
+    :param width: (int) 画布宽度
+    :param height: (int) 画布高度
+    :param pen_color: (array-like of uint8) 画笔颜色
+    :param store: (cg_store.ItemStore) 图元存储，保存前会被压缩
+    :param transforms: (dict: item_id -> 3x3 tuple) 尚未应用到参数上的变换矩阵，原样保存，不取整
+    """
+    arrays = store.arrays()
+    ids = arrays['ids']
+    arrays['pending'] = np.array([store.slots[item_id] for item_id in transforms], np.int64)
+    arrays['matrices'] = np.array([transforms[item_id] for item_id in transforms], np.float64).reshape(-1, 3, 3)
+    meta = json.dumps({'types': arrays['type_names'], 'algorithms': arrays['algorithm_names']}).encode('utf-8')
+    id_blob = '\n'.join(ids).encode('utf-8')
+    fd, temp_path = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(path) + '.',
+                                     dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(HEADER.pack(MAGIC, VERSION, width, height, bytes(np.asarray(pen_color, np.uint8)),
+                                 len(ids), len(arrays['vertices']), len(transforms), len(meta), len(id_blob)))
+            for blob in (meta, id_blob):
+                fp.write(blob + b'\0' * padding(len(blob)))
+            for name, dtype, shape in sections(len(ids), len(arrays['vertices']), len(transforms)):
+                data = np.ascontiguousarray(arrays[name], dtype).reshape(shape)
+                fp.write(data.tobytes())
+                fp.write(b'\0' * padding(data.nbytes))
+        # mkstemp创建的文件只有所有者可读写，改为与直接open创建的文件相同的权限
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temp_path, 0o666 & ~umask)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def load(path):
+    """读取场景，各数组映射到文件而不读入内存
+
+    :param path: (string) dump保存的文件路径
+    :return: (Snapshot) 画布宽高、画笔颜色、图元存储和尚未应用的变换矩阵
+    :raise ValueError: 不是场景文件、版本不支持或文件不完整
+    """
+    file_size = os.path.getsize(path)
+    if file_size < HEADER.size:
+        raise ValueError('Truncated scene file: ' + path)
+    with open(path, 'rb') as fp:
+        magic, version, width, height, pen_color, items, vertices, pending, meta_size, ids_size = \
+            HEADER.unpack(fp.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError('Not a scene file: ' + path)
+        if version != VERSION:
+            raise ValueError('Unsupported scene file version: {}'.format(version))
+        offset = HEADER.size + meta_size + padding(meta_size) + ids_size + padding(ids_size)
+        sizes = [np.dtype(dtype).itemsize * int(np.prod(shape))
+                 for name, dtype, shape in sections(items, vertices, pending)]
+        if file_size < offset + sum(size + padding(size) for size in sizes):
+            raise ValueError('Truncated scene file: ' + path)
+        meta = json.loads(fp.read(meta_size + padding(meta_size))[:meta_size].decode('utf-8'))
+        ids = fp.read(ids_size).decode('utf-8').split('\n') if items else []
+    arrays = {}
+    for (name, dtype, shape), size in zip(sections(items, vertices, pending), sizes):
+        if size:
+            arrays[name] = np.memmap(path, dtype, 'c', offset, shape).view(np.ndarray)
+        else:
+            arrays[name] = np.zeros(shape, dtype)
+        offset += size + padding(size)
+    store = cg_store.ItemStore.from_arrays(ids, meta['types'], meta['algorithms'], arrays['types'],
+                                           arrays['algorithms'], arrays['colors'], arrays['counts'],
+                                           arrays['vertices'])
+    transforms = {ids[slot]: tuple(tuple(row) for row in matrix)
+                  for slot, matrix in zip(arrays['pending'].tolist(), arrays['matrices'].tolist())}
+    return Snapshot(width, height, np.frombuffer(pen_color, np.uint8).copy(), store, transforms)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 结构数组形式的图元存储（依赖numpy，供cg_cli使用）
+# 每个图元占一个槽位：类型和算法为uint8编码，颜色存于uint8颜色表，
+# 所有图元的顶点依次存于一个int32顶点缓冲区，槽位只记录顶点的起始位置和个数
+import collections.abc
+import copy
+
+import numpy as np
+
+
+VERTEX_DTYPE = np.int32
+
+
+class ItemStore(collections.abc.Mapping):
+    """
+    按绘制顺序排列的图元存储
+    可当作 item_id -> (item_type, p_list, algorithm, color) 的只读字典使用，其中p_list和color
+    是存储内数组的视图，不复制；视图在该图元被修改或存储被压缩之前有效。
+    删除图元只将槽位标记为空，修改顶点个数时在缓冲区末尾写入新顶点；
+    空槽位或失效的顶点多于有效的部分时，按原顺序压缩
+    """
+    def __init__(self, capacity=64, vertex_capacity=256):
+        """
+        :param capacity: (int) 初始槽位数
+        :param vertex_capacity: (int) 顶点缓冲区的初始容量
+        """
+        self.ids = []  # 槽位 -> item_id，已删除的槽位为None
+        self.slots = {}  # item_id -> 槽位
+        self.types = np.zeros(capacity, np.uint8)
+        self.algorithms = np.zeros(capacity, np.uint8)
+        self.colors = np.zeros((capacity, 3), np.uint8)
+        self.offsets = np.zeros(capacity, np.int64)
+        self.counts = np.zeros(capacity, np.int64)
+        self.vertices = np.zeros((vertex_capacity, 2), VERTEX_DTYPE)
+        self.vertex_count = 0  # 缓冲区中已使用的顶点数
+        self.garbage = 0  # 其中已失效的顶点数
+        self.type_names, self.type_codes = [], {}
+        self.algorithm_names, self.algorithm_codes = [], {}
+
+    def __getitem__(self, item_id):
+        slot = self.slots[item_id]
+        offset = self.offsets[slot]
+        return (self.type_names[self.types[slot]], self.vertices[offset:offset + self.counts[slot]],
+                self.algorithm_names[self.algorithms[slot]], self.colors[slot])
+
+    def __iter__(self):
+        return (item_id for item_id in self.ids if item_id is not None)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, item_id):
+        return item_id in self.slots
+
+    def __delitem__(self, item_id):
+        slot = self.slots.pop(item_id)
+        self.ids[slot] = None
+        self.garbage += int(self.counts[slot])
+        self._maybe_compact()
+
+    @staticmethod
+    def _intern(names, codes, name):
+        """类型或算法名的编码，新名称依次分配编码
+        """
+        code = codes.get(name)
+        if code is None:
+            if len(names) > np.iinfo(np.uint8).max:
+                raise ValueError('too many distinct names: {}'.format(name))
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    @staticmethod
+    def _points(p_list):
+        """图元参数转为 (n, 2) 数组，浮点数取整
+
+        :raise OverflowError: 坐标超出顶点缓冲区int32的范围（不检查时写入会静默回绕）
+        """
+        points = np.asarray(p_list).reshape(-1, 2)
+        if points.dtype.kind == 'f':
+            points = np.rint(points)
+        if len(points):
+            info = np.iinfo(VERTEX_DTYPE)
+            low, high = points.min(), points.max()
+            if not (info.min <= low and high <= info.max):
+                raise OverflowError('coordinate out of {} range [{}, {}]: {}'.format(
+                    np.dtype(VERTEX_DTYPE).name, info.min, info.max, low if not info.min <= low else high))
+        return points
+
+    def add(self, item_id, item_type, p_list, algorithm, color):
+        """添加图元；编号已存在时替换该图元，保持其原来的绘制顺序
+
+        :param item_id: (string) 图元编号
+        :param item_type: (string) 图元类型
+        :param p_list: (array-like, shape (n, 2)) 图元参数，取整后保存
+        :param algorithm: (string) 绘制使用的算法，填充多边形为填充规则
+        :param color: (array-like of uint8) RGB颜色
+        :raise OverflowError: 坐标超出int32的范围，此时存储不变
+        """
+        points = self._points(p_list)
+        slot = self.slots.get(item_id)
+        if slot is None:
+            slot = len(self.ids)
+            if slot == len(self.types):
+                self._resize(max(2 * slot, 64))
+            self.ids.append(item_id)
+            self.slots[item_id] = slot
+            self.counts[slot] = 0
+        self.types[slot] = self._intern(self.type_names, self.type_codes, item_type)
+        self.algorithms[slot] = self._intern(self.algorithm_names, self.algorithm_codes, algorithm)
+        self.colors[slot] = color
+        self.set_p_list(item_id, points)
+
+    def set_p_list(self, item_id, p_list):
+        """替换图元参数；顶点个数不变时原地写入，否则写到缓冲区末尾
+
+        :raise OverflowError: 坐标超出int32的范围，此时存储不变
+        """
+        slot = self.slots[item_id]
+        points = self._points(p_list)
+        count = len(points)
+        if count != self.counts[slot]:
+            if self.vertex_count + count > len(self.vertices):
+                self._resize_vertices(max(2 * len(self.vertices), self.vertex_count + count))
+            self.garbage += int(self.counts[slot])
+            self.offsets[slot] = self.vertex_count
+            self.counts[slot] = count
+            self.vertex_count += count
+        offset = self.offsets[slot]
+        self.vertices[offset:offset + count] = points
+        self._maybe_compact()
+
+    def p_list(self, item_id):
+        """图元参数的列表形式（复制），供cg_algorithms中的纯Python实现使用
+
+        :return: (list of list of int) 图元参数
+        """
+        return self[item_id][1].tolist()
+
+    def ids_of_type(self, item_type):
+        """某一类型的所有图元，直接比较类型编码而不逐个构造图元
+
+        :return: (list of string) 按绘制顺序排列的图元编号
+        """
+        code = self.type_codes.get(item_type)
+        if code is None:
+            return []
+        slots = np.flatnonzero(self.types[:len(self.ids)] == code).tolist()
+        return [self.ids[slot] for slot in slots if self.ids[slot] is not None]
+
+    def _resize(self, capacity):
+        for name in ('types', 'algorithms', 'colors', 'offsets', 'counts'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], old.dtype)
+            new[:len(self.ids)] = old[:len(self.ids)]
+            setattr(self, name, new)
+
+    def _resize_vertices(self, capacity):
+        vertices = np.zeros((capacity, 2), VERTEX_DTYPE)
+        vertices[:self.vertex_count] = self.vertices[:self.vertex_count]
+        self.vertices = vertices
+
+    def _maybe_compact(self):
+        if len(self.ids) - len(self.slots) > len(self.slots) or self.garbage > self.vertex_count - self.garbage:
+            self.compact()
+
+    def compact(self):
+        """去掉空槽位和失效的顶点，保持图元顺序；之前取得的视图不再对应存储中的数据
+        """
+        keep = np.array([slot for slot, item_id in enumerate(self.ids) if item_id is not None], np.int64)
+        counts = self.counts[keep]
+        starts = self.offsets[keep]
+        # 每个保留的顶点在原缓冲区中的位置
+        index = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum(), dtype=np.int64)
+        capacity = max(2 * len(keep), 64)
+        for name in ('types', 'algorithms', 'colors', 'counts'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], old.dtype)
+            new[:len(keep)] = old[keep]
+            setattr(self, name, new)
+        self.offsets = np.zeros(capacity, np.int64)
+        self.offsets[:len(keep)] = np.cumsum(counts) - counts
+        self.vertex_count = int(counts.sum())
+        vertices = np.zeros((max(2 * self.vertex_count, 256), 2), VERTEX_DTYPE)
+        vertices[:self.vertex_count] = self.vertices[index]
+        self.vertices = vertices
+        self.garbage = 0
+        self.ids = [self.ids[slot] for slot in keep.tolist()]
+        self.slots = {item_id: slot for slot, item_id in enumerate(self.ids)}
+
+    def arrays(self):
+        """压缩后各数组的有效部分，用于保存场景（见cg_snapshot）
+
+        :return: (dict) 图元编号列表ids、编码表type_names和algorithm_names，以及types、algorithms、
+                 colors、counts、vertices数组（视图）
+        """
+        if len(self.ids) != len(self.slots) or self.garbage:
+            self.compact()
+        n = len(self.ids)
+        return {'ids': self.ids, 'type_names': self.type_names, 'algorithm_names': self.algorithm_names,
+                'types': self.types[:n], 'algorithms': self.algorithms[:n], 'colors': self.colors[:n],
+                'counts': self.counts[:n], 'vertices': self.vertices[:self.vertex_count]}
+
+    @classmethod
+    def from_arrays(cls, ids, type_names, algorithm_names, types, algorithms, colors, counts, vertices):
+        """由arrays()的结果重建存储，直接使用传入的数组而不复制（可以是写时复制的内存映射）
+
+        :return: (ItemStore) 图元顺序与ids相同的存储
+        """
+        store = cls(0, 0)
+        store.ids = list(ids)
+        store.slots = {item_id: slot for slot, item_id in enumerate(store.ids)}
+        store.types, store.algorithms, store.colors, store.counts = types, algorithms, colors, counts
+        store.offsets = np.cumsum(counts) - counts
+        store.vertices = vertices
+        store.vertex_count = len(vertices)
+        store.type_names, store.type_codes = list(type_names), {name: i for i, name in enumerate(type_names)}
+        store.algorithm_names = list(algorithm_names)
+        store.algorithm_codes = {name: i for i, name in enumerate(algorithm_names)}
+        return store
+
+    def bboxes(self):
+        """按绘制顺序排列的各图元参数的包围盒，与cg_raster.item_bbox相同；没有顶点的图元为全0
+
+        :return: (numpy.ndarray of int64, shape (n, 4)) 每行为 (x_min, y_min, x_max, y_max)
+        """
+        keep = np.array([slot for slot, item_id in enumerate(self.ids) if item_id is not None], np.int64)
+        counts, offsets = self.counts[keep], self.offsets[keep]
+        result = np.zeros((len(keep), 4), np.int64)
+        nonempty = counts > 0
+        if nonempty.any():
+            # 每个图元的顶点是缓冲区中的连续一段，按段求最小值和最大值
+            order = np.argsort(offsets[nonempty], kind='stable')
+            starts = offsets[nonempty][order]
+            ends = starts + counts[nonempty][order]
+            boundaries = np.stack([starts, ends], axis=1).reshape(-1)
+            vertices = self.vertices[:ends[-1]]
+            lo = np.minimum.reduceat(vertices, boundaries[:-1], axis=0)[::2]
+            hi = np.maximum.reduceat(vertices, boundaries[:-1], axis=0)[::2]
+            boxes = np.empty((len(order), 4), np.int64)
+            boxes[order] = np.concatenate([lo - 1, hi + 1], axis=1)
+            result[nonempty] = boxes
+        return result
+
+    def copy(self):
+        """压缩后的独立副本，用作并行保存的快照
+        """
+        store = copy.copy(self)
+        store.ids = list(self.ids)
+        store.type_names, store.type_codes = list(self.type_names), dict(self.type_codes)
+        store.algorithm_names, store.algorithm_codes = list(self.algorithm_names), dict(self.algorithm_codes)
+        store.compact()
+        return store
+
+    def nbytes(self):
+        """存储占用的数组内存（字节），不含编号字符串和字典
+        """
+        return sum(array.nbytes for array in (self.types, self.algorithms, self.colors,
+                                              self.offsets, self.counts, self.vertices))
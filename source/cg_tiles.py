@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 分块并行光栅化（依赖numpy，供cg_cli使用）
+# 画布划分为若干块，各工作进程将落在块内的图元按绘制顺序写入共享内存中的同一张画布
+import multiprocessing
+
+import numpy as np
+
+import cg_bmp
+import cg_raster
+
+
+worker_state = {}
+
+
+def init_worker(buffer, path, width, height, items, max_bytes):
+    """工作进程初始化：将共享内存或输出文件映射为画布，并准备本进程的光栅结果缓存
+    """
+    if path is not None:
+        worker_state['image'] = cg_bmp.open_canvas(path, width, height)
+    else:
+        worker_state['image'] = np.frombuffer(buffer, np.uint8).reshape(height, width, 3)
+    worker_state['items'] = items
+    worker_state['rasters'] = {}
+    worker_state['nbytes'] = 0
+    worker_state['max_bytes'] = max_bytes
+
+
+def worker_raster(index):
+    """第index个图元的光栅结果；跨越多个块的图元在同一进程中只光栅化一次（缓存超出上限时清空）
+    """
+    rasters = worker_state['rasters']
+    spans = rasters.get(index)
+    if spans is None:
+        item_type, p_list, algorithm, color = worker_state['items'][index]
+        spans = cg_raster.rasterize(item_type, p_list, algorithm)
+        if worker_state['nbytes'] + spans.nbytes > worker_state['max_bytes']:
+            rasters.clear()
+            worker_state['nbytes'] = 0
+        rasters[index] = spans
+        worker_state['nbytes'] += spans.nbytes
+    return spans
+
+
+def render_tile(task):
+    """将一个块内的图元按绘制顺序写入画布；各块互不重叠，因此无需加锁
+    """
+    region, indices = task
+    items = worker_state['items']
+    cg_raster.paint_all(worker_state['image'],
+                        ((worker_raster(i), items[i][3]) for i in indices), region)
+
+
+def bin_items(items, width, height, tile_size):
+    """按包围盒将图元分配到与之相交的块
+
+    :param items: (list of [item_type, p_list, algorithm, color]) 按绘制顺序排列的图元
+    :return: (list of (region, indices)) 每个非空块的闭区间范围 (x_min, y_min, x_max, y_max)，以及按绘制顺序排列的图元下标
+    """
+    tiles = {}
+    for index, (item_type, p_list, algorithm, color) in enumerate(items):
+        bbox = cg_raster.item_bbox(item_type, p_list)
+        if bbox is None:
+            continue
+        x_min, y_min = max(bbox[0], 0), max(bbox[1], 0)
+        x_max, y_max = min(bbox[2], width - 1), min(bbox[3], height - 1)
+        for ty in range(y_min // tile_size, y_max // tile_size + 1):
+            for tx in range(x_min // tile_size, x_max // tile_size + 1):
+                tiles.setdefault((tx, ty), []).append(index)
+    tasks = []
+    for (tx, ty), indices in tiles.items():
+        region = (tx * tile_size, ty * tile_size,
+                  min((tx + 1) * tile_size, width) - 1, min((ty + 1) * tile_size, height) - 1)
+        tasks.append((region, indices))
+    return tasks
+
+
+def render(width, height, items, jobs, tile_size=1024, max_bytes=256 * 1024 * 1024, path=None):
+    """分块并行绘制画布，结果与cg_raster.render逐个图元绘制相同
+
+    :param items: (list of [item_type, p_list, algorithm, color]) 按绘制顺序排列的图元
+    :param jobs: (int) 工作进程数
+    :param tile_size: (int) 块的边长（像素）
+    :param max_bytes: (int) 每个工作进程缓存光栅结果的内存上限
+    :param path: (string) 若给出，则各进程直接写入该BMP文件（见cg_bmp），否则写入共享内存
+    :return: (numpy.ndarray of uint8, shape (height, width, 3)) 位于共享内存或输出文件中的画布
+    """
+    buffer = None
+    if path is not None:
+        image = cg_bmp.create(path, width, height)
+    else:
+        buffer = multiprocessing.RawArray('B', width * height * 3)
+        image = np.frombuffer(buffer, np.uint8).reshape(height, width, 3)
+    image.fill(255)
+    tasks = bin_items(items, width, height, tile_size)
+    if tasks:
+        with multiprocessing.Pool(jobs, init_worker, (buffer, path, width, height, items, max_bytes)) as pool:
+            for _ in pool.imap_unordered(render_tile, tasks):
+                pass
+    return image
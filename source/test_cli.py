@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 命令行程序各保存方式的测试：python -m unittest test_cli
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+
+CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cg_cli.py')
+
+
+def run(input_file, output_dir, *options):
+    return subprocess.run([sys.executable, CLI, input_file, output_dir] + list(options),
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def read(path):
+    with open(path, 'rb') as fp:
+        return fp.read()
+
+
+class SaveTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_commands(self, lines):
+        path = os.path.join(self.directory.name, 'input.txt')
+        with open(path, 'w') as fp:
+            fp.write('\n'.join(lines) + '\n')
+        return path
+
+    def test_same_name_saves(self):
+        # 多次保存同名文件：并行保存时后一次保存不能截断仍在写入的文件，最后留下的是最后一次保存的结果
+        rng = random.Random(8)
+        lines = ['resetCanvas 600 400']
+        for i in range(6):
+            for j in range(10):
+                lines.append('setColor {} {} {}'.format(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+                lines.append('drawEllipse e{}_{} {} {} {} {}'.format(
+                    i, j, rng.randrange(600), rng.randrange(400), rng.randrange(600), rng.randrange(400)))
+            lines.append('saveCanvas same')
+        input_file = self.write_commands(lines)
+        expected = os.path.join(self.directory.name, 'serial')
+        self.assertEqual(run(input_file, expected).returncode, 0)
+        for options in (['-j', '3'], ['--mmap', '-j', '3']):
+            output_dir = os.path.join(self.directory.name, '_'.join(options))
+            result = run(input_file, output_dir, *options)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertEqual(read(os.path.join(output_dir, 'same.bmp')), read(os.path.join(expected, 'same.bmp')))
+
+    def test_worker_failure(self):
+        # 工作进程中保存失败时返回非零的退出状态
+        input_file = self.write_commands(['resetCanvas 10 10', 'saveCanvas bad'])
+        output_dir = os.path.join(self.directory.name, 'out')
+        os.makedirs(os.path.join(output_dir, 'bad.bmp'))
+        for options in ([], ['-j', '2'], ['--mmap', '-j', '2']):
+            self.assertNotEqual(run(input_file, output_dir, *options).returncode, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
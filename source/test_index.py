@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# GridIndex的查询测试：python -m unittest test_index
+# 随机插入、更新和删除后与逐个检查包围盒的结果对比，查询结果按图元首次插入的顺序排列
+import random
+import unittest
+
+import cg_algorithms as alg
+import cg_index
+from cg_index import GridIndex
+
+
+def random_bbox(rng):
+    """随机包围盒，包括跨越多个格子的和覆盖格子数超过max_cells的大包围盒
+    """
+    x, y = rng.randrange(-300, 1000), rng.randrange(-300, 1000)
+    size = rng.choice([2, 10, 100, 400, 3000])
+    return x, y, x + rng.randrange(size), y + rng.randrange(size)
+
+
+def brute_force(boxes, order, rect):
+    return sorted((item_id for item_id, bbox in boxes.items() if bbox is not None and cg_index.intersects(bbox, rect)),
+                  key=order.index)
+
+
+class GridIndexTest(unittest.TestCase):
+    def test_random(self):
+        rng = random.Random(3)
+        index = GridIndex(cell_size=32, max_cells=64)
+        boxes, order = {}, []
+        for step in range(3000):
+            kind = rng.random()
+            item_id = 'i{}'.format(rng.randrange(300))
+            if kind < 0.6:
+                bbox = None if rng.random() < 0.05 else random_bbox(rng)
+                index.insert(item_id, bbox)
+                boxes[item_id] = bbox
+                if item_id not in order:
+                    order.append(item_id)
+            elif kind < 0.8:
+                index.remove(item_id)
+                boxes.pop(item_id, None)
+                if item_id in order:
+                    order.remove(item_id)
+            else:
+                rect = random_bbox(rng)
+                self.assertEqual(index.query_rect(rect), brute_force(boxes, order, rect), step)
+                x, y = rng.randrange(-300, 1000), rng.randrange(-300, 1000)
+                self.assertEqual(index.query_point(x, y), brute_force(boxes, order, (x, y, x, y)), step)
+        self.assertEqual(len(index), len(boxes))
+        # 覆盖所有格子的查询走逐个检查的分支
+        self.assertEqual(index.query_rect((-10 ** 6, -10 ** 6, 10 ** 6, 10 ** 6)),
+                         brute_force(boxes, order, (-10 ** 6, -10 ** 6, 10 ** 6, 10 ** 6)))
+
+    def test_update_keeps_order(self):
+        index = GridIndex()
+        index.insert('a', (0, 0, 10, 10))
+        index.insert('b', (5, 5, 20, 20))
+        index.insert('a', (500, 500, 510, 510))
+        index.insert('a', (8, 8, 12, 12))
+        self.assertEqual(index.query_point(9, 9), ['a', 'b'])
+        # 删除后重新插入排在最后
+        index.remove('a')
+        index.insert('a', (8, 8, 12, 12))
+        self.assertEqual(index.query_point(9, 9), ['b', 'a'])
+        self.assertEqual(index.query_point(505, 505), [])
+
+    def test_empty_bbox(self):
+        # 没有像素的图元占据顺序但不被查询到，之后有了包围盒时按原来的顺序返回
+        index = GridIndex()
+        index.insert('a', None)
+        index.insert('b', (0, 0, 10, 10))
+        self.assertEqual(index.query_rect((-100, -100, 100, 100)), ['b'])
+        self.assertIsNone(index.bbox('a'))
+        index.insert('a', (0, 0, 5, 5))
+        self.assertEqual(index.query_point(3, 3), ['a', 'b'])
+        index.insert('a', None)
+        self.assertEqual(index.query_point(3, 3), ['b'])
+        index.remove('a')
+        self.assertNotIn('a', index)
+
+    def test_insert_many(self):
+        # 成批插入（分成多批计算）与逐个插入的格子、大图元和顺序都相同
+        rng = random.Random(4)
+        item_ids = ['i{}'.format(i) for i in range(500)]
+        boxes = [random_bbox(rng) for _ in item_ids]
+        empty = [rng.random() < 0.1 for _ in item_ids]
+        one_by_one = GridIndex(cell_size=32, max_cells=64)
+        for item_id, bbox, skip in zip(item_ids, boxes, empty):
+            one_by_one.insert(item_id, None if skip else bbox)
+        batch = GridIndex(cell_size=32, max_cells=64)
+        # 插入序号不从0开始
+        batch.insert('first', (0, 0, 1, 1))
+        batch.remove('first')
+        batch.insert_many(item_ids, boxes, empty, chunk=100)
+        self.assertEqual(batch.cells, one_by_one.cells)
+        self.assertEqual(batch.large, one_by_one.large)
+        self.assertEqual(batch.boxes, one_by_one.boxes)
+        for _ in range(100):
+            rect = random_bbox(rng)
+            self.assertEqual(batch.query_rect(rect), one_by_one.query_rect(rect))
+
+    def test_transform_bbox(self):
+        # 变换后的包围盒包含原包围盒角点变换并取整后的位置
+        rng = random.Random(5)
+        for _ in range(200):
+            bbox = random_bbox(rng)
+            center = rng.randrange(-500, 500), rng.randrange(-500, 500)
+            if rng.random() < 0.5:
+                matrix = alg.rotate_matrix(*center, rng.randrange(360))
+            else:
+                matrix = alg.scale_matrix(*center, rng.random() * 3)
+            moved = cg_index.transform_bbox(bbox, matrix)
+            corners = [[bbox[0], bbox[1]], [bbox[2], bbox[1]], [bbox[0], bbox[3]], [bbox[2], bbox[3]]]
+            for x, y in alg.transform(corners, matrix):
+                self.assertTrue(cg_index.contains(moved, (x, y, x, y)), (bbox, moved, x, y))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# Operation、OperationList的撤销和重做测试：python -m unittest test_operation
+# 操作只用到图元的p_list和center，测试中以简单的MyItem代替图形界面中的图元
+import random
+import sys
+import types
+import unittest
+
+
+class MyItem:
+    def __init__(self, p_list):
+        self.p_list = p_list
+        self.center = (0, 0)
+
+
+if 'MyItem' not in sys.modules:
+    sys.modules['MyItem'] = types.ModuleType('MyItem')
+    sys.modules['MyItem'].MyItem = MyItem
+
+import cg_algorithms as alg
+from Operation import TransformItem, pack
+from OperationList import OperationList
+
+
+def same(a, b):
+    """坐标值和类型都相同
+    """
+    return a == b and [type(c) for p in a for c in p] == [type(c) for p in b for c in p]
+
+
+class TransformItemTest(unittest.TestCase):
+    def test_float_coordinates(self):
+        item = MyItem([[1.5, 2.5], [10.25, 3.75]])
+        operation = TransformItem(item)
+        matrix = alg.translate_matrix(3, 4)
+        item.p_list = alg.transform(item.p_list, matrix)
+        operation.transform(matrix)
+        moved = [list(p) for p in item.p_list]
+        operation.undo()
+        self.assertTrue(same(item.p_list, [[1.5, 2.5], [10.25, 3.75]]))
+        operation.redo()
+        self.assertTrue(same(item.p_list, moved))
+
+    def test_without_matrix(self):
+        # 调用方没有提供矩阵时，残差比打包的前后坐标大，应改为保存前后坐标
+        rng = random.Random(1)
+        item = MyItem([[rng.randrange(1000), rng.randrange(1000)] for _ in range(200)])
+        old = [list(p) for p in item.p_list]
+        operation = TransformItem(item)
+        item.p_list = alg.translate(item.p_list, 3, 4)
+        operation.finish()
+        self.assertLessEqual(operation.nbytes(), 64 + 9 * 8 + 2 * len(pack(old)) * 8)
+        operation.undo()
+        self.assertEqual(item.p_list, old)
+
+    def test_session(self):
+        # 100步随机编辑后逐步撤销到最初的坐标，再逐步重做到最后的坐标
+        rng = random.Random(100)
+        item = MyItem([[rng.randrange(-500, 500), rng.randrange(-500, 500)] for _ in range(20)])
+        operations = OperationList()
+        history = [[list(p) for p in item.p_list]]
+        for _ in range(100):
+            status = rng.choice(['translate', 'rotate', 'scale', 'clip'])
+            if status == 'clip':
+                # 无法用矩阵表示的修改，坐标变为浮点数
+                operations.add_operation(status, item)
+                item.p_list = [[x + 0.5, y - 0.25] for x, y in item.p_list]
+            else:
+                operation = operations.add_operation(status, item)
+                operation.begin_gesture()
+                report = rng.random() < 0.7  # 其余情况模拟没有上报矩阵的调用方
+                for _ in range(rng.randrange(1, 4)):
+                    if status == 'translate':
+                        matrix = alg.translate_matrix(rng.randrange(-20, 21), rng.randrange(-20, 21))
+                    elif status == 'rotate':
+                        matrix = alg.rotate_matrix(rng.randrange(-50, 50), rng.randrange(-50, 50),
+                                                   rng.randrange(-180, 180))
+                    else:
+                        matrix = alg.scale_matrix(rng.randrange(-50, 50), rng.randrange(-50, 50),
+                                                  rng.choice([0.5, 0.9, 1.1, 2]))
+                    item.p_list = alg.transform(item.p_list, matrix)
+                    if report:
+                        operations.add_operation(status, item, matrix)
+                operation.end_gesture()
+            history.append([list(p) for p in item.p_list])
+        for expected in reversed(history[:-1]):
+            operations.undo()
+            self.assertTrue(same(item.p_list, expected))
+        for expected in history[1:]:
+            operations.redo()
+            self.assertTrue(same(item.p_list, expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
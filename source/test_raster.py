@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 填充规则和批量线段裁剪的测试：python -m unittest test_raster
+import fractions
+import math
+import random
+import unittest
+
+import numpy as np
+
+import cg_algorithms as alg
+import cg_raster
+
+STAR = [[0, -50], [29, 40], [-48, -15], [48, -15], [-29, 40]]
+
+
+def crossings(p_list, y):
+    """扫描线y与多边形各边的交点，边覆盖y∈[y_min, y_max)
+
+    :return: (list of (fractions.Fraction, int)) 按x排列的交点和边的方向
+    """
+    result = []
+    for (xa, ya), (xb, yb) in zip(p_list[-1:] + p_list[:-1], p_list):
+        if ya == yb:
+            continue
+        direction = 1 if yb > ya else -1
+        if ya > yb:
+            xa, ya, xb, yb = xb, yb, xa, ya
+        if ya <= y < yb:
+            result.append((xa + fractions.Fraction((y - ya) * (xb - xa), yb - ya), direction))
+    return sorted(result)
+
+
+def expected_pixels(p_list, rule):
+    """逐像素判断是否被填充：像素左侧和包括自身的交点中，有一种计数在多边形内即被填充
+
+    :return: (set of (int, int), set of (int, int)) 被填充的像素，以及多条边交于同一像素、结果取决于交点次序而不检查的像素
+    """
+    inside = (lambda ds: sum(ds) != 0) if rule == 'nonzero' else (lambda ds: len(ds) % 2 == 1)
+    filled, ambiguous = set(), set()
+    ys = [y for x, y in p_list]
+    for y in range(min(ys), max(ys)):
+        row = crossings(p_list, y)
+        if not row:
+            continue
+        for x in range(math.floor(row[0][0]), math.ceil(row[-1][0]) + 1):
+            if sum(1 for c, d in row if c == x) > 1:
+                ambiguous.add((x, y))
+            elif inside([d for c, d in row if c < x]) or inside([d for c, d in row if c <= x]):
+                filled.add((x, y))
+    return filled, ambiguous
+
+
+def span_set(spans):
+    return {(x, y) for y, x_start, x_end in spans for x in range(x_start, x_end + 1)}
+
+
+class FillPolygonTest(unittest.TestCase):
+    def check_spans(self, spans):
+        # 按行排列，同一行内的线段从左到右互不相接
+        for (y0, a0, b0), (y1, a1, b1) in zip(spans, spans[1:]):
+            self.assertLessEqual(y0, y1)
+            if y0 == y1:
+                self.assertGreater(a1, b0 + 1)
+        for y, x_start, x_end in spans:
+            self.assertLessEqual(x_start, x_end)
+
+    def test_random(self):
+        rng = random.Random(13)
+        for _ in range(300):
+            p_list = [[rng.randrange(-20, 40), rng.randrange(-20, 40)] for _ in range(rng.randrange(3, 9))]
+            for rule in ('even-odd', 'nonzero'):
+                spans = alg.fill_polygon(p_list, rule)
+                self.check_spans(spans)
+                filled, ambiguous = expected_pixels(p_list, rule)
+                self.assertEqual(span_set(spans) - ambiguous, filled - ambiguous, (p_list, rule))
+
+    def test_star(self):
+        # 五角星中心的环绕数为2：非零规则填充，奇偶规则不填充
+        even_odd = span_set(alg.fill_polygon(STAR, 'even-odd'))
+        nonzero = span_set(alg.fill_polygon(STAR, 'nonzero'))
+        self.assertNotIn((0, 0), even_odd)
+        self.assertIn((0, 0), nonzero)
+        self.assertTrue(even_odd < nonzero)
+        # 顶点反向时环绕数变号，结果不变
+        self.assertEqual(span_set(alg.fill_polygon(STAR[::-1], 'nonzero')), nonzero)
+
+    def test_translate(self):
+        for rule in ('even-odd', 'nonzero'):
+            spans = alg.fill_polygon(STAR, rule)
+            moved = alg.fill_polygon(alg.translate(STAR, 1001, -37), rule)
+            self.assertEqual(moved, [[y - 37, x_start + 1001, x_end + 1001] for y, x_start, x_end in spans])
+
+    def test_degenerate(self):
+        for p_list in ([], [[3, 4]], [[0, 0], [10, 0], [20, 0]]):
+            for rule in ('even-odd', 'nonzero'):
+                self.assertEqual(alg.fill_polygon(p_list, rule), [])
+                spans = cg_raster.fill_polygon(p_list, rule)
+                self.assertEqual((spans.shape, spans.dtype), ((0, 3), cg_raster.SPAN_DTYPE))
+
+    def test_raster(self):
+        # 快速实现的线段数组与参考实现相同，展开的像素与reference_dict相同
+        for rule in ('even-odd', 'nonzero'):
+            spans = cg_raster.fill_polygon(STAR, rule)
+            self.assertEqual(spans.dtype, cg_raster.SPAN_DTYPE)
+            self.assertEqual(spans.tolist(), alg.fill_polygon(STAR, rule))
+            self.assertEqual({tuple(p) for p in cg_raster.span_pixels(spans).tolist()},
+                             {tuple(p) for p in cg_raster.reference_dict['filled_polygon'](STAR, rule)})
+
+
+class ClipLinesTest(unittest.TestCase):
+    def reference(self, segment, window, algorithm):
+        try:
+            return alg.clip([segment[:2], segment[2:]], *window, algorithm)
+        except ZeroDivisionError:
+            # 参考实现的Liang-Barsky对平行于窗口边的线段除零，此时两种算法的结果都是精确的整数
+            return alg.clip([segment[:2], segment[2:]], *window, 'Cohen-Sutherland')
+
+    def check(self, segments, window):
+        for algorithm in ('Cohen-Sutherland', 'Liang-Barsky'):
+            clipped, index = cg_raster.clip_lines(segments, window, algorithm)
+            expected = [(i, self.reference(s, window, algorithm)) for i, s in enumerate(segments)]
+            expected = [(i, r) for i, r in expected if r]
+            self.assertEqual(index.tolist(), [i for i, r in expected], algorithm)
+            self.assertEqual([[s[:2], s[2:]] for s in clipped.tolist()], [r for i, r in expected], algorithm)
+
+    def test_random(self):
+        rng = random.Random(21)
+        segments = [[rng.randrange(-50, 150) for _ in range(4)] for _ in range(2000)]
+        self.check(segments, (10, 20, 100, 80))
+        # 窗口的两个角可以任意给出
+        self.check(segments, (100, 80, 10, 20))
+
+    def test_special(self):
+        # 水平、竖直、退化为一点、在窗口边上的线段
+        segments = [[0, 50, 120, 50], [50, 0, 50, 120], [20, 50, 60, 50], [50, 30, 50, 70], [40, 40, 40, 40],
+                    [-5, -5, -5, -5], [10, 0, 10, 100], [0, 20, 200, 20], [9, 0, 9, 100], [100, 80, 200, 160],
+                    [0, 0, 110, 110], [110, 0, 0, 110]]
+        self.check(segments, (10, 20, 100, 80))
+
+    def test_empty(self):
+        for algorithm in ('Cohen-Sutherland', 'Liang-Barsky'):
+            clipped, index = cg_raster.clip_lines(np.empty((0, 4)), (0, 0, 10, 10), algorithm)
+            self.assertEqual((clipped.shape, index.shape), ((0, 4), (0,)))
+
+
+if __name__ == '__main__':
+    unittest.main()
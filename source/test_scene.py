@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 命令行程序绘图状态的测试：python -m unittest test_scene
+# 随机的指令序列中每次保存时，增量画布（只重绘变化区域，由空间索引查找图元）应与从头全量绘制的结果相同
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+import cg_command as cmd
+import cg_raster
+from cg_cli import Scene
+
+WIDTH, HEIGHT = 160, 120
+
+
+def random_commands(rng, steps):
+    """随机的指令序列，坐标可能超出画布，包括没有参数点的多边形和曲线
+    """
+    coord = lambda: [rng.randrange(-20, WIDTH + 20), rng.randrange(-20, HEIGHT + 20)]
+    window = lambda: (rng.randrange(-10, WIDTH), rng.randrange(-10, HEIGHT),
+                      rng.randrange(0, WIDTH + 10), rng.randrange(0, HEIGHT + 10))
+    commands = [cmd.ResetCanvas(WIDTH, HEIGHT)]
+    ids = []
+    for step in range(steps):
+        kind = rng.random()
+        if kind < 0.3 or not ids:
+            item_id = 'i{}'.format(rng.randrange(60))
+            shape = rng.choice(['line', 'polygon', 'ellipse', 'curve', 'fill', 'empty'])
+            if shape == 'line':
+                commands.append(cmd.DrawLine(item_id, [coord(), coord()], rng.choice(['DDA', 'Bresenham'])))
+            elif shape == 'polygon':
+                commands.append(cmd.DrawPolygon(item_id, [coord() for _ in range(rng.randrange(2, 7))],
+                                                rng.choice(['DDA', 'Bresenham'])))
+            elif shape == 'ellipse':
+                commands.append(cmd.DrawEllipse(item_id, [coord(), coord()]))
+            elif shape == 'curve':
+                commands.append(cmd.DrawCurve(item_id, [coord() for _ in range(rng.randrange(2, 8))],
+                                              rng.choice(['Bezier', 'B-spline'])))
+            elif shape == 'fill':
+                commands.append(cmd.FillPolygon(item_id, [coord() for _ in range(rng.randrange(3, 7))],
+                                                rng.choice(['even-odd', 'nonzero'])))
+            else:
+                commands.append(rng.choice([cmd.DrawPolygon(item_id, [], 'DDA'),
+                                            cmd.DrawCurve(item_id, [], 'Bezier')]))
+            if item_id not in ids:
+                ids.append(item_id)
+        elif kind < 0.4:
+            commands.append(cmd.SetColor(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        elif kind < 0.55:
+            commands.append(cmd.Translate(rng.choice(ids), rng.randrange(-30, 31), rng.randrange(-30, 31)))
+        elif kind < 0.65:
+            commands.append(cmd.Rotate(rng.choice(ids), *coord(), rng.randrange(-180, 180)))
+        elif kind < 0.72:
+            commands.append(cmd.Scale(rng.choice(ids), *coord(), rng.choice([0.5, 0.8, 1.25, 2.0])))
+        elif kind < 0.8:
+            commands.append(cmd.Clip(rng.choice(ids), *window(), rng.choice(['Cohen-Sutherland', 'Liang-Barsky'])))
+        elif kind < 0.86:
+            commands.append(cmd.ClipPolygon(rng.choice(ids), *window(),
+                                            rng.choice(['Sutherland-Hodgman', 'Liang-Barsky'])))
+        elif kind < 0.88:
+            commands.append(cmd.ClipAll(*window(), rng.choice(['Cohen-Sutherland', 'Liang-Barsky'])))
+        else:
+            commands.append(cmd.SaveCanvas('s{}'.format(step % 3)))
+    commands.append(cmd.SaveCanvas('last'))
+    return commands
+
+
+def valid(scene, command):
+    """跳过引用已删除图元的指令，以及对线段以外的图元clip、对多边形以外的图元clipPolygon
+    """
+    if isinstance(command, (cmd.Translate, cmd.Rotate, cmd.Scale, cmd.Clip, cmd.ClipPolygon)):
+        if command.item_id not in scene.item_dict:
+            return False
+        item_type = scene.item_dict[command.item_id][0]
+        if isinstance(command, cmd.Clip):
+            return item_type == 'line'
+        if isinstance(command, cmd.ClipPolygon):
+            return item_type in ('polygon', 'filled_polygon')
+    return True
+
+
+def full_render(scene):
+    image = np.full((scene.height, scene.width, 3), 255, np.uint8)
+    cg_raster.render(image, scene.item_dict.values())
+    return image
+
+
+class IncrementalSceneTest(unittest.TestCase):
+    def check(self, seed, cache=None):
+        rng = random.Random(seed)
+        saves = 0
+        with tempfile.TemporaryDirectory() as output_dir:
+            scene = Scene(output_dir, cache)
+            for command in random_commands(rng, 300):
+                if not valid(scene, command):
+                    continue
+                scene.execute(command)
+                if isinstance(command, cmd.SaveCanvas):
+                    saves += 1
+                    self.assertTrue(np.array_equal(scene.canvas.image, full_render(scene)),
+                                    'seed {} save {}'.format(seed, saves))
+        self.assertGreater(saves, 1)
+
+    def test_incremental(self):
+        for seed in range(8):
+            self.check(seed)
+
+    def test_incremental_with_cache(self):
+        for seed in range(8, 12):
+            self.check(seed, cg_raster.RasterCache())
+
+    def test_empty_items(self):
+        # 没有参数点的图元不绘制任何像素，可以被变换和裁剪（裁剪后删除）
+        with tempfile.TemporaryDirectory() as output_dir:
+            scene = Scene(output_dir)
+            for command in [cmd.ResetCanvas(50, 50), cmd.DrawPolygon('p1', [], 'DDA'),
+                            cmd.DrawCurve('c1', [], 'B-spline'), cmd.SaveCanvas('a'),
+                            cmd.Translate('p1', 3, 4), cmd.Rotate('p1', 0, 0, 30), cmd.Scale('c1', 1, 1, 2.0),
+                            cmd.SaveCanvas('b'), cmd.ClipPolygon('p1', 0, 0, 10, 10, 'Liang-Barsky')]:
+                scene.execute(command)
+            self.assertEqual(list(scene.item_dict), ['c1'])
+            self.assertEqual(scene.index.query_rect((-100, -100, 100, 100)), [])
+            self.assertTrue((scene.canvas.image == 255).all())
+
+    def test_empty_item_order(self):
+        # 没有参数点的图元之后被重新绘制时保持原来的绘制顺序，重绘区域时与全量绘制的层次相同；读取场景后也一样
+        for reload in (False, True):
+            with tempfile.TemporaryDirectory() as output_dir:
+                scene = Scene(output_dir)
+                commands = [cmd.ResetCanvas(50, 50), cmd.DrawPolygon('p1', [], 'DDA'), cmd.SetColor(255, 0, 0),
+                            cmd.FillPolygon('f1', [[5, 5], [40, 5], [40, 40], [5, 40]], 'nonzero'),
+                            cmd.SaveCanvas('a')]
+                if reload:
+                    commands += [cmd.DumpScene('s'), cmd.LoadScene('s'), cmd.SaveCanvas('b')]
+                commands += [cmd.SetColor(0, 0, 255), cmd.DrawPolygon('p1', [[0, 0], [45, 45], [0, 45]], 'Bresenham'),
+                             cmd.SaveCanvas('c')]
+                for command in commands:
+                    scene.execute(command)
+                self.assertEqual(list(scene.item_dict), ['p1', 'f1'])
+                self.assertTrue(np.array_equal(scene.canvas.image, full_render(scene)))
+
+
+if __name__ == '__main__':
+    unittest.main()
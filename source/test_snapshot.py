@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 场景快照的保存和读取测试：python -m unittest test_snapshot
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+import cg_algorithms as alg
+import cg_snapshot
+import cg_store
+
+
+def make_store():
+    store = cg_store.ItemStore()
+    store.add('line1', 'line', [[0, 0], [100, 50]], 'DDA', [255, 0, 0])
+    store.add('p1', 'polygon', [[10, 10], [50, 10], [30, -40]], 'Bresenham', [0, 255, 0])
+    store.add('e1', 'ellipse', [[-20, -10], [20, 10]], 'midpoint', [0, 0, 255])
+    store.add('c1', 'curve', [[0, 0], [10, 30], [40, 30], [50, 0], [70, -20]], 'B-spline', [1, 2, 3])
+    return store
+
+
+def items(store):
+    return [(item_id, item_type, p_list.tolist(), algorithm, color.tolist())
+            for item_id, (item_type, p_list, algorithm, color) in store.items()]
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'ck.scene')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        store = make_store()
+        del store['p1']
+        transforms = {'e1': alg.translate_matrix(3, -4)}
+        cg_snapshot.dump(self.path, 300, 200, [1, 2, 3], store, transforms)
+        snapshot = cg_snapshot.load(self.path)
+        self.assertEqual((snapshot.width, snapshot.height, snapshot.pen_color.tolist()), (300, 200, [1, 2, 3]))
+        self.assertEqual(items(snapshot.store), items(store))
+        self.assertEqual(snapshot.transforms, transforms)
+
+    def test_round_trip_after_edits(self):
+        # 随机修改（留下空槽位、失效的顶点和没有参数点的图元）后保存；修改读取的存储不影响文件
+        rng = random.Random(24)
+        store = make_store()
+        for i in range(200):
+            item_id = 'r{}'.format(rng.randrange(30))
+            if item_id in store and rng.random() < 0.3:
+                del store[item_id]
+            else:
+                store.add(item_id, rng.choice(['polygon', 'curve']),
+                          [[rng.randrange(-5000, 5000), rng.randrange(-5000, 5000)] for _ in range(rng.randrange(4))],
+                          rng.choice(['DDA', 'Bezier']), [rng.randrange(256) for _ in range(3)])
+        cg_snapshot.dump(self.path, 300, 200, [1, 2, 3], store, {})
+        snapshot = cg_snapshot.load(self.path)
+        self.assertEqual(items(snapshot.store), items(store))
+        for item_id in list(snapshot.store)[:10]:
+            snapshot.store.set_p_list(item_id, [[7, 7]] * len(snapshot.store[item_id][1]))
+        self.assertEqual(items(cg_snapshot.load(self.path).store), items(store))
+
+    def test_overwrite_source(self):
+        # 读取后原样保存到同一文件：store中的数组映射到该文件，保存不能破坏它们
+        store = make_store()
+        cg_snapshot.dump(self.path, 300, 200, [0, 0, 0], store, {})
+        snapshot = cg_snapshot.load(self.path)
+        cg_snapshot.dump(self.path, snapshot.width, snapshot.height, snapshot.pen_color, snapshot.store, {})
+        self.assertEqual(items(cg_snapshot.load(self.path).store), items(store))
+        # 修改后再保存到同一文件
+        snapshot = cg_snapshot.load(self.path)
+        snapshot.store.set_p_list('line1', [[1, 2], [3, 4]])
+        cg_snapshot.dump(self.path, snapshot.width, snapshot.height, snapshot.pen_color, snapshot.store, {})
+        self.assertEqual(cg_snapshot.load(self.path).store.p_list('line1'), [[1, 2], [3, 4]])
+        self.assertEqual(os.listdir(self.directory.name), ['ck.scene'])
+
+    def test_truncated(self):
+        cg_snapshot.dump(self.path, 300, 200, [0, 0, 0], make_store(), {})
+        with open(self.path, 'rb') as fp:
+            data = fp.read()
+        for size in (0, 10, cg_snapshot.HEADER.size, len(data) - 8):
+            with open(self.path, 'wb') as fp:
+                fp.write(data[:size])
+            with self.assertRaises(ValueError):
+                cg_snapshot.load(self.path)
+
+    def test_empty(self):
+        cg_snapshot.dump(self.path, 10, 10, np.zeros(3, np.uint8), cg_store.ItemStore(), {})
+        snapshot = cg_snapshot.load(self.path)
+        self.assertEqual(len(snapshot.store), 0)
+        self.assertEqual(snapshot.transforms, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
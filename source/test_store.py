@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# ItemStore的修改、删除和压缩测试：python -m unittest test_store
+# 随机编辑后与同样编辑的普通字典对比，压缩前后图元的顺序和内容不变
+import random
+import unittest
+
+import numpy as np
+
+import cg_raster
+import cg_store
+
+
+def contents(store):
+    return [(item_id, item_type, p_list.tolist(), algorithm, color.tolist())
+            for item_id, (item_type, p_list, algorithm, color) in store.items()]
+
+
+def expected(items):
+    return [(item_id, item_type, p_list, algorithm, color)
+            for item_id, (item_type, p_list, algorithm, color) in items.items()]
+
+
+class ItemStoreTest(unittest.TestCase):
+    def random_edits(self, rng, store, items, steps):
+        """对存储和普通字典做同样的随机添加、替换、修改参数和删除
+        """
+        for _ in range(steps):
+            kind = rng.random()
+            if kind < 0.4 or not items:
+                item_id = 'i{}'.format(rng.randrange(40))
+                item = (rng.choice(['line', 'polygon', 'curve']),
+                        [[rng.randrange(-1000, 1000), rng.randrange(-1000, 1000)] for _ in range(rng.randrange(0, 6))],
+                        rng.choice(['DDA', 'Bresenham', 'B-spline']), [rng.randrange(256) for _ in range(3)])
+                store.add(item_id, *item)
+                items[item_id] = item
+            elif kind < 0.7:
+                item_id = rng.choice(list(items))
+                p_list = [[rng.randrange(-1000, 1000), rng.randrange(-1000, 1000)] for _ in range(rng.randrange(0, 6))]
+                store.set_p_list(item_id, p_list)
+                items[item_id] = (items[item_id][0], p_list) + items[item_id][2:]
+            else:
+                item_id = rng.choice(list(items))
+                del store[item_id]
+                del items[item_id]
+
+    def test_random_edits(self):
+        rng = random.Random(5)
+        store, items = cg_store.ItemStore(capacity=4, vertex_capacity=8), {}
+        for _ in range(50):
+            self.random_edits(rng, store, items, 20)
+            self.assertEqual(contents(store), expected(items))
+            self.assertEqual(len(store), len(items))
+            # 空槽位和失效的顶点不多于有效的部分
+            self.assertLessEqual(len(store.ids) - len(store), len(store))
+            self.assertLessEqual(store.garbage, store.vertex_count - store.garbage)
+
+    def test_compact(self):
+        rng = random.Random(6)
+        store, items = cg_store.ItemStore(), {}
+        self.random_edits(rng, store, items, 300)
+        before = contents(store)
+        store.compact()
+        self.assertEqual(contents(store), before)
+        self.assertEqual(len(store.ids), len(store))
+        self.assertEqual(store.garbage, 0)
+        self.assertEqual(store.vertex_count, sum(len(p_list) for item_type, p_list, algorithm, color in items.values()))
+        # 压缩后的顶点按图元顺序连续存放
+        self.assertEqual(store.offsets[:len(store)].tolist(),
+                         (np.cumsum(store.counts[:len(store)]) - store.counts[:len(store)]).tolist())
+
+    def test_replace_keeps_order(self):
+        store = cg_store.ItemStore()
+        for item_id in ('a', 'b', 'c'):
+            store.add(item_id, 'line', [[0, 0], [1, 1]], 'DDA', [0, 0, 0])
+        store.add('a', 'polygon', [[0, 0], [1, 1], [2, 0]], 'Bresenham', [1, 2, 3])
+        del store['b']
+        store.add('b', 'line', [[5, 5], [6, 6]], 'DDA', [0, 0, 0])
+        store.compact()
+        self.assertEqual(list(store), ['a', 'c', 'b'])
+        self.assertEqual(store.p_list('a'), [[0, 0], [1, 1], [2, 0]])
+        self.assertEqual(store.ids_of_type('line'), ['c', 'b'])
+
+    def test_copy(self):
+        # 副本已压缩，之后修改原存储不影响副本
+        rng = random.Random(7)
+        store, items = cg_store.ItemStore(), {}
+        self.random_edits(rng, store, items, 200)
+        before = contents(store)
+        snapshot = store.copy()
+        self.assertEqual(contents(snapshot), before)
+        self.assertEqual(snapshot.garbage, 0)
+        self.random_edits(rng, store, items, 200)
+        self.assertEqual(contents(snapshot), before)
+
+    def test_bboxes(self):
+        rng = random.Random(8)
+        store, items = cg_store.ItemStore(), {}
+        self.random_edits(rng, store, items, 300)
+        boxes = store.bboxes().tolist()
+        for item_id, box in zip(store, boxes):
+            item_type, p_list, algorithm, color = store[item_id]
+            self.assertEqual(tuple(box), cg_raster.item_bbox(item_type, p_list) or (0, 0, 0, 0))
+
+    def test_overflow(self):
+        store = cg_store.ItemStore()
+        store.add('a', 'line', [[0, 0], [1, 1]], 'DDA', [0, 0, 0])
+        with self.assertRaises(OverflowError):
+            store.add('b', 'line', [[0, 0], [2 ** 31, 0]], 'DDA', [0, 0, 0])
+        with self.assertRaises(OverflowError):
+            store.set_p_list('a', [[0, 0], [0, -2 ** 31 - 1]])
+        self.assertEqual(list(store), ['a'])
+        self.assertEqual(store.p_list('a'), [[0, 0], [1, 1]])
+
+
+if __name__ == '__main__':
+    unittest.main()